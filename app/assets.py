@@ -0,0 +1,197 @@
+"""정적 자원/템플릿 사전 계산 서빙
+
+- 시작 시 파일을 한 번 읽어 ETag(콘텐츠 해시)와 gzip/brotli 압축본을 미리 계산
+- 파일이 바뀌면(mtime 변경) 해당 자원만 다시 계산, index.html은 참조하는 자원이 바뀌어도 다시 렌더링
+- 시작 후 추가된 파일은 첫 요청 때 static 디렉터리 안인지 확인하고 추가, 삭제된 파일은 404
+- index.html의 /static/* 참조를 콘텐츠 해시 URL(?v=<hash>)로 치환 → 해시 URL은 immutable 캐시
+"""
+import gzip
+import hashlib
+import mimetypes
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+try:
+    import brotli  # Optional: 설치되어 있으면 br 압축본도 생성
+except ImportError:
+    brotli = None
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"  # 매번 ETag로 재검증 (304)
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "image/svg+xml")
+MIN_COMPRESS_SIZE = 512  # 이보다 작으면 압축 이득보다 헤더/CPU 비용이 큼
+STATIC_REF_PATTERN = re.compile(r"""(["'])/static/([^"'?#]+)\1""")
+
+
+@dataclass
+class Asset:
+    """사전 계산된 자원 (원본 + 압축본)"""
+    body: bytes
+    media_type: str
+    version: str                     # 콘텐츠 해시 (URL ?v= 및 ETag)
+    mtime: float
+    variants: dict[str, bytes] = field(default_factory=dict)  # {"br": ..., "gzip": ...}
+
+    def etag(self, encoding: Optional[str] = None) -> str:
+        return f'"{self.version}-{encoding}"' if encoding else f'"{self.version}"'
+
+    def negotiate(self, accept_encoding: str) -> tuple[bytes, Optional[str]]:
+        """Accept-Encoding에 맞는 가장 작은 압축본 선택 (br > gzip > identity)"""
+        accepted = parse_accept_encoding(accept_encoding)
+        for encoding in ("br", "gzip"):
+            if encoding in accepted and encoding in self.variants:
+                return self.variants[encoding], encoding
+        return self.body, None
+
+
+def parse_accept_encoding(header: str) -> set[str]:
+    """Accept-Encoding 헤더 파싱 (q=0 제외)"""
+    accepted = set()
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+def etag_matches(if_none_match: Optional[str], asset: Asset) -> bool:
+    """If-None-Match가 자원의 어떤 표현(원본/압축본)과도 일치하면 True"""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        tag = tag.removeprefix("W/").strip('"')
+        if tag.split("-", 1)[0] == asset.version:
+            return True
+    return False
+
+
+def build_asset(body: bytes, media_type: str, mtime: float) -> Asset:
+    """원본 bytes로부터 해시와 압축본 계산"""
+    asset = Asset(
+        body=body,
+        media_type=media_type,
+        version=hashlib.sha256(body).hexdigest()[:16],
+        mtime=mtime,
+    )
+    if len(body) >= MIN_COMPRESS_SIZE and media_type.startswith(COMPRESSIBLE_TYPES):
+        gz = gzip.compress(body, compresslevel=9, mtime=0)
+        if len(gz) < len(body):
+            asset.variants["gzip"] = gz
+        if brotli is not None:
+            br = brotli.compress(body, quality=11)
+            if len(br) < len(body):
+                asset.variants["br"] = br
+    return asset
+
+
+def _media_type(path: Path) -> str:
+    media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    if media_type.startswith("text/") or media_type in ("application/javascript", "application/json"):
+        media_type += "; charset=utf-8"
+    return media_type
+
+
+class StaticAssetStore:
+    """static 디렉터리 사전 로드 + 콘텐츠 해시 URL 생성"""
+
+    def __init__(self, directory: Path, url_prefix: str = "/static"):
+        self.directory = Path(directory)
+        self.url_prefix = url_prefix
+        self._assets: dict[str, Asset] = {}
+
+    def load(self):
+        """디렉터리 전체를 읽어 자원 사전 계산"""
+        self._assets = {}
+        for path in sorted(self.directory.rglob("*")):
+            if path.is_file():
+                rel_path = path.relative_to(self.directory).as_posix()
+                self._assets[rel_path] = self._build(path)
+
+    def _build(self, path: Path) -> Asset:
+        return build_asset(path.read_bytes(), _media_type(path), path.stat().st_mtime)
+
+    def get(self, rel_path: str) -> Optional[Asset]:
+        """사전 로드된 자원 반환 (파일이 바뀌었으면 재계산, 시작 후 추가된 파일은 찾아서 추가). 없는 경로는 None"""
+        if not self._assets:
+            self.load()
+        asset = self._assets.get(rel_path)
+        if asset is None:
+            path = self._resolve(rel_path)
+            if path is None:
+                return None
+            asset = self._assets[rel_path] = self._build(path)
+            return asset
+        path = self.directory / rel_path
+        try:
+            mtime = path.stat().st_mtime
+        except FileNotFoundError:
+            del self._assets[rel_path]  # 시작 후 삭제된 파일
+            return None
+        if mtime != asset.mtime:
+            asset = self._assets[rel_path] = self._build(path)
+        return asset
+
+    def _resolve(self, rel_path: str) -> Optional[Path]:
+        """static 디렉터리 안의 파일만 (../ / 절대 경로 / 심볼릭 링크로 밖을 가리키면 None)"""
+        root = self.directory.resolve()
+        path = (root / rel_path).resolve()
+        if not path.is_relative_to(root) or not path.is_file():
+            return None
+        return path
+
+    def url(self, rel_path: str) -> str:
+        """콘텐츠 해시 URL (예: /static/style.css?v=1a2b3c...)"""
+        asset = self.get(rel_path)
+        if asset is None:
+            return f"{self.url_prefix}/{rel_path}"
+        return f"{self.url_prefix}/{rel_path}?v={asset.version}"
+
+    def items(self) -> dict[str, Asset]:
+        if not self._assets:
+            self.load()
+        return dict(self._assets)
+
+
+class TemplateCache:
+    """HTML 템플릿 캐시 - 템플릿 또는 참조하는 static 자원이 바뀔 때만 다시 렌더링"""
+
+    def __init__(self, path: Path, assets: StaticAssetStore):
+        self.path = Path(path)
+        self.assets = assets
+        self._source: Optional[str] = None
+        self._source_mtime: Optional[float] = None
+        self._refs: list[str] = []
+        self._key: Optional[tuple] = None
+        self._asset: Optional[Asset] = None
+
+    def _load_source(self) -> str:
+        mtime = self.path.stat().st_mtime
+        if self._source is None or self._source_mtime != mtime:
+            self._source = self.path.read_text(encoding="utf-8")
+            self._source_mtime = mtime
+            self._refs = [m.group(2) for m in STATIC_REF_PATTERN.finditer(self._source)]
+        return self._source
+
+    def get(self) -> Asset:
+        html = self._load_source()
+        # 키 = 템플릿 mtime + 참조 자원의 해시 URL (style.css만 바뀌어도 ?v=를 새 해시로 치환)
+        urls = {ref: self.assets.url(ref) for ref in self._refs}
+        key = (self._source_mtime, tuple(urls.items()))
+        if self._asset is None or self._key != key:
+            html = STATIC_REF_PATTERN.sub(lambda m: f"{m.group(1)}{urls[m.group(2)]}{m.group(1)}", html)
+            self._asset = build_asset(html.encode("utf-8"), "text/html; charset=utf-8", self._source_mtime)
+            self._key = key
+        return self._asset
+
+    def static_refs(self) -> list[str]:
+        """템플릿이 참조하는 static 자원 목록 (페이지 로드 시 요청되는 자원)"""
+        self._load_source()
+        return list(self._refs)
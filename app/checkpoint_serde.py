@@ -0,0 +1,233 @@
+"""퀴즈 State 전용 compact 체크포인트 직렬화 (LangGraph SerializerProtocol)
+
+- msgpack(ormsgpack) 바이너리 인코딩, LangChain 메시지는 기본값이 아닌 필드만 저장
+- 메시지 본문 중복 제거: 포맷된 메시지(예: "👨‍🏫 **Teacher (문제 #1)**\\n\\n{질문}")에 같은 dict의
+  current_question / student_answer 값이 들어 있으면 그 부분을 필드 참조로 저장
+  (체크포인트 전체를 한 번에 직렬화하는 saver - SqliteSaver 등 - 에서 적용, 채널별로 나눠 저장하는
+  MemorySaver는 메시지와 scalar 필드가 다른 blob이라 인코딩 축소만 적용)
+- 선택적 zstd 압축 (zstandard 설치 시, 작은 payload는 압축하지 않음)
+- 처리하지 못하는 타입과 이전 형식("msgpack" 등) 데이터는 기본 JsonPlusSerializer에 위임
+"""
+from typing import Any, Optional
+
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+try:
+    import ormsgpack  # langgraph-checkpoint 의존성
+except ImportError:
+    ormsgpack = None
+
+try:
+    import zstandard  # Optional: 체크포인트 압축
+except ImportError:
+    zstandard = None
+
+TYPE_COMPACT = "quizpack"
+TYPE_COMPACT_ZSTD = "quizpack+zstd"
+
+DEDUPE_FIELDS = ("current_question", "student_answer")
+DEDUPE_MIN_LENGTH = 16    # 짧은 값은 참조 오버헤드가 더 큼
+MIN_COMPRESS_SIZE = 256  # 이보다 작으면 zstd frame 오버헤드가 더 큼
+
+EXT_MESSAGE = 1
+EXT_MESSAGE_REF = 2
+EXT_TUPLE = 3
+EXT_FALLBACK = 4
+
+MESSAGE_CLASSES = {
+    cls.model_fields["type"].default: cls
+    for cls in (AIMessage, AIMessageChunk, HumanMessage, SystemMessage, ToolMessage)
+}
+
+if ormsgpack is not None:
+    PACK_OPTIONS = (
+        ormsgpack.OPT_NON_STR_KEYS
+        | ormsgpack.OPT_PASSTHROUGH_TUPLE
+        | ormsgpack.OPT_PASSTHROUGH_DATACLASS
+        | ormsgpack.OPT_PASSTHROUGH_DATETIME
+        | getattr(ormsgpack, "OPT_PASSTHROUGH_ENUM", 0)
+        | getattr(ormsgpack, "OPT_PASSTHROUGH_UUID", 0)
+    )
+
+
+class _MessageRef:
+    """직렬화 전: 본문 일부가 같은 dict의 scalar 필드와 같은 메시지"""
+
+    __slots__ = ("message", "field", "prefix", "suffix")
+
+    def __init__(self, message: BaseMessage, field: str, prefix: str, suffix: str):
+        self.message = message
+        self.field = field
+        self.prefix = prefix
+        self.suffix = suffix
+
+
+class _UnresolvedMessage:
+    """역직렬화 중: 필드 값을 채워야 하는 메시지"""
+
+    __slots__ = ("cls", "fields", "field", "prefix", "suffix")
+
+    def __init__(self, cls, fields: dict, field: str, prefix: str, suffix: str):
+        self.cls = cls
+        self.fields = fields
+        self.field = field
+        self.prefix = prefix
+        self.suffix = suffix
+
+    def resolve(self, value: str) -> BaseMessage:
+        return self.cls(content=self.prefix + value + self.suffix, **self.fields)
+
+
+def _message_fields(message: BaseMessage) -> dict:
+    """content/type 외 기본값이 아닌 필드만"""
+    defaults = type(message).model_fields
+    fields = {}
+    for name in message.model_fields_set | {"id"}:
+        if name in ("content", "type"):
+            continue
+        value = getattr(message, name)
+        if value in (None, "", {}, []) or (name in defaults and value == defaults[name].default):
+            continue
+        fields[name] = value
+    return fields
+
+
+def _dedupe(obj: Any) -> Any:
+    """messages + scalar 필드를 가진 dict(State / channel_values)를 찾아 메시지를 _MessageRef로 치환한 사본"""
+    if not isinstance(obj, dict):
+        return obj
+    replaced = None
+    messages = obj.get("messages")
+    anchors = [
+        (field, obj[field]) for field in DEDUPE_FIELDS
+        if isinstance(obj.get(field), str) and len(obj[field]) >= DEDUPE_MIN_LENGTH
+    ]
+    if anchors and isinstance(messages, list):
+        deduped = []
+        for message in messages:
+            if isinstance(message, BaseMessage) and isinstance(message.content, str):
+                for field, value in anchors:
+                    start = message.content.find(value)
+                    if start >= 0:
+                        message = _MessageRef(
+                            message, field, message.content[:start], message.content[start + len(value):]
+                        )
+                        break
+            deduped.append(message)
+        replaced = {"messages": deduped}
+
+    for key, value in obj.items():
+        if isinstance(value, dict):
+            nested = _dedupe(value)
+            if nested is not value:
+                replaced = replaced or {}
+                replaced[key] = nested
+    return {**obj, **replaced} if replaced else obj
+
+
+def _resolve(obj: Any) -> Any:
+    """_dedupe의 역: dict 안의 _UnresolvedMessage를 같은 dict의 필드 값으로 복원"""
+    if not isinstance(obj, dict):
+        return obj
+    messages = obj.get("messages")
+    if isinstance(messages, list):
+        for i, message in enumerate(messages):
+            if isinstance(message, _UnresolvedMessage):
+                messages[i] = message.resolve(obj.get(message.field) or "")
+    for value in obj.values():
+        if isinstance(value, dict):
+            _resolve(value)
+    return obj
+
+
+class CompactSerializer:
+    """퀴즈 State용 SerializerProtocol 구현 (dumps_typed / loads_typed)"""
+
+    def __init__(self, compression: str = "none", zstd_level: int = 3, fallback: Optional[JsonPlusSerializer] = None):
+        if ormsgpack is None:
+            raise RuntimeError("CHECKPOINT_SERDE=compact requires 'ormsgpack'")
+        if compression not in ("none", "zstd"):
+            raise RuntimeError(f"Invalid CHECKPOINT_COMPRESSION '{compression}' (expected none or zstd)")
+        if compression == "zstd" and zstandard is None:
+            raise RuntimeError("CHECKPOINT_COMPRESSION=zstd requires 'zstandard' (pip install '.[perf]')")
+        self.compression = compression
+        self.zstd_level = zstd_level
+        self.fallback = fallback or JsonPlusSerializer()
+
+    # === SerializerProtocol ===
+    def dumps_typed(self, obj: Any) -> tuple[str, bytes]:
+        data = self._pack(_dedupe(obj))
+        if self.compression == "zstd" and len(data) >= MIN_COMPRESS_SIZE:
+            compressed = zstandard.ZstdCompressor(level=self.zstd_level).compress(data)
+            if len(compressed) < len(data):
+                return TYPE_COMPACT_ZSTD, compressed
+        return TYPE_COMPACT, data
+
+    def loads_typed(self, data: tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if type_ == TYPE_COMPACT_ZSTD:
+            if zstandard is None:
+                raise RuntimeError("Checkpoint is zstd-compressed but 'zstandard' is not installed")
+            payload = zstandard.ZstdDecompressor().decompress(payload)
+        elif type_ != TYPE_COMPACT:
+            return self.fallback.loads_typed(data)  # 기본 serde로 저장된 이전 체크포인트
+
+        unresolved = []
+        obj = self._unpack(payload, unresolved)
+        return _resolve(obj) if unresolved else obj
+
+    # === msgpack ===
+    def _pack(self, obj: Any) -> bytes:
+        return ormsgpack.packb(obj, default=self._default, option=PACK_OPTIONS)
+
+    def _default(self, obj: Any):
+        if isinstance(obj, _MessageRef):
+            message = obj.message
+            return ormsgpack.Ext(EXT_MESSAGE_REF, self._pack(
+                [message.type, obj.field, obj.prefix, obj.suffix, _message_fields(message)]
+            ))
+        if isinstance(obj, BaseMessage) and message_class(obj.type) is type(obj):
+            return ormsgpack.Ext(EXT_MESSAGE, self._pack([obj.type, obj.content, _message_fields(obj)]))
+        if type(obj) is tuple:
+            return ormsgpack.Ext(EXT_TUPLE, self._pack(list(obj)))
+        return ormsgpack.Ext(EXT_FALLBACK, self._pack(list(self.fallback.dumps_typed(obj))))
+
+    def _unpack(self, payload: bytes, unresolved: list) -> Any:
+        def ext_hook(code: int, data: bytes):
+            value = ormsgpack.unpackb(data, ext_hook=ext_hook, option=ormsgpack.OPT_NON_STR_KEYS)
+            if code == EXT_MESSAGE:
+                type_, content, fields = value
+                return message_class(type_)(content=content, **fields)
+            if code == EXT_MESSAGE_REF:
+                type_, field, prefix, suffix, fields = value
+                message = _UnresolvedMessage(message_class(type_), fields, field, prefix, suffix)
+                unresolved.append(message)
+                return message
+            if code == EXT_TUPLE:
+                return tuple(value)
+            if code == EXT_FALLBACK:
+                return self.fallback.loads_typed(tuple(value))
+            raise ValueError(f"Unknown checkpoint ext type: {code}")
+
+        return ormsgpack.unpackb(payload, ext_hook=ext_hook, option=ormsgpack.OPT_NON_STR_KEYS)
+
+
+def message_class(type_: str):
+    return MESSAGE_CLASSES.get(type_)
+
+
+def create_checkpoint_serde(kind: str, compression: str = "none", zstd_level: int = 3):
+    """CHECKPOINT_SERDE 설정값 → serde (default면 None: saver 기본 serde 사용)"""
+    if kind == "default":
+        return None
+    if kind == "compact":
+        return CompactSerializer(compression=compression, zstd_level=zstd_level)
+    raise RuntimeError(f"Unknown CHECKPOINT_SERDE '{kind}' (expected 'default' or 'compact')")
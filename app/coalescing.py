@@ -0,0 +1,113 @@
+"""세션별 Single-flight 실행 - 중복 요청 병합 및 순차 실행
+
+- 같은 세션에 같은 메시지가 실행 중(또는 대기 중)이면 새로 실행하지 않고 기존 run의 이벤트 스트림에 합류
+- 같은 세션의 다른 메시지는 세션 락으로 순차 실행 (thread_id 체크포인트 경합 방지)
+- run은 백그라운드 Task로 실행되므로 최초 요청 클라이언트가 끊겨도 합류한 요청은 끝까지 수신
+"""
+import asyncio
+from typing import Any, AsyncIterator, Callable
+
+
+class RunBroadcast:
+    """실행 중인 run의 이벤트를 모든 구독자에게 전달 (늦게 합류해도 처음부터 재생)
+
+    run이 예외로 끝나면 모든 구독자가 이벤트를 다 받은 뒤 같은 예외를 받는다.
+    """
+
+    def __init__(self):
+        self.events: list[Any] = []
+        self.done = False
+        self.error: Exception | None = None
+        self._cond = asyncio.Condition()
+
+    async def publish(self, event: Any):
+        async with self._cond:
+            self.events.append(event)
+            self._cond.notify_all()
+
+    async def close(self):
+        async with self._cond:
+            self.done = True
+            self._cond.notify_all()
+
+    async def subscribe(self) -> AsyncIterator[Any]:
+        index = 0
+        while True:
+            async with self._cond:
+                await self._cond.wait_for(lambda: index < len(self.events) or self.done)
+                pending = self.events[index:]
+                finished = self.done
+            for event in pending:
+                yield event
+            index += len(pending)
+            if finished and index >= len(self.events):
+                if self.error is not None:
+                    raise self.error
+                return
+
+
+class SessionSingleFlight:
+    """세션 단위 Single-flight 코디네이터"""
+
+    def __init__(self):
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._pending: dict[str, int] = {}  # {session_id: 대기/실행 중인 run 수}
+        self._runs: dict[tuple[str, str, str], RunBroadcast] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def submit(
+        self,
+        session_id: str,
+        kind: str,
+        message: str,
+        run_factory: Callable[[], AsyncIterator[Any]],
+    ) -> tuple[RunBroadcast, bool]:
+        """run 등록 후 (broadcast, coalesced) 반환
+
+        kind는 이벤트 형식이 다른 엔드포인트(stream / invoke)를 구분하는 키.
+        같은 (session_id, kind, message) run이 끝나지 않았으면 그 run에 합류한다.
+        """
+        key = (session_id, kind, message.strip())
+        run = self._runs.get(key)
+        if run is not None and not run.done:
+            return run, True
+
+        run = RunBroadcast()
+        self._runs[key] = run
+        self._pending[session_id] = self._pending.get(session_id, 0) + 1
+        task = asyncio.create_task(self._execute(session_id, key, run, run_factory))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return run, False
+
+    def busy(self, session_id: str) -> bool:
+        """세션에 대기/실행 중인 run이 있는지"""
+        return session_id in self._pending
+
+    def in_flight(self) -> int:
+        """대기/실행 중인 run 수"""
+        return len(self._runs)
+
+    async def drain(self, timeout: float) -> bool:
+        """대기/실행 중인 run이 모두 끝날 때까지 대기 (timeout 초과 시 False)"""
+        if not self._tasks:
+            return True
+        _, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        return not pending
+
+    async def _execute(self, session_id: str, key: tuple, run: RunBroadcast, run_factory: Callable):
+        lock = self._locks.setdefault(session_id, asyncio.Lock())
+        try:
+            async with lock:
+                async for event in run_factory():
+                    await run.publish(event)
+        except Exception as e:
+            run.error = e  # 구독자 쪽에서 다시 raise
+        finally:
+            await run.close()
+            if self._runs.get(key) is run:
+                del self._runs[key]
+            self._pending[session_id] -= 1
+            if self._pending[session_id] == 0:
+                del self._pending[session_id]
+                self._locks.pop(session_id, None)
@@ -0,0 +1,238 @@
+"""메모리 진단 - 컴포넌트별 크기 / 세션별 체크포인트 / tracemalloc diff / 객체 수
+
+- 컴포넌트 probe: 이름 → {"items": 개수, "bytes": 추정 크기, ...} 를 반환하는 함수 (register_component)
+  관리자 엔드포인트(/admin/memory)와 OTel observable gauge가 같은 probe를 사용
+- bytes는 추정치: 체크포인터는 직렬화된 payload 길이 합, dict 저장소는 sys.getsizeof 합 (공유 객체 중복 포함)
+- tracemalloc은 켜 둔 동안만 할당 추적 (오버헤드가 커서 기본 꺼짐), baseline 대비 diff로 증가분 확인
+"""
+import gc
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from typing import Callable, Optional
+
+from opentelemetry.metrics import CallbackOptions, Observation
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+ComponentProbe = Callable[[], dict]
+
+_components: dict[str, ComponentProbe] = {}
+
+
+def register_component(name: str, probe: ComponentProbe):
+    """메모리 보고 대상 컴포넌트 등록 (같은 이름이면 교체)"""
+    _components[name] = probe
+
+
+def component_sizes() -> dict[str, dict]:
+    """등록된 모든 컴포넌트의 현재 크기 (probe 실패는 error로 보고)"""
+    sizes = {}
+    for name, probe in list(_components.items()):
+        try:
+            sizes[name] = probe()
+        except Exception as e:
+            sizes[name] = {"error": repr(e)}
+    return sizes
+
+
+def rss_bytes() -> Optional[int]:
+    """현재 프로세스 RSS (psutil 미설치면 None)"""
+    if psutil is None:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+# === 컴포넌트 probe ===
+def dict_store_usage(store: dict) -> dict:
+    """{key: 작은 dict/값} 저장소의 항목 수 / 얕은 크기 합"""
+    total = sys.getsizeof(store)
+    for key, value in list(store.items()):
+        total += sys.getsizeof(key) + sys.getsizeof(value)
+        if isinstance(value, dict):
+            total += sum(sys.getsizeof(v) for v in value.values())
+    return {"items": len(store), "bytes": total}
+
+
+def checkpointer_threads(saver) -> dict[str, dict]:
+    """MemorySaver의 thread_id별 {"checkpoints", "bytes"} (체크포인트 + 메타데이터 + blob + pending write)"""
+    threads: dict[str, dict] = {}
+
+    def usage(thread_id: str) -> dict:
+        return threads.setdefault(thread_id, {"checkpoints": 0, "bytes": 0})
+
+    for thread_id, namespaces in list(saver.storage.items()):
+        entry = usage(thread_id)
+        for checkpoints in list(namespaces.values()):
+            for checkpoint, metadata, _ in list(checkpoints.values()):
+                entry["checkpoints"] += 1
+                entry["bytes"] += len(checkpoint[1]) + len(metadata[1])
+    for (thread_id, *_), blob in list(saver.blobs.items()):
+        usage(thread_id)["bytes"] += len(blob[1]) if blob[1] is not None else 0
+    for (thread_id, *_), writes in list(saver.writes.items()):
+        usage(thread_id)["bytes"] += sum(len(write[2][1]) for write in list(writes.values()))
+    return threads
+
+
+def checkpointer_usage(saver, live_sessions: Optional[dict] = None) -> dict:
+    """MemorySaver 전체 크기, live_sessions에 없는 (세션 TTL 이후 남은) thread 수 포함"""
+    threads = checkpointer_threads(saver)
+    usage = {
+        "items": sum(t["checkpoints"] for t in threads.values()),
+        "bytes": sum(t["bytes"] for t in threads.values()),
+        "threads": len(threads),
+        "blobs": len(saver.blobs),
+        "writes": len(saver.writes),
+    }
+    if live_sessions is not None:
+        usage["orphan_threads"] = sum(1 for thread_id in threads if thread_id not in live_sessions)
+    return usage
+
+
+def span_queue_usage(span_processor) -> dict:
+    """BatchSpanProcessor 대기 큐 (SDK 버전별 내부 속성 차이 흡수)"""
+    processor = getattr(span_processor, "_batch_processor", span_processor)
+    queue = getattr(processor, "_queue", None)
+    if queue is None:
+        queue = getattr(processor, "queue", None)
+    capacity = getattr(processor, "_max_queue_size", None) or getattr(processor, "max_queue_size", None)
+    return {"items": len(queue) if queue is not None else 0, "capacity": capacity}
+
+
+def llm_cache_usage() -> dict:
+    """LangChain 전역 LLM 캐시 (미설정이면 0)"""
+    from langchain_core.globals import get_llm_cache
+
+    cache = get_llm_cache()
+    entries = getattr(cache, "_cache", None)
+    return {"items": len(entries) if entries is not None else 0, "enabled": cache is not None}
+
+
+# === 세션별 ===
+def top_sessions(saver, session_states: dict, top: int = 20) -> list[dict]:
+    """체크포인트 bytes 상위 thread (세션 저장소에 남아 있는지 함께 표시)"""
+    threads = checkpointer_threads(saver)
+    ranked = sorted(threads.items(), key=lambda item: item[1]["bytes"], reverse=True)[:top]
+    return [
+        {"session_id": thread_id, **usage, "live": thread_id in session_states}
+        for thread_id, usage in ranked
+    ]
+
+
+# === 객체 수 ===
+class ObjectCensus:
+    """gc 추적 객체의 타입별 개수와 직전 호출 대비 증감 (전체 힙 순회 - 요청 시에만)"""
+
+    def __init__(self):
+        self._previous: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def take(self, top: int = 30) -> dict:
+        counts = Counter(f"{type(o).__module__}.{type(o).__qualname__}" for o in gc.get_objects())
+        with self._lock:
+            previous, self._previous = self._previous, counts
+        return {
+            "total": sum(counts.values()),
+            "types": [
+                {"type": name, "count": count, "delta": count - previous.get(name, 0) if previous else None}
+                for name, count in counts.most_common(top)
+            ],
+        }
+
+
+# === tracemalloc ===
+class TracemallocNotRunningError(RuntimeError):
+    """tracemalloc이 꺼져 있는데 snapshot diff 요청"""
+
+
+_TRACEMALLOC_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+class TracemallocTracker:
+    """start 이후 (또는 reset 이후) baseline snapshot 대비 할당 증가 상위 위치"""
+
+    def __init__(self):
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._lock = threading.Lock()
+
+    def start(self, frames: int = 1):
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+            self._baseline = self._snapshot()
+
+    def stop(self):
+        with self._lock:
+            tracemalloc.stop()
+            self._baseline = None
+
+    def status(self) -> dict:
+        if not tracemalloc.is_tracing():
+            return {"tracing": False}
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "tracing": True,
+            "frames": tracemalloc.get_traceback_limit(),
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+        }
+
+    def diff(self, top: int = 20, group_by: str = "lineno", reset: bool = False) -> dict:
+        """baseline 대비 size_diff 상위 top개 (reset이면 이번 snapshot을 새 baseline으로)"""
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                raise TracemallocNotRunningError("tracemalloc is not running (POST /admin/memory/tracemalloc/start)")
+            snapshot = self._snapshot()
+            baseline = self._baseline or snapshot
+            if reset or self._baseline is None:
+                self._baseline = snapshot
+        stats = snapshot.compare_to(baseline, group_by)
+        return {
+            "group_by": group_by,
+            "size_diff_bytes": sum(stat.size_diff for stat in stats),
+            "top": [
+                {
+                    "location": [str(frame) for frame in stat.traceback] if group_by == "traceback" else str(stat.traceback[0]),
+                    "size_bytes": stat.size,
+                    "size_diff_bytes": stat.size_diff,
+                    "count": stat.count,
+                    "count_diff": stat.count_diff,
+                }
+                for stat in stats[:top]
+            ],
+        }
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(_TRACEMALLOC_FILTERS)
+
+
+# === OTel gauges ===
+def _observe(field: str):
+    def callback(options: CallbackOptions):
+        for name, usage in component_sizes().items():
+            if isinstance(usage.get(field), int):
+                yield Observation(usage[field], {"component": name})
+    return callback
+
+
+def register_memory_gauges(meter):
+    """컴포넌트 크기를 metric reader 수집 주기마다 관측하는 observable gauge 등록"""
+    meter.create_observable_gauge(
+        "quiz.memory.component.items", callbacks=[_observe("items")], unit="{item}",
+        description="Entries held by an in-process component (sessions, checkpoints, queued spans)",
+    )
+    meter.create_observable_gauge(
+        "quiz.memory.component.size", callbacks=[_observe("bytes")], unit="By",
+        description="Estimated bytes held by an in-process component",
+    )
@@ -9,6 +9,7 @@ from langchain_core.messages import HumanMessage, AIMessage, BaseMessage, System
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
 from langgraph.checkpoint.memory import MemorySaver
+from opentelemetry import trace, metrics
 
 import sys
 sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -19,7 +20,20 @@ from config import (
     AZURE_OPENAI_API_VERSION,
     USE_DEFAULT_CREDENTIAL,
     AZURE_TOKEN_PROVIDER,
+    HEDGE_ENABLED,
+    HEDGE_PERCENTILE,
+    HEDGE_MIN_DELAY,
+    HEDGE_MAX_RATE,
+    HEDGE_REQUEST_TIMEOUT,
+    HEDGE_MAX_WORKERS,
+    CHECKPOINT_SERDE,
+    CHECKPOINT_COMPRESSION,
+    CHECKPOINT_ZSTD_LEVEL,
 )
+from llm_cassette import get_cassette
+from llm_router import Deployment, get_router
+from .checkpoint_serde import create_checkpoint_serde
+from .hedging import Hedger
 
 
 def load_prompts() -> dict:
@@ -57,8 +71,67 @@ class State(TypedDict):
     user_input: Optional[str]       # 사용자 입력 저장
 
 
-# 메모리 체크포인터
-memory = MemorySaver()
+# 설정 안내 메시지 (난이도/영역이 정해지지 않은 setup 턴의 고정 응답)
+GUIDE_MESSAGE = """🎓 **Teacher-Student 퀴즈에 오신 것을 환영합니다!**
+
+퀴즈를 시작하려면 **난이도**와 **영역**을 알려주세요.
+
+📊 **난이도**: 쉬움 / 보통 / 어려움
+📚 **영역**: 수학 / 과학 / 역사 / 영어 / 일반상식 / 프로그래밍 / 지리
+
+예시: "보통 난이도로 수학 문제 풀래" 또는 "쉬운 역사 퀴즈"
+"""
+SUBJECTS = ["수학", "과학", "역사", "영어", "일반상식", "프로그래밍", "지리"]
+
+
+def parse_quiz_settings(user_input: str) -> tuple[Optional[str], Optional[str]]:
+    """사용자 입력에서 (난이도, 영역) 추출, 없으면 None"""
+    difficulty = None
+    subject = None
+    
+    # 난이도 파싱
+    if "쉬움" in user_input or "쉬운" in user_input or "easy" in user_input.lower():
+        difficulty = "쉬움"
+    elif "보통" in user_input or "중간" in user_input or "medium" in user_input.lower():
+        difficulty = "보통"
+    elif "어려움" in user_input or "어려운" in user_input or "hard" in user_input.lower():
+        difficulty = "어려움"
+    
+    # 영역 파싱
+    for s in SUBJECTS:
+        if s in user_input:
+            subject = s
+            break
+    
+    return difficulty, subject
+
+
+def starts_quiz(user_input: str, difficulty: Optional[str], subject: Optional[str]) -> bool:
+    """이 입력으로 setup 이후 문제 출제까지 진행되는지 (route_after_setup과 같은 기준)"""
+    parsed_difficulty, parsed_subject = parse_quiz_settings(user_input)
+    return bool((parsed_difficulty and parsed_subject) or (difficulty and subject))
+
+
+# 메모리 체크포인터 (CHECKPOINT_SERDE=compact면 compact 직렬화)
+memory = MemorySaver(serde=create_checkpoint_serde(CHECKPOINT_SERDE, CHECKPOINT_COMPRESSION, CHECKPOINT_ZSTD_LEVEL))
+
+# 노드 LLM 호출 hedging (HEDGE_ENABLED=false면 단일 스트림)
+hedger = Hedger(
+    enabled=HEDGE_ENABLED,
+    percentile=HEDGE_PERCENTILE,
+    min_delay=HEDGE_MIN_DELAY,
+    max_rate=HEDGE_MAX_RATE,
+    max_workers=HEDGE_MAX_WORKERS,
+)
+
+# 프롬프트 캐시 적중 확인용 토큰 메트릭 (MeterProvider 설정 전에도 proxy로 안전)
+_meter = metrics.get_meter(__name__)
+input_tokens_counter = _meter.create_counter(
+    "quiz.llm.input_tokens", unit="{token}", description="Prompt tokens sent per node",
+)
+cached_tokens_counter = _meter.create_counter(
+    "quiz.llm.cached_input_tokens", unit="{token}", description="Prompt tokens served from provider prompt cache",
+)
 
 # 스트리밍 콜백 저장소 (세션별)
 streaming_callbacks: dict[str, Callable] = {}
@@ -75,14 +148,17 @@ def clear_streaming_callback(session_id: str):
         del streaming_callbacks[session_id]
 
 
-def create_llm(streaming: bool = False):
-    """LLM 인스턴스 생성 (API Key 또는 DefaultAzureCredential)"""
+def create_llm(streaming: bool = False, deployment: Optional[Deployment] = None):
+    """LLM 인스턴스 생성 (API Key 또는 DefaultAzureCredential), deployment 미지정 시 기본 배포"""
     kwargs = dict(
-        azure_endpoint=AZURE_OPENAI_ENDPOINT,
-        azure_deployment=AZURE_OPENAI_DEPLOYMENT_NAME,
+        azure_endpoint=deployment.endpoint if deployment else AZURE_OPENAI_ENDPOINT,
+        azure_deployment=deployment.deployment if deployment else AZURE_OPENAI_DEPLOYMENT_NAME,
         api_version=AZURE_OPENAI_API_VERSION,
         streaming=streaming,
+        stream_usage=True,  # 스트리밍에서도 usage(cached_tokens 포함) 수신
     )
+    if HEDGE_ENABLED:
+        kwargs["timeout"] = HEDGE_REQUEST_TIMEOUT  # 청크 간 읽기 timeout → 응답 없는 hedge 요청이 스레드를 놓음
     if USE_DEFAULT_CREDENTIAL:
         kwargs["azure_ad_token_provider"] = AZURE_TOKEN_PROVIDER
     else:
@@ -90,35 +166,47 @@ def create_llm(streaming: bool = False):
     return AzureChatOpenAI(**kwargs)
 
 
+def record_llm_usage(node: str, model: str, response: BaseMessage):
+    """응답 usage의 prompt/cached 토큰 수를 span 속성과 메트릭으로 기록"""
+    usage = getattr(response, "usage_metadata", None) or {}
+    input_tokens = usage.get("input_tokens", 0) or 0
+    cached_tokens = (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+    
+    span = trace.get_current_span()
+    span.set_attribute(f"quiz.{node}.input_tokens", input_tokens)
+    span.set_attribute(f"quiz.{node}.cached_input_tokens", cached_tokens)
+    
+    attributes = {"quiz.node": node, "gen_ai.request.model": model}
+    input_tokens_counter.add(input_tokens, attributes)
+    cached_tokens_counter.add(cached_tokens, attributes)
+
+
 def create_graph():
     """Create LangGraph workflow for Teacher-Student Quiz"""
     
-    llm = create_llm(streaming=True)
+    router = get_router()
+    cassette = get_cassette()
+    llms: dict[str, AzureChatOpenAI] = {}  # 배포 alias별 LLM 인스턴스
+
+    def invoke_llm(role: str, messages: list) -> BaseMessage:
+        """역할(노드)에 매핑된 배포로 호출 (지연시간 기반 분산 + failover + hedging, LLM_CASSETTE_MODE면 녹화/재생)"""
+        def run(deployment: Deployment) -> BaseMessage:
+            def stream():
+                if deployment.alias not in llms:  # replay 모드에서는 생성하지 않음
+                    llms[deployment.alias] = create_llm(streaming=True, deployment=deployment)
+                return llms[deployment.alias].stream(messages)
+
+            response = hedger.invoke(role, cassette.wrap_stream(role, deployment.deployment, messages, stream))
+            record_llm_usage(role, deployment.deployment, response)
+            return response
+        return router.call(role, run)
 
     # ========== 노드 정의 ==========
     
     def setup_handler(state: State) -> State:
         """사용자 입력을 파싱하여 난이도와 영역 설정"""
         user_input = state.get("user_input", "")
-        
-        # 사용자 입력에서 설정 추출 시도
-        difficulty = None
-        subject = None
-        
-        # 난이도 파싱
-        if "쉬움" in user_input or "쉬운" in user_input or "easy" in user_input.lower():
-            difficulty = "쉬움"
-        elif "보통" in user_input or "중간" in user_input or "medium" in user_input.lower():
-            difficulty = "보통"
-        elif "어려움" in user_input or "어려운" in user_input or "hard" in user_input.lower():
-            difficulty = "어려움"
-        
-        # 영역 파싱
-        subjects = ["수학", "과학", "역사", "영어", "일반상식", "프로그래밍", "지리"]
-        for s in subjects:
-            if s in user_input:
-                subject = s
-                break
+        difficulty, subject = parse_quiz_settings(user_input)
         
         if difficulty and subject:
             welcome_msg = f"🎓 **퀴즈 설정 완료!**\n\n📊 난이도: {difficulty}\n📚 영역: {subject}\n\n이제 Teacher가 문제를 출제합니다!"
@@ -130,18 +218,8 @@ def create_graph():
                 "round_count": 0,
             }
         else:
-            # 설정 안내 메시지
-            guide_msg = """🎓 **Teacher-Student 퀴즈에 오신 것을 환영합니다!**
-
-퀴즈를 시작하려면 **난이도**와 **영역**을 알려주세요.
-
-📊 **난이도**: 쉬움 / 보통 / 어려움
-📚 **영역**: 수학 / 과학 / 역사 / 영어 / 일반상식 / 프로그래밍 / 지리
-
-예시: "보통 난이도로 수학 문제 풀래" 또는 "쉬운 역사 퀴즈"
-"""
             return {
-                "messages": [AIMessage(content=guide_msg)],
+                "messages": [AIMessage(content=GUIDE_MESSAGE)],
                 "phase": QuizPhase.SETUP,
             }
 
@@ -152,7 +230,7 @@ def create_graph():
         round_count = state.get("round_count", 0) + 1
         
         messages = get_teacher_question_prompt(difficulty, subject, round_count)
-        response = llm.invoke(messages)
+        response = invoke_llm("teacher_question", messages)
         
         formatted_msg = f"👨‍🏫 **Teacher (문제 #{round_count})**\n\n{response.content}"
         
@@ -169,7 +247,7 @@ def create_graph():
         difficulty = state.get("difficulty", "보통")
         
         messages = get_student_answer_prompt(question, difficulty)
-        response = llm.invoke(messages)
+        response = invoke_llm("student_answer", messages)
         
         formatted_msg = f"🧑‍🎓 **Student**\n\n{response.content}"
         
@@ -185,7 +263,7 @@ def create_graph():
         student_answer = state.get("student_answer", "")
         
         messages = get_teacher_evaluate_prompt(question, student_answer)
-        response = llm.invoke(messages)
+        response = invoke_llm("teacher_evaluate", messages)
         
         formatted_msg = f"👨‍🏫 **Teacher (평가)**\n\n{response.content}\n\n---\n💡 *다음 문제를 원하시면 '다음' 또는 '계속'을 입력하세요.*\n*새로운 설정을 원하시면 '새로 시작'을 입력하세요.*"
         
@@ -224,21 +302,24 @@ def create_graph():
 
 
 def get_teacher_question_prompt(difficulty: str, subject: str, round_count: int) -> list:
-    """Teacher 문제 출제 프롬프트 생성 (YAML에서 로드)"""
+    """Teacher 문제 출제 프롬프트 생성 (YAML에서 로드)
+
+    고정 system prefix + 변수는 마지막 user 메시지 → 요청 간 prefix가 같아 프롬프트 캐시 적중
+    """
     prompts = load_prompts()
-    teacher_prompt = prompts["teacher_question"].format(
+    request = prompts["teacher_question_request"].format(
         difficulty=difficulty,
         subject=subject,
         round_count=round_count,
     )
     return [
-        SystemMessage(content=teacher_prompt),
-        HumanMessage(content=f"{subject} 분야의 {difficulty} 난이도 문제를 출제해주세요.")
+        SystemMessage(content=prompts["teacher_question"]),
+        HumanMessage(content=request)
     ]
 
 
 def get_student_answer_prompt(question: str, difficulty: str) -> list:
-    """Student 답변 프롬프트 생성 (YAML에서 로드)"""
+    """Student 답변 프롬프트 생성 (YAML에서 로드, persona는 system 메시지 끝)"""
     prompts = load_prompts()
     persona = prompts["student_persona"].get(difficulty, "학생입니다.")
     student_prompt = prompts["student_answer"].format(persona=persona)
@@ -249,13 +330,13 @@ def get_student_answer_prompt(question: str, difficulty: str) -> list:
 
 
 def get_teacher_evaluate_prompt(question: str, student_answer: str) -> list:
-    """Teacher 평가 프롬프트 생성 (YAML에서 로드)"""
+    """Teacher 평가 프롬프트 생성 (YAML에서 로드, 문제/답변은 마지막 user 메시지)"""
     prompts = load_prompts()
-    eval_prompt = prompts["teacher_evaluate"].format(
+    request = prompts["teacher_evaluate_request"].format(
         question=question,
         student_answer=student_answer,
     )
     return [
-        SystemMessage(content=eval_prompt),
-        HumanMessage(content="학생의 답변을 평가해주세요.")
+        SystemMessage(content=prompts["teacher_evaluate"]),
+        HumanMessage(content=request)
     ]
@@ -0,0 +1,206 @@
+"""Hedged LLM 요청 - 첫 토큰이 늦으면 중복 요청을 보내 먼저 응답한 쪽을 사용
+
+- hedge 지연 = 역할(노드)별 최근 첫 토큰 지연시간의 백분위수 (HEDGE_PERCENTILE, 최소 HEDGE_MIN_DELAY)
+- 비용 상한: 호출마다 HEDGE_MAX_RATE 토큰이 쌓이는 버킷에서 hedge 1회당 1 토큰 사용 → 전체 호출 대비 hedge 비율 ≤ HEDGE_MAX_RATE
+- 먼저 첫 토큰을 받은 요청을 채택하고 나머지는 스트림을 닫아 취소
+- 노드는 동기 함수(스레드에서 실행)이므로 스레드 기반으로 구현
+  primary는 호출마다 전용 스레드, hedge는 HEDGE_MAX_WORKERS 크기 풀에서 실행 (첫 토큰 지연은 요청 시작 시점부터)
+  요청은 호출 스레드의 contextvars(OTel span, LangChain config)를 복사한 채 실행
+- 청크 없이 끝난 스트림은 실패로 취급해 다른 요청의 응답을 기다림
+- 첫 청크 전에 멈춘 요청은 닫을 스트림이 아직 없으므로 LLM 읽기 timeout(HEDGE_REQUEST_TIMEOUT)으로 스레드 점유 시간을 제한
+"""
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Optional
+
+from opentelemetry import metrics
+
+_meter = metrics.get_meter(__name__)
+hedge_calls_counter = _meter.create_counter(
+    "quiz.llm.hedge.calls", description="Node LLM calls eligible for hedging",
+)
+hedge_fired_counter = _meter.create_counter(
+    "quiz.llm.hedge.fired", description="Duplicate (hedge) requests sent",
+)
+hedge_wins_counter = _meter.create_counter(
+    "quiz.llm.hedge.wins", description="Hedge requests that delivered the first token before the primary",
+)
+first_token_histogram = _meter.create_histogram(
+    "quiz.llm.first_token.duration", unit="s",
+    description="Time to first token seen by the node, by hedge outcome (p99 비교용)",
+)
+
+BUCKET_CAPACITY = 10.0  # 연속 hedge 허용 상한
+
+
+class LatencyTracker:
+    """역할별 최근 첫 토큰 지연시간 → 백분위수 기반 hedge 지연"""
+
+    def __init__(self, percentile: float, min_delay: float, window: int = 200, min_samples: int = 20):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, role: str, latency: float):
+        with self._lock:
+            self._samples.setdefault(role, deque(maxlen=self.window)).append(latency)
+
+    def delay(self, role: str) -> float:
+        with self._lock:
+            samples = sorted(self._samples.get(role, ()))
+        if len(samples) < self.min_samples:
+            return self.min_delay
+        index = min(len(samples) - 1, int(len(samples) * self.percentile / 100))
+        return max(self.min_delay, samples[index])
+
+
+class HedgeBudget:
+    """호출당 max_rate 토큰 적립, hedge 1회당 1 토큰 사용"""
+
+    def __init__(self, max_rate: float):
+        self.max_rate = max_rate
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+
+    def on_call(self):
+        with self._lock:
+            self._tokens = min(BUCKET_CAPACITY, self._tokens + self.max_rate)
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+
+class _StreamRun:
+    """스트림 하나를 끝까지 모아 보관, 첫 청크 도착 / 종료 시 signal"""
+
+    def __init__(self, stream_fn: Callable[[], Iterable], signal: threading.Event):
+        self.stream_fn = stream_fn
+        self.signal = signal
+        self.first_token = threading.Event()
+        self.cancelled = threading.Event()
+        self.done = threading.Event()
+        self.started: Optional[float] = None
+        self.first_token_latency: Optional[float] = None
+        self.failed = False
+        self._result = None
+        self._error: Optional[BaseException] = None
+
+    def run(self):
+        stream = None
+        try:
+            if self.cancelled.is_set():
+                return  # 대기 중에 승부가 난 hedge는 요청을 보내지 않음
+            self.started = time.perf_counter()  # 스레드 풀 대기 시간은 첫 토큰 지연에서 제외
+            stream = self.stream_fn()
+            for chunk in stream:
+                if self.cancelled.is_set():
+                    break
+                if not self.first_token.is_set():
+                    self.first_token_latency = time.perf_counter() - self.started
+                    self._notify()
+                self._result = chunk if self._result is None else self._result + chunk
+        except Exception as e:
+            self._error = e
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()  # 취소된 쪽은 HTTP 스트림을 닫아 생성 중단
+            # 오류 / 청크 없이 끝난 스트림은 실패로 취급 (다른 요청이 응답할 수 있으면 그쪽을 채택)
+            self.failed = self._error is not None or self.first_token_latency is None
+            self.done.set()
+            self._notify()  # 오류/빈 응답이어도 대기 해제
+
+    def result(self):
+        """run() 종료까지 기다려 합친 청크 반환 (오류면 raise)"""
+        self.done.wait()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+    def _notify(self):
+        self.first_token.set()
+        self.signal.set()
+
+
+class Hedger:
+    def __init__(self, enabled: bool, percentile: float, min_delay: float, max_rate: float, max_workers: int = 32):
+        self.enabled = enabled
+        self.tracker = LatencyTracker(percentile, min_delay)
+        self.budget = HedgeBudget(max_rate)
+        # hedge 요청 전용 풀 (primary는 호출마다 전용 스레드라 이 풀에서 대기하지 않음)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-hedge")
+
+    def invoke(self, role: str, stream_fn: Callable[[], Iterable]):
+        """stream_fn()이 반환하는 청크를 합쳐 반환 (필요 시 hedge)"""
+        if not self.enabled:
+            run = _StreamRun(stream_fn, threading.Event())
+            run.run()
+            self._record(role, run.first_token_latency, "off")
+            return run.result()
+
+        self.budget.on_call()
+        hedge_calls_counter.add(1, {"quiz.node": role})
+        signal = threading.Event()
+        primary = _StreamRun(stream_fn, signal)
+        # primary는 바로 시작 - 호출 스레드는 primary가 첫 청크 전에 멈춰도 hedge 결과를 반환할 수 있도록 대기만 함
+        threading.Thread(target=contextvars.copy_context().run, args=(primary.run,),
+                         name="llm-primary", daemon=True).start()
+
+        if primary.first_token.wait(self.tracker.delay(role)):
+            result = primary.result()
+            self.tracker.observe(role, primary.first_token_latency or 0.0)
+            self._record(role, primary.first_token_latency, "not_needed")
+            return result
+
+        if not self.budget.try_acquire():
+            result = primary.result()
+            self.tracker.observe(role, primary.first_token_latency or 0.0)
+            self._record(role, primary.first_token_latency, "budget_exhausted")
+            return result
+
+        hedge_fired_counter.add(1, {"quiz.node": role})
+        hedge = _StreamRun(stream_fn, signal)
+        # 요청마다 context 복사본 (같은 Context는 두 스레드에서 동시에 run 불가)
+        self._executor.submit(contextvars.copy_context().run, hedge.run)
+
+        winner = self._await_winner([primary, hedge], signal)
+        loser = hedge if winner is primary else primary
+        loser.cancelled.set()
+        result = winner.result()
+
+        if winner.failed:
+            return result  # 둘 다 실패: primary 예외가 위에서 raise → router failover (빈 응답이면 None)
+        outcome = "hedge_won" if winner is hedge else "primary_won"
+        if winner is hedge:
+            hedge_wins_counter.add(1, {"quiz.node": role})
+        # 사용자가 체감한 첫 토큰 지연 = primary 시작 시점 기준
+        latency = (winner.started - primary.started) + winner.first_token_latency
+        self.tracker.observe(role, winner.first_token_latency)
+        self._record(role, latency, outcome)
+        return result
+
+    @staticmethod
+    def _await_winner(runs: list[_StreamRun], signal: threading.Event) -> _StreamRun:
+        """먼저 실제 청크를 받은 요청 (동시면 앞쪽), 한쪽이 실패 / 빈 응답이면 다른 쪽을 기다림"""
+        while True:
+            signal.wait()
+            signal.clear()
+            for run in runs:
+                if run.first_token_latency is not None and not run.failed:
+                    return run
+            if all(run.done.is_set() and run.failed for run in runs):
+                return runs[0]
+
+    def _record(self, role: str, latency: Optional[float], outcome: str):
+        if latency is not None:
+            first_token_histogram.record(latency, {"quiz.node": role, "quiz.llm.hedge.outcome": outcome})
@@ -1,24 +1,25 @@
 """FastAPI Chat Agent with LangGraph - Teacher-Student Quiz System"""
 import asyncio
-import json
+import hmac
 import os
+import signal
+import socket
+import threading
 import time
 from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Optional, AsyncGenerator
 from uuid import uuid4
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, StreamingResponse
-from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, ValidationError
 
 from opentelemetry import trace, metrics
 from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
-from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
-from opentelemetry.sdk.resources import Resource, SERVICE_NAME
+from opentelemetry.sdk.resources import Resource, SERVICE_NAME, SERVICE_INSTANCE_ID
 from opentelemetry.instrumentation.langchain import LangchainInstrumentor
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 from opentelemetry.instrumentation.openai import OpenAIInstrumentor
@@ -26,22 +27,75 @@ from opentelemetry.instrumentation.system_metrics import SystemMetricsInstrument
 from opentelemetry.instrumentation.urllib3 import URLLib3Instrumentor
 from opentelemetry.sdk.metrics import MeterProvider
 from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
-from opentelemetry.exporter.otlp.proto.grpc.metric_exporter import OTLPMetricExporter
 
 from langchain_core.messages import HumanMessage
 
 import sys
 sys.path.insert(0, str(Path(__file__).parent.parent))
-from config import AZURE_OPENAI_ENDPOINT, AZURE_OPENAI_DEPLOYMENT_NAME, OTEL_EXPORTER_OTLP_ENDPOINT
-from .graph import create_graph, QuizPhase
+from config import (
+    AZURE_OPENAI_ENDPOINT,
+    AZURE_OPENAI_DEPLOYMENT_NAME,
+    GRACEFUL_SHUTDOWN_TIMEOUT,
+    OTLP_EXPORT_TIMEOUT,
+    GRAPH_DURABILITY,
+    ADMIN_TOKEN,
+    PROFILE_SAMPLE_RATE,
+    PROFILE_INTERVAL,
+    PROFILE_MAX_SECONDS,
+    MEMORY_TRACEMALLOC_FRAMES,
+    METRICS_VIEWS,
+    METRICS_TEMPORALITY,
+    METRICS_EXEMPLARS,
+    METRICS_EXPORT_INTERVAL,
+    WS_IDLE_TIMEOUT,
+    WS_SEND_TIMEOUT,
+)
+from otel_export import batch_span_processor, describe as describe_otlp, metric_exporter
+from .graph import create_graph, memory, streaming_callbacks, QuizPhase, GUIDE_MESSAGE, starts_quiz
+from .coalescing import SessionSingleFlight
+from .diagnostics import (
+    ObjectCensus,
+    TracemallocNotRunningError,
+    TracemallocTracker,
+    checkpointer_usage,
+    component_sizes,
+    dict_store_usage,
+    llm_cache_usage,
+    register_component,
+    register_memory_gauges,
+    rss_bytes,
+    span_queue_usage,
+    top_sessions,
+)
+from .metric_views import exemplar_filter, metric_views, preferred_temporality
+from .profiling import ProfileBusyError, profile_for, sampled_request_profile
+from .serialization import dumps, sse_event, ws_event, stream_format, StreamFormat
+from .assets import (
+    Asset,
+    StaticAssetStore,
+    TemplateCache,
+    etag_matches,
+    IMMUTABLE_CACHE_CONTROL,
+    REVALIDATE_CACHE_CONTROL,
+)
 
 # === Globals ===
 graph = None
 tracer = None
+request_counter = None
+span_processor = None  # 메모리 진단용 (span export 대기 큐 크기)
+active_streams = 0  # 전송 중인 SSE 응답 / WebSocket 턴 수 (graceful drain 대상)
 session_states: dict = {}  # {session_id: {"state": ..., "last_accessed": timestamp}}
+single_flight = SessionSingleFlight()  # 세션별 중복 요청 병합 + 순차 실행
+static_assets = StaticAssetStore(Path(__file__).parent.parent / "static")
+index_template = TemplateCache(Path(__file__).parent.parent / "templates" / "index.html", static_assets)
+tracemalloc_tracker = TracemallocTracker()
+object_census = ObjectCensus()
 
 # === Constants ===
 SESSION_TTL_SECONDS = 3600  # 1시간 미사용 세션 정리
+GZIP_MIN_SIZE = 500  # JSON 응답 gzip 최소 크기 (bytes)
+GZIP_EXCLUDED_PATHS = ("/chat/stream", "/static", "/")  # SSE는 버퍼링 방지, 정적 자원/HTML은 사전 압축본 사용
 RESET_KEYWORDS = ["새로", "리셋", "reset", "다시", "처음"]
 NEXT_KEYWORDS = ["다음", "계속", "next", "continue", "더"]
 NODE_LABELS = {
@@ -49,17 +103,31 @@ NODE_LABELS = {
     "student_answer": "🧑‍🎓 Student",
     "teacher_evaluate": "👨‍🏫 Teacher (평가)",
 }
+SSE_FORMAT = stream_format(sse_event, NODE_LABELS)
+WS_FORMAT = stream_format(ws_event, NODE_LABELS)  # /chat/ws 바이너리 프레임
+SSE_HEADERS = {"Cache-Control": "no-cache", "Connection": "keep-alive", "X-Accel-Buffering": "no"}
 
 
 # === Models ===
+class SessionSnapshot(BaseModel):
+    """클라이언트가 보관/재전송하는 세션 상태 (멀티 워커에서 다른 워커로 가도 이어서 진행)"""
+    phase: QuizPhase = QuizPhase.SETUP
+    difficulty: Optional[str] = None
+    subject: Optional[str] = None
+    round_count: int = 0
+
+
 class ChatRequest(BaseModel):
     message: str
     session_id: Optional[str] = None
+    session_state: Optional[SessionSnapshot] = None
 
 
 class ChatResponse(BaseModel):
     response: str
     session_id: str
+    coalesced: bool = False  # 실행 중인 동일 요청에 합류했는지 여부
+    session_state: Optional[SessionSnapshot] = None
 
 
 # === Helpers ===
@@ -67,8 +135,11 @@ def get_initial_state() -> dict:
     return {"phase": QuizPhase.SETUP, "difficulty": None, "subject": None, "round_count": 0}
 
 
-def get_session(session_id: str) -> tuple[str, dict]:
-    """세션 ID와 상태 반환 (없으면 생성), 오래된 세션 정리"""
+def get_session(session_id: str, snapshot: Optional[SessionSnapshot] = None) -> tuple[str, dict]:
+    """세션 ID와 상태 반환 (없으면 생성), 오래된 세션 정리
+
+    이 워커가 모르는 세션이면 클라이언트가 보낸 snapshot으로 복원 (워커 간 공유 상태 없음)
+    """
     # 오래된 세션 정리
     now = time.time()
     expired = [k for k, v in session_states.items() if now - v.get("last_accessed", 0) > SESSION_TTL_SECONDS]
@@ -77,18 +148,24 @@ def get_session(session_id: str) -> tuple[str, dict]:
 
     sid = session_id or str(uuid4())
     if sid not in session_states:
-        session_states[sid] = {**get_initial_state(), "last_accessed": now}
+        initial = snapshot.model_dump() if snapshot else get_initial_state()
+        session_states[sid] = {**initial, "last_accessed": now}
     else:
         session_states[sid]["last_accessed"] = now
     return sid, session_states[sid]
 
 
+def is_reset_command(user_input: str) -> bool:
+    lower_input = user_input.lower()
+    return any(kw in lower_input for kw in RESET_KEYWORDS)
+
+
 def process_commands(user_input: str, state: dict) -> str:
     """리셋/다음 명령 처리 후 phase 반환"""
     phase = state.get("phase", QuizPhase.SETUP)
     lower_input = user_input.lower()
     
-    if any(kw in lower_input for kw in RESET_KEYWORDS):
+    if is_reset_command(user_input):
         state.update(get_initial_state())
         return QuizPhase.SETUP
     
@@ -99,6 +176,46 @@ def process_commands(user_input: str, state: dict) -> str:
     return phase
 
 
+def try_setup_fast_path(session_id: str, user_input: str) -> Optional[dict]:
+    """퀴즈를 시작할 수 없는 setup 턴이면 그래프 없이 처리하고 snapshot 반환, 아니면 None
+
+    그래프의 setup → END 경로와 같은 결과 (안내 메시지, phase=setup)를 체크포인터 없이 만든다.
+    세션에 대기/실행 중인 run이 있으면 순서를 지키도록 그래프 경로로 보낸다.
+    안내 턴은 체크포인트의 대화 기록에 남지 않는다 (이후 턴의 프롬프트는 대화 기록을 쓰지 않음).
+    """
+    if single_flight.busy(session_id):
+        return None
+    _, state = get_session(session_id)
+    reset = is_reset_command(user_input)
+    difficulty, subject = (None, None) if reset else (state.get("difficulty"), state.get("subject"))
+    if starts_quiz(user_input, difficulty, subject):
+        return None
+    
+    if reset:
+        state.update(get_initial_state())
+    state["phase"] = QuizPhase.SETUP
+    return session_snapshot(session_id)
+
+
+def setup_guide_events(session_id: str, snapshot: dict, fmt: StreamFormat = SSE_FORMAT) -> list[bytes]:
+    """setup 안내 턴의 이벤트 전체 (세션별 값 외에는 사전 인코딩된 이벤트)"""
+    guide_event, initial_state_event = SETUP_GUIDE_EVENTS[fmt.encode]
+    state_event = initial_state_event if snapshot == get_initial_state() else fmt.encode(
+        {"type": "state", "session_state": snapshot}
+    )
+    return [
+        fmt.encode({"type": "session", "session_id": session_id, "coalesced": False}),
+        guide_event,
+        state_event,
+        fmt.done,
+    ]
+
+
+def setup_guide_body(session_id: str, snapshot: dict) -> bytes:
+    """setup 안내 턴의 SSE 응답 전체"""
+    return b"".join(setup_guide_events(session_id, snapshot))
+
+
 def build_invoke_state(user_input: str, phase: str, state: dict) -> dict:
     return {
         "messages": [HumanMessage(content=user_input)],
@@ -110,6 +227,16 @@ def build_invoke_state(user_input: str, phase: str, state: dict) -> dict:
     }
 
 
+# 형식별 (안내 메시지, 초기 상태) 이벤트
+SETUP_GUIDE_EVENTS = {
+    fmt.encode: (
+        fmt.encode({"type": "message", "node": "setup", "content": GUIDE_MESSAGE}),
+        fmt.encode({"type": "state", "session_state": get_initial_state()}),
+    )
+    for fmt in (SSE_FORMAT, WS_FORMAT)
+}
+
+
 def update_session_from_result(session_id: str, result: dict):
     session_states[session_id] = {
         "phase": result.get("phase", QuizPhase.SETUP),
@@ -120,6 +247,11 @@ def update_session_from_result(session_id: str, result: dict):
     }
 
 
+def session_snapshot(session_id: str) -> dict:
+    state = session_states.get(session_id) or get_initial_state()
+    return {key: state.get(key) for key in ("phase", "difficulty", "subject", "round_count")}
+
+
 def extract_responses(result: dict) -> str:
     responses = [
         msg.content for msg in result.get("messages", [])
@@ -128,73 +260,220 @@ def extract_responses(result: dict) -> str:
     return "\n\n".join(responses) if responses else "응답을 생성할 수 없습니다."
 
 
-def sse_event(data: dict) -> str:
-    return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+def asset_response(request: Request, asset: Asset, cache_control: str) -> Response:
+    """사전 계산된 자원 응답 (ETag 재검증 → 304, Accept-Encoding 협상)"""
+    headers = {"Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), asset):
+        headers["ETag"] = asset.etag()
+        return Response(status_code=304, headers=headers)
+    
+    body, encoding = asset.negotiate(request.headers.get("accept-encoding", ""))
+    headers["ETag"] = asset.etag(encoding)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=asset.media_type, headers=headers)
+
+
+class FastJSONResponse(JSONResponse):
+    """API 응답 JSON 직렬화 (orjson 우선, stdlib fallback)"""
+    
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+class JSONGZipMiddleware:
+    """GZipMiddleware를 제외 경로(SSE, 사전 압축 자원) 밖에서만 적용"""
+    
+    def __init__(self, app, minimum_size: int = GZIP_MIN_SIZE, excluded_paths: tuple = GZIP_EXCLUDED_PATHS):
+        self.app = app
+        self.gzip_app = GZipMiddleware(app, minimum_size=minimum_size)
+        self.excluded_paths = excluded_paths
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and not self._excluded(scope["path"]):
+            await self.gzip_app(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+    
+    def _excluded(self, path: str) -> bool:
+        return any(path == p or path.startswith(p + "/") for p in self.excluded_paths)
+
+
+def record_request_outcome(endpoint: str, session_id: str, outcome: str):
+    """요청 처리 방식 (executed / coalesced / fast_path)을 span/메트릭에 기록"""
+    span = trace.get_current_span()
+    span.set_attribute("quiz.request.outcome", outcome)
+    span.set_attribute("langfuse.session.id", session_id)
+    if request_counter is not None:
+        request_counter.add(1, {"endpoint": endpoint, "outcome": outcome})
+
+
+def require_admin(request: Request):
+    """ADMIN_TOKEN Bearer 인증 (미설정이면 관리자 엔드포인트 자체가 없는 것처럼 404)"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(404, "Not Found")
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(401, "Unauthorized", headers={"WWW-Authenticate": "Bearer"})
+
+
+def register_memory_components():
+    """/admin/memory 및 quiz.memory.component.* gauge 대상 (워커 내 상태 저장소)"""
+    register_component("session_store", lambda: dict_store_usage(session_states))
+    register_component("checkpointer", lambda: checkpointer_usage(memory, session_states))
+    register_component("streaming_callbacks", lambda: {"items": len(streaming_callbacks)})
+    register_component("single_flight", lambda: {"items": single_flight.in_flight()})
+    register_component("span_export_queue", lambda: span_queue_usage(span_processor))
+    register_component("llm_cache", llm_cache_usage)
 
 
 # === OpenTelemetry Setup ===
 def setup_opentelemetry():
-    global tracer
+    """워커 프로세스마다 lifespan에서 호출 (fork/spawn 이후 초기화, exporter 스레드 공유 없음)"""
+    global tracer, request_counter, span_processor
     os.environ.setdefault("OTEL_ATTRIBUTE_VALUE_LENGTH_LIMIT", "65535")
     
-    resource = Resource.create({SERVICE_NAME: "teacher-student-quiz"})
+    # 워커별 instance id → 멀티 워커에서 메트릭 시계열이 서로 덮어쓰지 않음
+    resource = Resource.create({
+        SERVICE_NAME: "teacher-student-quiz",
+        SERVICE_INSTANCE_ID: f"{socket.gethostname()}-{os.getpid()}",
+    })
     
     # Traces
     trace_provider = TracerProvider(resource=resource)
-    trace_provider.add_span_processor(BatchSpanProcessor(
-        OTLPSpanExporter(endpoint=OTEL_EXPORTER_OTLP_ENDPOINT, insecure=True)
-    ))
+    span_processor = batch_span_processor()  # 프로토콜 / 압축 / 큐 크기: otel_export.py
+    trace_provider.add_span_processor(span_processor)
     trace.set_tracer_provider(trace_provider)
     LangchainInstrumentor().instrument()
     OpenAIInstrumentor().instrument()
     tracer = trace.get_tracer(__name__)
     
-    # Metrics
+    # Metrics (view / temporality / exemplar: app/metric_views.py)
     metric_reader = PeriodicExportingMetricReader(
-        OTLPMetricExporter(endpoint=OTEL_EXPORTER_OTLP_ENDPOINT, insecure=True),
-        export_interval_millis=15000,
+        metric_exporter(preferred_temporality=preferred_temporality()),  # span exporter와 같은 채널
+        export_interval_millis=METRICS_EXPORT_INTERVAL * 1000,
+    )
+    meter_provider = MeterProvider(
+        resource=resource, metric_readers=[metric_reader],
+        views=metric_views(), exemplar_filter=exemplar_filter(),
     )
-    meter_provider = MeterProvider(resource=resource, metric_readers=[metric_reader])
     metrics.set_meter_provider(meter_provider)
+    meter = metrics.get_meter(__name__)
+    request_counter = meter.create_counter(
+        "quiz.chat.requests",
+        description="Chat requests by outcome (executed / coalesced / fast_path)",
+    )
+    register_memory_gauges(meter)
     
     # Auto-instrumentation (metrics)
     SystemMetricsInstrumentor().instrument()
     URLLib3Instrumentor().instrument()
     
-    print(f"✅ OpenTelemetry (traces + metrics) → {OTEL_EXPORTER_OTLP_ENDPOINT}")
+    print(f"✅ OpenTelemetry (traces + metrics) → {describe_otlp()} "
+          f"(views: {METRICS_VIEWS}, temporality: {METRICS_TEMPORALITY}, exemplars: {METRICS_EXEMPLARS})")
     return tracer
 
 
+async def drain_active_streams(timeout: float) -> bool:
+    """실행 중인 그래프 run과 SSE 응답이 끝날 때까지 대기 (timeout 초과 시 False)"""
+    deadline = time.monotonic() + timeout
+    drained = await single_flight.drain(timeout)
+    while active_streams and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+    return drained and not active_streams
+
+
+def install_drain_on_signal():
+    """SIGTERM / SIGINT → 진행 중인 스트림을 drain한 뒤 uvicorn 종료 처리에 전달
+
+    uvicorn은 신호를 받으면 연결을 닫고 (WebSocket은 바로 1012) timeout_graceful_shutdown 뒤 task를 취소한 다음에야
+    lifespan 종료를 실행하므로, drain은 그 전에 신호 단계에서 한다. 두 번째 신호는 바로 전달 (강제 종료).
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return  # 스레드에서 띄운 서버 (벤치마크 등) - 신호 처리 없음
+    loop = asyncio.get_running_loop()
+    draining = False
+
+    async def drain_then_exit(previous, signum: int):
+        if not await drain_active_streams(GRACEFUL_SHUTDOWN_TIMEOUT):
+            print(f"⚠️ Drain timed out after {GRACEFUL_SHUTDOWN_TIMEOUT}s (in-flight runs: {single_flight.in_flight()})")
+        previous(signum, None)
+
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        previous = signal.getsignal(sig)
+        if not callable(previous):
+            continue
+
+        def handler(signum, frame, previous=previous):
+            nonlocal draining
+            if draining:
+                previous(signum, frame)
+                return
+            draining = True
+            print(f"Draining active streams (up to {GRACEFUL_SHUTDOWN_TIMEOUT}s)...")
+            loop.call_soon_threadsafe(loop.create_task, drain_then_exit(previous, signum))
+
+        signal.signal(sig, handler)
+
+
+def _remaining_ms(deadline: float) -> float:
+    return max(0.0, (deadline - time.monotonic()) * 1000)
+
+
 # === App Lifecycle ===
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     global graph, tracer
+    if MEMORY_TRACEMALLOC_FRAMES > 0:
+        tracemalloc_tracker.start(MEMORY_TRACEMALLOC_FRAMES)
     tracer = setup_opentelemetry()
+    register_memory_components()
     graph = create_graph()
+    static_assets.load()
+    index_template.get()
     FastAPIInstrumentor.instrument_app(app, meter_provider=metrics.get_meter_provider())
     print(f"✅ LangGraph initialized: {AZURE_OPENAI_DEPLOYMENT_NAME}")
+    install_drain_on_signal()  # 진행 중인 스트림 drain은 신호 단계에서 (uvicorn이 연결을 닫기 전)
     yield
     print("Shutting down...")
+    # span/metric flush - 둘이 합쳐 OTLP_EXPORT_TIMEOUT 안에 (terminationGracePeriodSeconds 예산)
+    flush_deadline = time.monotonic() + OTLP_EXPORT_TIMEOUT
     trace_provider = trace.get_tracer_provider()
     if hasattr(trace_provider, 'force_flush'):
-        trace_provider.force_flush()
+        trace_provider.force_flush(_remaining_ms(flush_deadline))
         trace_provider.shutdown()
     meter_provider = metrics.get_meter_provider()
     if hasattr(meter_provider, 'force_flush'):
-        meter_provider.force_flush()
-        meter_provider.shutdown()
+        meter_provider.force_flush(_remaining_ms(flush_deadline))
+        meter_provider.shutdown(timeout_millis=_remaining_ms(flush_deadline))
 
 
 # === FastAPI App ===
-app = FastAPI(title="Teacher-Student Quiz", version="1.0.0", lifespan=lifespan)
-app.mount("/static", StaticFiles(directory=Path(__file__).parent.parent / "static"), name="static")
+app = FastAPI(
+    title="Teacher-Student Quiz",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
+)
+app.add_middleware(JSONGZipMiddleware)
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=False, allow_methods=["*"], allow_headers=["*"])
 
 
 # === Routes ===
 @app.get("/", response_class=HTMLResponse)
-async def root():
-    return (Path(__file__).parent.parent / "templates" / "index.html").read_text(encoding="utf-8")
+async def root(request: Request):
+    return asset_response(request, index_template.get(), REVALIDATE_CACHE_CONTROL)
+
+
+@app.api_route("/static/{path:path}", methods=["GET", "HEAD"])
+async def static(path: str, request: Request):
+    asset = static_assets.get(path)
+    if asset is None:
+        raise HTTPException(404, "Not Found")
+    # 콘텐츠 해시 URL(?v=<현재 해시>)만 immutable, 그 외는 ETag 재검증
+    if request.query_params.get("v") == asset.version:
+        return asset_response(request, asset, IMMUTABLE_CACHE_CONTROL)
+    return asset_response(request, asset, REVALIDATE_CACHE_CONTROL)
 
 
 @app.get("/health")
@@ -202,22 +481,108 @@ async def health():
     return {"status": "healthy", "graph_initialized": graph is not None}
 
 
+async def execute_chat(session_id: str, user_input: str) -> AsyncGenerator[tuple[str, dict], None]:
+    """그래프 실행 → 최종 응답 텍스트 (세션 락 안에서 실행)"""
+    _, state = get_session(session_id)
+    phase = process_commands(user_input, state)
+    
+    config = {"configurable": {"thread_id": session_id}}
+    invoke_state = build_invoke_state(user_input, phase, state)
+    
+    # 백그라운드 RunBroadcast task에서 실행되므로 이벤트 루프를 막지 않도록 ainvoke (동기 노드는 스레드에서 실행)
+    result = await graph.ainvoke(invoke_state, config=config, durability=GRAPH_DURABILITY)
+    update_session_from_result(session_id, result)
+    yield extract_responses(result), session_snapshot(session_id)
+
+
+async def execute_chat_stream(session_id: str, user_input: str, fmt: StreamFormat = SSE_FORMAT) -> AsyncGenerator[bytes, None]:
+    """그래프 스트리밍 실행 → SSE / WebSocket 이벤트 (세션 락 안에서 실행)"""
+    _, state = get_session(session_id)
+    phase = process_commands(user_input, state)
+    
+    config = {"configurable": {"thread_id": session_id}}
+    invoke_state = build_invoke_state(user_input, phase, state)
+    
+    with tracer.start_as_current_span("chat_stream") as span:
+        span.set_attribute("langfuse.trace.name", "langgraph-session")
+        span.set_attribute("langfuse.session.id", session_id)
+        span.set_attribute("langfuse.trace.input", user_input)
+        
+        final_output = ""
+        try:
+            async for event in graph.astream(
+                invoke_state, config=config, stream_mode="updates", durability=GRAPH_DURABILITY
+            ):
+                for node_name, node_output in event.items():
+                    if not isinstance(node_output, dict) or "messages" not in node_output:
+                        continue
+                    
+                    for msg in node_output["messages"]:
+                        if not (hasattr(msg, "content") and msg.content):
+                            continue
+                        
+                        content = msg.content
+                        final_output = content
+                        
+                        # 노드 라벨
+                        label = NODE_LABELS.get(node_name, node_name)
+                        if node_name == "teacher_question":
+                            state["round_count"] = state.get("round_count", 0) + 1
+                            label = f"👨‍🏫 Teacher (문제 #{state['round_count']})"
+                        
+                        # 이벤트 전송
+                        if node_name in NODE_LABELS:
+                            yield fmt.encode({"type": "node_start", "node": node_name, "label": label})
+                        
+                        yield fmt.encode({"type": "message", "node": node_name, "content": content})
+                        
+                        if node_name in fmt.node_end:
+                            yield fmt.node_end[node_name]
+                        
+                        # 대기 메시지
+                        if node_name in fmt.waiting:
+                            yield fmt.waiting[node_name]
+                        
+                        await asyncio.sleep(0.1)
+        except Exception as e:
+            yield fmt.encode({"type": "error", "message": str(e)})
+        
+        if final_output:
+            span.set_attribute("langfuse.trace.output", final_output[:10000])
+    
+    # 최종 상태 저장 (astream 종료 시 durability 모드와 무관하게 마지막 체크포인트까지 저장 완료)
+    final_state = graph.get_state(config)
+    if final_state and final_state.values:
+        update_session_from_result(session_id, final_state.values)
+    
+    yield fmt.encode({"type": "state", "session_state": session_snapshot(session_id)})
+    yield fmt.done
+
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
     if not graph:
         raise HTTPException(503, "Agent not initialized")
     
-    session_id, state = get_session(request.session_id)
+    session_id, _ = get_session(request.session_id, request.session_state)
     user_input = request.message.strip()
-    phase = process_commands(user_input, state)
     
-    config = {"configurable": {"thread_id": session_id}}
-    invoke_state = build_invoke_state(user_input, phase, state)
+    snapshot = try_setup_fast_path(session_id, user_input)
+    if snapshot is not None:
+        record_request_outcome("/chat", session_id, "fast_path")
+        return ChatResponse(response=GUIDE_MESSAGE, session_id=session_id, session_state=snapshot)
     
-    result = graph.invoke(invoke_state, config=config)
-    update_session_from_result(session_id, result)
+    run, coalesced = single_flight.submit(
+        session_id, "invoke", user_input, lambda: execute_chat(session_id, user_input)
+    )
+    record_request_outcome("/chat", session_id, "coalesced" if coalesced else "executed")
     
-    return ChatResponse(response=extract_responses(result), session_id=session_id)
+    response, snapshot = "", None
+    # PROFILE_SAMPLE_RATE 비율의 요청만 샘플링 → hot frame 요약을 요청 span에 기록
+    with sampled_request_profile(trace.get_current_span(), PROFILE_SAMPLE_RATE, PROFILE_INTERVAL):
+        async for response, snapshot in run.subscribe():
+            pass
+    return ChatResponse(response=response, session_id=session_id, coalesced=coalesced, session_state=snapshot)
 
 
 @app.post("/chat/stream")
@@ -225,77 +590,173 @@ async def chat_stream(request: ChatRequest):
     if not graph:
         raise HTTPException(503, "Agent not initialized")
     
-    async def generate() -> AsyncGenerator[str, None]:
-        session_id, state = get_session(request.session_id)
-        user_input = request.message.strip()
-        phase = process_commands(user_input, state)
-        
-        yield sse_event({"type": "session", "session_id": session_id})
-        
-        config = {"configurable": {"thread_id": session_id}}
-        invoke_state = build_invoke_state(user_input, phase, state)
-        
-        with tracer.start_as_current_span("chat_stream") as span:
-            span.set_attribute("langfuse.trace.name", "langgraph-session")
-            span.set_attribute("langfuse.session.id", session_id)
-            span.set_attribute("langfuse.trace.input", user_input)
-            
-            final_output = ""
-            try:
-                async for event in graph.astream(invoke_state, config=config, stream_mode="updates"):
-                    for node_name, node_output in event.items():
-                        if not isinstance(node_output, dict) or "messages" not in node_output:
-                            continue
-                        
-                        for msg in node_output["messages"]:
-                            if not (hasattr(msg, "content") and msg.content):
-                                continue
-                            
-                            content = msg.content
-                            final_output = content
-                            
-                            # 노드 라벨
-                            label = NODE_LABELS.get(node_name, node_name)
-                            if node_name == "teacher_question":
-                                state["round_count"] = state.get("round_count", 0) + 1
-                                label = f"👨‍🏫 Teacher (문제 #{state['round_count']})"
-                            
-                            # SSE 이벤트 전송
-                            if node_name in NODE_LABELS:
-                                yield sse_event({"type": "node_start", "node": node_name, "label": label})
-                            
-                            yield sse_event({"type": "message", "node": node_name, "content": content})
-                            
-                            if node_name in NODE_LABELS:
-                                yield sse_event({"type": "node_end", "node": node_name})
-                            
-                            # 대기 메시지
-                            waiting_msgs = {
-                                "teacher_question": "🧑‍🎓 Student가 생각 중...",
-                                "student_answer": "👨‍🏫 Teacher가 평가 중...",
-                            }
-                            if node_name in waiting_msgs:
-                                yield sse_event({"type": "waiting", "message": waiting_msgs[node_name]})
-                            
-                            await asyncio.sleep(0.1)
-            except Exception as e:
-                yield sse_event({"type": "error", "message": str(e)})
-            
-            if final_output:
-                span.set_attribute("langfuse.trace.output", final_output[:10000])
-        
-        # 최종 상태 저장
-        final_state = graph.get_state(config)
-        if final_state and final_state.values:
-            update_session_from_result(session_id, final_state.values)
-        
-        yield sse_event({"type": "done"})
+    session_id, _ = get_session(request.session_id, request.session_state)
+    user_input = request.message.strip()
     
-    return StreamingResponse(
-        generate(),
-        media_type="text/event-stream",
-        headers={"Cache-Control": "no-cache", "Connection": "keep-alive", "X-Accel-Buffering": "no"},
+    # 퀴즈를 시작할 수 없는 setup 턴 (첫 방문 안내 등)은 그래프 없이 사전 인코딩된 응답
+    snapshot = try_setup_fast_path(session_id, user_input)
+    if snapshot is not None:
+        record_request_outcome("/chat/stream", session_id, "fast_path")
+        return Response(content=setup_guide_body(session_id, snapshot), media_type="text/event-stream", headers=SSE_HEADERS)
+    
+    # 같은 세션의 동일 요청(더블클릭/재시도)은 실행 중인 run에 합류, 다른 메시지는 순차 실행
+    run, coalesced = single_flight.submit(
+        session_id, "stream", user_input, lambda: execute_chat_stream(session_id, user_input)
+    )
+    record_request_outcome("/chat/stream", session_id, "coalesced" if coalesced else "executed")
+    
+    async def generate() -> AsyncGenerator[bytes, None]:
+        global active_streams
+        active_streams += 1
+        try:
+            yield sse_event({"type": "session", "session_id": session_id, "coalesced": coalesced})
+            async for event in run.subscribe():
+                yield event
+        finally:
+            active_streams -= 1
+    
+    return StreamingResponse(generate(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+async def send_frames(websocket: WebSocket, frames) -> None:
+    """바이너리 프레임 전송 - 클라이언트가 읽는 속도에 맞춰 대기 (한 프레임이 WS_SEND_TIMEOUT을 넘으면 TimeoutError)"""
+    async for frame in frames:
+        await asyncio.wait_for(websocket.send_bytes(frame), WS_SEND_TIMEOUT)
+
+
+async def ws_turn_events(session_id: str, user_input: str) -> AsyncGenerator[bytes, None]:
+    """WebSocket 한 턴의 이벤트 (/chat/stream과 같은 fast path / single-flight, 형식만 WS_FORMAT)"""
+    global active_streams
+    snapshot = try_setup_fast_path(session_id, user_input)
+    if snapshot is not None:
+        record_request_outcome("/chat/ws", session_id, "fast_path")
+        for event in setup_guide_events(session_id, snapshot, WS_FORMAT):
+            yield event
+        return
+
+    run, coalesced = single_flight.submit(
+        session_id, "ws", user_input, lambda: execute_chat_stream(session_id, user_input, WS_FORMAT)
     )
+    record_request_outcome("/chat/ws", session_id, "coalesced" if coalesced else "executed")
+    active_streams += 1
+    try:
+        yield ws_event({"type": "session", "session_id": session_id, "coalesced": coalesced})
+        async for event in run.subscribe():
+            yield event
+    finally:
+        active_streams -= 1
+
+
+@app.websocket("/chat/ws")
+async def chat_ws(websocket: WebSocket, session_id: Optional[str] = None):
+    """세션당 연결 하나로 여러 턴 - 요청은 ChatRequest JSON 텍스트 프레임, 이벤트는 msgpack 바이너리 프레임
+
+    backpressure:
+    - 턴은 연결마다 순차 처리 (done을 보내기 전에는 다음 요청을 읽지 않으므로 서버 수신 큐 → TCP 윈도우 순으로 참)
+    - 이벤트는 전송이 끝나야 다음 이벤트를 보냄 (run은 백그라운드에서 계속, 느린 클라이언트는 자기 스트림만 느려짐)
+    - 한 프레임 전송이 WS_SEND_TIMEOUT, 요청 대기가 WS_IDLE_TIMEOUT을 넘으면 연결 종료
+    """
+    await websocket.accept()
+    try:
+        while True:
+            try:
+                message = await asyncio.wait_for(websocket.receive(), WS_IDLE_TIMEOUT)
+            except asyncio.TimeoutError:
+                await websocket.close(code=1000, reason="idle")
+                return
+            if message["type"] == "websocket.disconnect":
+                return
+            text = message.get("text")
+            if text is None:
+                # 바이너리 프레임 (receive_text는 KeyError → 1011) - 잘못된 요청과 같이 error + done
+                await websocket.send_bytes(ws_event({"type": "error", "message": "Chat requests must be text frames"}))
+                await websocket.send_bytes(WS_FORMAT.done)
+                continue
+            try:
+                request = ChatRequest.model_validate_json(text)
+            except ValidationError:
+                await websocket.send_bytes(ws_event({"type": "error", "message": "Invalid chat request"}))
+                await websocket.send_bytes(WS_FORMAT.done)
+                continue
+            if not graph:
+                await websocket.close(code=1011, reason="Agent not initialized")
+                return
+
+            session_id, _ = get_session(request.session_id or session_id, request.session_state)
+            with tracer.start_as_current_span("chat_ws.turn"):
+                await send_frames(websocket, ws_turn_events(session_id, request.message.strip()))
+    except asyncio.TimeoutError:
+        await websocket.close(code=1008, reason="Client is not reading")
+    except WebSocketDisconnect:
+        pass
+
+
+# === Admin (ADMIN_TOKEN 설정 시) ===
+@app.get("/admin/profile", dependencies=[Depends(require_admin)], response_class=PlainTextResponse)
+async def admin_profile(
+    seconds: float = Query(10.0, gt=0),
+    interval: float = Query(PROFILE_INTERVAL, ge=0.001, le=1.0),
+):
+    """이 워커를 seconds 동안 샘플링한 collapsed stack (flamegraph.pl / speedscope 입력)"""
+    if seconds > PROFILE_MAX_SECONDS:
+        raise HTTPException(422, f"seconds must be <= {PROFILE_MAX_SECONDS}")
+    try:
+        sampler = await asyncio.to_thread(profile_for, seconds, interval)
+    except ProfileBusyError as e:
+        raise HTTPException(409, str(e))
+    return PlainTextResponse(sampler.folded(), headers={
+        "X-Profile-Samples": str(sampler.samples),
+        "X-Profile-Worker": f"{socket.gethostname()}-{os.getpid()}",
+    })
+
+
+@app.get("/admin/memory", dependencies=[Depends(require_admin)])
+async def admin_memory():
+    """이 워커의 RSS / 컴포넌트별 크기 / tracemalloc 상태"""
+    return {
+        "worker": f"{socket.gethostname()}-{os.getpid()}",
+        "rss_bytes": rss_bytes(),
+        "components": await asyncio.to_thread(component_sizes),
+        "tracemalloc": tracemalloc_tracker.status(),
+    }
+
+
+@app.get("/admin/memory/sessions", dependencies=[Depends(require_admin)])
+async def admin_memory_sessions(top: int = Query(20, ge=1, le=1000)):
+    """체크포인트 bytes 상위 세션 (live=false면 세션 TTL 이후에도 체크포인터에 남은 thread)"""
+    return {"sessions": await asyncio.to_thread(top_sessions, memory, session_states, top)}
+
+
+@app.get("/admin/memory/objects", dependencies=[Depends(require_admin)])
+async def admin_memory_objects(top: int = Query(30, ge=1, le=500)):
+    """gc 추적 객체의 타입별 개수 (delta는 직전 호출 대비)"""
+    return await asyncio.to_thread(object_census.take, top)
+
+
+@app.post("/admin/memory/tracemalloc/start", dependencies=[Depends(require_admin)])
+async def admin_tracemalloc_start(frames: int = Query(1, ge=1, le=64)):
+    """할당 추적 시작 + baseline snapshot (추적 중 메모리/CPU 오버헤드 있음)"""
+    await asyncio.to_thread(tracemalloc_tracker.start, frames)
+    return tracemalloc_tracker.status()
+
+
+@app.post("/admin/memory/tracemalloc/stop", dependencies=[Depends(require_admin)])
+async def admin_tracemalloc_stop():
+    tracemalloc_tracker.stop()
+    return tracemalloc_tracker.status()
+
+
+@app.get("/admin/memory/tracemalloc", dependencies=[Depends(require_admin)])
+async def admin_tracemalloc_diff(
+    top: int = Query(20, ge=1, le=500),
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    reset: bool = False,
+):
+    """baseline snapshot 대비 할당 증가 상위 위치 (reset=true면 현재를 새 baseline으로)"""
+    try:
+        return await asyncio.to_thread(tracemalloc_tracker.diff, top, group_by, reset)
+    except TracemallocNotRunningError as e:
+        raise HTTPException(409, str(e))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,119 @@
+"""MeterProvider view / temporality / exemplar 설정
+
+FastAPI / urllib3 / system-metrics 계측은 기본 view로 모든 attribute 조합마다 시계열을 만든다
+(워커별 http.host, net.host.port, CPU 코어별 system.cpu.utilization, 네트워크 인터페이스별 system.network.* 등).
+collector 메모리와 Azure Monitor 수집량이 시계열 수에 비례하므로 METRICS_VIEWS=reduced(기본)면:
+- HTTP 계측은 ATTRIBUTE_KEYS에 있는 attribute만 유지 (나머지는 합쳐짐)
+- METRICS_DROP 패턴에 맞는 계측은 내보내지 않음 (다른 view보다 우선)
+- 지연 histogram은 METRICS_LATENCY_BUCKETS 경계 (기본 SDK 경계는 0 ~ 10000으로 초 단위 LLM 지연이 첫 몇 bucket에 몰림)
+
+METRICS_TEMPORALITY=delta면 collector가 누적 상태를 들고 있지 않아도 되고 (Azure Monitor는 delta를 그대로 받음),
+exemplar는 기록 시점의 활성 span(trace_id / span_id)을 histogram bucket에 붙여 Grafana에서 느린 bucket → trace로 이동할 수 있게 한다.
+"""
+from fnmatch import fnmatchcase
+from pathlib import Path
+import sys
+
+from opentelemetry.sdk.metrics import (
+    AlwaysOffExemplarFilter,
+    AlwaysOnExemplarFilter,
+    Counter,
+    Histogram,
+    ObservableCounter,
+    TraceBasedExemplarFilter,
+)
+from opentelemetry.sdk.metrics.export import AggregationTemporality
+from opentelemetry.sdk.metrics.view import DropAggregation, ExplicitBucketHistogramAggregation, View
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from config import (
+    METRICS_VIEWS,
+    METRICS_DROP,
+    METRICS_LATENCY_BUCKETS,
+    METRICS_TEMPORALITY,
+    METRICS_EXEMPLARS,
+)
+
+# 구 semconv(기본) + 새 semconv(OTEL_SEMCONV_STABILITY_OPT_IN=http) 이름을 함께 둔다
+_HTTP_SERVER_KEYS = frozenset({
+    "http.method", "http.status_code", "http.target",
+    "http.request.method", "http.response.status_code", "http.route", "error.type",
+})
+_HTTP_CLIENT_KEYS = frozenset({
+    "http.method", "http.status_code", "net.peer.name",
+    "http.request.method", "http.response.status_code", "server.address", "error.type",
+})
+
+# 계측 이름 → 유지할 attribute
+ATTRIBUTE_KEYS: dict[str, frozenset] = {
+    "http.server.duration": _HTTP_SERVER_KEYS,
+    "http.server.request.duration": _HTTP_SERVER_KEYS,
+    "http.server.request.size": _HTTP_SERVER_KEYS,
+    "http.server.response.size": _HTTP_SERVER_KEYS,
+    "http.server.request.body.size": _HTTP_SERVER_KEYS,
+    "http.server.response.body.size": _HTTP_SERVER_KEYS,
+    "http.server.active_requests": frozenset({"http.method", "http.request.method"}),
+    "http.client.duration": _HTTP_CLIENT_KEYS,
+    "http.client.request.duration": _HTTP_CLIENT_KEYS,
+    "system.cpu.time": frozenset({"state"}),  # 코어별 → 상태별 합계
+}
+
+# 지연 histogram → 단위 (ms 계측은 경계 × 1000)
+LATENCY_HISTOGRAMS: dict[str, str] = {
+    "http.server.duration": "ms",
+    "http.server.request.duration": "s",
+    "http.client.duration": "ms",
+    "http.client.request.duration": "s",
+    "gen_ai.client.operation.duration": "s",
+    "llm.deployment.duration": "s",
+    "quiz.llm.first_token.duration": "s",
+}
+
+_EXEMPLAR_FILTERS = {
+    "trace_based": TraceBasedExemplarFilter,
+    "always_on": AlwaysOnExemplarFilter,
+    "always_off": AlwaysOffExemplarFilter,
+}
+
+
+def latency_boundaries(unit: str, buckets: list[float] = METRICS_LATENCY_BUCKETS) -> list[float]:
+    return [b * 1000 for b in buckets] if unit == "ms" else list(buckets)
+
+
+def metric_views(mode: str = METRICS_VIEWS, drop: list[str] = METRICS_DROP,
+                 buckets: list[float] = METRICS_LATENCY_BUCKETS) -> list[View]:
+    """MeterProvider(views=...) - 계측 하나에 view 하나만 맞도록 (여러 view가 맞으면 같은 이름의 stream이 중복 export됨)"""
+    if mode == "default":
+        return []
+    views = [View(instrument_name=pattern, aggregation=DropAggregation()) for pattern in drop]
+
+    def dropped(name: str) -> bool:
+        return any(fnmatchcase(name, pattern) for pattern in drop)
+
+    for name in sorted(ATTRIBUTE_KEYS.keys() | LATENCY_HISTOGRAMS.keys()):
+        if dropped(name):
+            continue
+        kwargs = {}
+        if name in ATTRIBUTE_KEYS:
+            kwargs["attribute_keys"] = set(ATTRIBUTE_KEYS[name])
+        if name in LATENCY_HISTOGRAMS:
+            kwargs["aggregation"] = ExplicitBucketHistogramAggregation(
+                boundaries=latency_boundaries(LATENCY_HISTOGRAMS[name], buckets)
+            )
+        views.append(View(instrument_name=name, **kwargs))
+    return views
+
+
+def preferred_temporality(mode: str = METRICS_TEMPORALITY) -> dict:
+    """OTLPMetricExporter(preferred_temporality=...) - UpDownCounter / gauge는 항상 cumulative"""
+    if mode == "cumulative":
+        return {}
+    temporality = {Counter: AggregationTemporality.DELTA, Histogram: AggregationTemporality.DELTA}
+    if mode == "delta":
+        temporality[ObservableCounter] = AggregationTemporality.DELTA
+    return temporality
+
+
+def exemplar_filter(mode: str = METRICS_EXEMPLARS):
+    """MeterProvider(exemplar_filter=...) - explicit bucket histogram은 bucket마다 최근 exemplar 하나"""
+    return _EXEMPLAR_FILTERS[mode]()
@@ -0,0 +1,124 @@
+"""샘플링 CPU 프로파일러 - 관리자 프로파일 엔드포인트 / /chat 요청 샘플링
+
+- 별도 스레드가 interval마다 sys._current_frames()로 모든 스레드의 Python 스택을 수집
+- 결과는 collapsed stack("a;b;c 12") 형식 → flamegraph.pl / speedscope / inferno에서 바로 열림
+- 대기 중인 스택(이벤트 루프 select, 스레드 풀 대기 등)은 CPU를 쓰지 않으므로 제외
+- 측정 대상은 현재 워커 프로세스 하나 (멀티 워커면 요청을 받은 워커만)
+"""
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+# 스택의 마지막(leaf) 프레임이 이 함수면 대기 중인 스레드로 보고 제외
+IDLE_LEAF_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("base_events.py", "_run_once"),
+    ("profiling.py", "_run"),
+    ("profiling.py", "profile_for"),  # 관리자 프로파일 요청 스레드 (time.sleep)
+}
+MAX_STACK_DEPTH = 64
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """interval(초)마다 모든 스레드의 스택을 샘플링해 collapsed stack별 횟수 집계"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "StackSampler":
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> "StackSampler":
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                if not stack or (Path(stack[0].co_filename).name, stack[0].co_name) in IDLE_LEAF_FRAMES:
+                    continue
+                self.stacks[";".join(_frame_label(code) for code in reversed(stack))] += 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        """collapsed stack 형식 (flamegraph 입력)"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def hot_frames(self, top: int = 10) -> list[str]:
+        """self 시간(leaf 프레임) 기준 상위 프레임 "func (file:line) 12.5%" """
+        leaves: Counter = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        return [f"{frame} {count / total:.1%}" for frame, count in leaves.most_common(top)]
+
+
+class ProfileBusyError(RuntimeError):
+    """이미 관리자 프로파일이 실행 중"""
+
+
+_admin_lock = threading.Lock()
+_request_lock = threading.Lock()
+
+
+def profile_for(seconds: float, interval: float) -> StackSampler:
+    """seconds 동안 프로세스 전체 샘플링 (동시에 하나만, 블로킹 - 스레드에서 호출)"""
+    if not _admin_lock.acquire(blocking=False):
+        raise ProfileBusyError("A profile is already running in this worker")
+    try:
+        sampler = StackSampler(interval).start()
+        time.sleep(seconds)
+        return sampler.stop()
+    finally:
+        _admin_lock.release()
+
+
+@contextmanager
+def sampled_request_profile(span, rate: float, interval: float, top: int = 10) -> Iterator[None]:
+    """rate 확률로 블록 실행 동안 샘플링해 hot frame 요약을 span 속성으로 기록
+
+    동시에 하나의 요청만 프로파일링 (샘플러 스레드가 여럿 돌지 않도록).
+    프로세스 전체 스택을 보므로 같은 시간에 처리 중인 다른 요청의 프레임도 섞일 수 있다.
+    """
+    if rate <= 0 or random.random() >= rate or not _request_lock.acquire(blocking=False):
+        yield
+        return
+    sampler = StackSampler(interval).start()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        sampler.stop()
+        _request_lock.release()
+        span.set_attribute("quiz.profile.sampled", True)
+        span.set_attribute("quiz.profile.duration", time.perf_counter() - started)
+        span.set_attribute("quiz.profile.samples", sampler.samples)
+        span.set_attribute("quiz.profile.hot_frames", sampler.hot_frames(top))
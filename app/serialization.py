@@ -0,0 +1,154 @@
+"""직렬화 레이어 - SSE 이벤트 / WebSocket 바이너리 이벤트 / API 응답
+
+- orjson이 설치되어 있으면 사용, 없으면 stdlib json (동일한 compact/UTF-8 출력)
+- 모든 출력은 bytes (StreamingResponse / WebSocket에서 재인코딩 없음)
+- 내용이 고정된 이벤트(done, waiting, node_end)는 시작 시 한 번만 인코딩
+- WebSocket 이벤트는 msgpack 배열 [이벤트 코드, 필드...] (키 이름 없이 WS_EVENT_FIELDS 순서),
+  ormsgpack이 없으면 같은 바이트를 내는 순수 Python 인코더
+"""
+import json
+import struct
+from typing import Any, Callable, NamedTuple
+
+try:
+    import orjson  # Optional: 빠른 JSON 인코더
+except ImportError:
+    orjson = None
+
+try:
+    import ormsgpack  # langgraph-checkpoint 의존성
+except ImportError:
+    ormsgpack = None
+
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+
+
+if orjson is not None:
+    def dumps(obj: Any) -> bytes:
+        """obj → UTF-8 JSON bytes (non-ASCII 이스케이프 없음)"""
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+else:
+    def dumps(obj: Any) -> bytes:
+        """obj → UTF-8 JSON bytes (non-ASCII 이스케이프 없음)"""
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def sse_event(data: dict) -> bytes:
+    return b"data: " + dumps(data) + b"\n\n"
+
+
+# === 사전 인코딩된 고정 이벤트 ===
+WAITING_MESSAGES = {
+    "teacher_question": "🧑‍🎓 Student가 생각 중...",
+    "student_answer": "👨‍🏫 Teacher가 평가 중...",
+}
+
+
+def node_end_events(nodes, encode: Callable[[dict], bytes] = sse_event) -> dict[str, bytes]:
+    """노드별 node_end 이벤트 사전 인코딩"""
+    return {node: encode({"type": "node_end", "node": node}) for node in nodes}
+
+
+# === WebSocket 바이너리 이벤트 (templates/index.html의 decodeEvent와 같은 표) ===
+WS_EVENT_CODES = {
+    "session": 0, "node_start": 1, "message": 2, "token": 3, "node_end": 4,
+    "waiting": 5, "state": 6, "done": 7, "error": 8,
+}
+WS_EVENT_FIELDS = {
+    "session": ("session_id", "coalesced"),
+    "node_start": ("node", "label"),
+    "message": ("node", "content"),
+    "token": ("node", "content"),
+    "node_end": ("node",),
+    "waiting": ("message",),
+    "state": ("session_state",),
+    "done": (),
+    "error": ("message",),
+}
+
+
+def _pack(obj: Any, out: bytearray):
+    """msgpack 인코딩 (None / bool / int / float / str / list / dict만, ormsgpack과 같은 최소 길이 형식)"""
+    if obj is None:
+        out.append(0xC0)
+    elif obj is True or obj is False:
+        out.append(0xC3 if obj else 0xC2)
+    elif isinstance(obj, int):
+        if 0 <= obj < 0x80:
+            out.append(obj)
+        elif -32 <= obj < 0:
+            out.append(obj & 0xFF)
+        elif obj > 0:
+            for limit, code, fmt in ((0xFF, 0xCC, ">B"), (0xFFFF, 0xCD, ">H"), (0xFFFFFFFF, 0xCE, ">I")):
+                if obj <= limit:
+                    out += bytes([code]) + struct.pack(fmt, obj)
+                    break
+            else:
+                out += b"\xcf" + struct.pack(">Q", obj)
+        else:
+            for limit, code, fmt in ((0x80, 0xD0, ">b"), (0x8000, 0xD1, ">h"), (0x80000000, 0xD2, ">i")):
+                if obj >= -limit:
+                    out += bytes([code]) + struct.pack(fmt, obj)
+                    break
+            else:
+                out += b"\xd3" + struct.pack(">q", obj)
+    elif isinstance(obj, float):
+        out += b"\xcb" + struct.pack(">d", obj)
+    elif isinstance(obj, str):
+        data = obj.encode("utf-8")
+        n = len(data)
+        if n < 32:
+            out.append(0xA0 | n)
+        elif n <= 0xFF:
+            out += bytes([0xD9, n])
+        elif n <= 0xFFFF:
+            out += b"\xda" + struct.pack(">H", n)
+        else:
+            out += b"\xdb" + struct.pack(">I", n)
+        out += data
+    elif isinstance(obj, (list, tuple)):
+        n = len(obj)
+        out += bytes([0x90 | n]) if n < 16 else (b"\xdc" + struct.pack(">H", n) if n <= 0xFFFF else b"\xdd" + struct.pack(">I", n))
+        for item in obj:
+            _pack(item, out)
+    elif isinstance(obj, dict):
+        n = len(obj)
+        out += bytes([0x80 | n]) if n < 16 else (b"\xde" + struct.pack(">H", n) if n <= 0xFFFF else b"\xdf" + struct.pack(">I", n))
+        for key, value in obj.items():
+            _pack(key, out)
+            _pack(value, out)
+    else:
+        raise TypeError(f"Type is not msgpack serializable: {type(obj).__name__}")
+
+
+if ormsgpack is not None:
+    packb = ormsgpack.packb
+else:
+    def packb(obj: Any) -> bytes:
+        out = bytearray()
+        _pack(obj, out)
+        return bytes(out)
+
+
+def ws_event(data: dict) -> bytes:
+    """SSE와 같은 이벤트 dict → WebSocket 바이너리 프레임 본문"""
+    kind = data["type"]
+    return packb([WS_EVENT_CODES[kind], *(data.get(field) for field in WS_EVENT_FIELDS[kind])])
+
+
+class StreamFormat(NamedTuple):
+    """전송 방식별 이벤트 인코더 + 사전 인코딩된 고정 이벤트"""
+    encode: Callable[[dict], bytes]
+    done: bytes
+    waiting: dict[str, bytes]
+    node_end: dict[str, bytes]
+
+
+def stream_format(encode: Callable[[dict], bytes], nodes) -> StreamFormat:
+    """sse_event / ws_event용 StreamFormat (시작 시 한 번)"""
+    return StreamFormat(
+        encode=encode,
+        done=encode({"type": "done"}),
+        waiting={node: encode({"type": "waiting", "message": message}) for node, message in WAITING_MESSAGES.items()},
+        node_end=node_end_events(nodes, encode),
+    )
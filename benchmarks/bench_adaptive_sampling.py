@@ -0,0 +1,103 @@
+"""Hard-example 샘플링 벤치마크 - TRAINING_SAMPLER uniform vs adaptive
+
+실행: python benchmarks/bench_adaptive_sampling.py [--trials 200] [--tasks 40] [--rounds 40]
+
+LLM 없이 APO gradient 단계를 흉내 낸 로컬 stub으로 비교한다.
+- 태스크: 과목(skill) × 난이도 d, 일부는 항상 맞히는 기준선 문제
+- 프롬프트: 과목별 숙련도 q, 정답 확률 = sigmoid(4 × (q - d))
+- 라운드마다 gradient 배치(gradient_batch_size × beam_width)를 rollout하고, 틀린 rollout마다 해당 과목 q가 오름
+  (textual gradient는 실패 사례에서만 고칠 점을 찾음 - 맞힌 rollout은 토큰만 씀)
+- reward: 전체 태스크의 기대 정답률 (APO가 validation으로 재는 값)
+
+uniform은 APO와 같은 batch_iter_over_dataset, adaptive는 training/sampler.py의 AdaptiveTaskSampler.
+- final reward       : rounds 후 reward 평균
+- rollouts to target : 평균 reward 곡선이 uniform의 최종 reward에 처음 도달한 gradient rollout 수
+"""
+from pathlib import Path
+import argparse
+import math
+import random
+import sys
+
+from agentlightning.algorithm.utils import batch_iter_over_dataset
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from training.sampler import AdaptiveTaskSampler
+
+SUBJECTS = ["수학", "과학", "언어", "논리", "상식", "역사"]
+
+
+def synthetic_tasks(n: int, easy_fraction: float, rng: random.Random) -> list[dict]:
+    tasks = []
+    for i in range(n):
+        easy = rng.random() < easy_fraction
+        tasks.append({
+            "question": f"문제 {i}",
+            "expected_answer": "0",
+            "difficulty": "쉬움" if easy else "함정",
+            "subject": rng.choice(SUBJECTS),
+            "d": rng.uniform(-3.0, -1.5) if easy else rng.uniform(0.0, 1.5),
+        })
+    return tasks
+
+
+def accuracy(task: dict, skill: dict) -> float:
+    return 1 / (1 + math.exp(-4 * (skill[task["subject"]] - task["d"])))
+
+
+def run(tasks: list[dict], batches, args, rng: random.Random, sampler=None) -> list[tuple[int, float]]:
+    """라운드별 (누적 rollout 수, reward)"""
+    skill = {subject: 0.0 for subject in SUBJECTS}
+    curve, rollouts = [], 0
+    for _ in range(args.rounds):
+        batch = [task for _ in range(args.parents) for task in next(batches)]
+        for task in batch:
+            reward = 1.0 if rng.random() < accuracy(task, skill) else 0.0
+            if sampler is not None:
+                sampler.update(task, reward)
+            if reward == 0.0:
+                skill[task["subject"]] += args.step
+        rollouts += len(batch)
+        curve.append((rollouts, sum(accuracy(task, skill) for task in tasks) / len(tasks)))
+    return curve
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trials", type=int, default=200)
+    parser.add_argument("--tasks", type=int, default=40)
+    parser.add_argument("--easy-fraction", type=float, default=0.5)
+    parser.add_argument("--rounds", type=int, default=40)
+    parser.add_argument("--batch-size", type=int, default=4, help="APO gradient_batch_size")
+    parser.add_argument("--parents", type=int, default=2, help="APO beam_width (라운드당 gradient 배치 수)")
+    parser.add_argument("--step", type=float, default=0.05, help="실패 rollout 하나당 과목 숙련도 증가")
+    parser.add_argument("--floor", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    curves = {"uniform": [], "adaptive": []}
+    for trial in range(args.trials):
+        tasks = synthetic_tasks(args.tasks, args.easy_fraction, random.Random(trial))
+        random.seed(args.seed + trial)  # batch_iter_over_dataset은 전역 random 사용
+        curves["uniform"].append(run(tasks, batch_iter_over_dataset(tasks, args.batch_size), args,
+                                     random.Random(args.seed + trial)))
+        sampler = AdaptiveTaskSampler(floor=args.floor, rng=random.Random(args.seed + trial))
+        curves["adaptive"].append(run(tasks, sampler.batches(tasks, args.batch_size), args,
+                                      random.Random(args.seed + trial), sampler))
+
+    # 라운드별 평균 reward 곡선 (rollout 수는 라운드마다 같음)
+    mean_curves = {
+        name: [(trials[0][r][0], sum(curve[r][1] for curve in trials) / len(trials)) for r in range(args.rounds)]
+        for name, trials in curves.items()
+    }
+    target = mean_curves["uniform"][-1][1]
+    print(f"trials: {args.trials} | tasks: {args.tasks} ({args.easy_fraction:.0%} easy) | rounds: {args.rounds} | "
+          f"rollouts/round: {args.batch_size * args.parents} | target reward: {target:.3f}")
+    print(f"{'sampler':<10}{'final reward':>14}{'rollouts to target':>20}{'vs uniform':>12}")
+    full = mean_curves["uniform"][-1][0]
+    for name, curve in mean_curves.items():
+        to_target = next(rollouts for rollouts, reward in curve if reward >= target)
+        print(f"{name:<10}{curve[-1][1]:>14.3f}{to_target:>20}{to_target / full:>12.0%}")
+
+if __name__ == "__main__":
+    main()
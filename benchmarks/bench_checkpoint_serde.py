@@ -0,0 +1,147 @@
+"""체크포인트 직렬화 벤치마크 - 라운드당 저장 bytes / 쓰기·읽기 시간
+
+실행: python benchmarks/bench_checkpoint_serde.py [--rounds 10]
+
+app/graph.py와 같은 State / 노드 구성(LLM 대신 고정 응답)으로 퀴즈 라운드를 반복 실행하며
+serde(default / compact / compact+zstd) × checkpointer(MemorySaver / SqliteSaver)별로 측정한다.
+- bytes/round : 라운드 하나가 checkpointer에 추가한 직렬화 bytes (체크포인트 + 메타데이터 + blob + pending write)
+- write ms    : graph.invoke 1라운드 (노드는 즉시 반환하므로 대부분 체크포인트 직렬화/저장)
+- read ms     : graph.get_state (최신 체크포인트 역직렬화)
+SqliteSaver는 langgraph-checkpoint-sqlite 설치 시에만 측정.
+"""
+from pathlib import Path
+import argparse
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import Annotated, Optional, TypedDict
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import END, START, StateGraph
+from langgraph.graph.message import add_messages
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from app.checkpoint_serde import create_checkpoint_serde, zstandard
+
+try:
+    from langgraph.checkpoint.sqlite import SqliteSaver
+except ImportError:
+    SqliteSaver = None
+
+# 한국어 위주의 현실적인 노드 출력 길이
+QUESTION = "다음 중 광합성에 필요한 요소가 아닌 것은 무엇일까요? 1) 빛 2) 물 3) 이산화탄소 4) 질소 " * 3
+ANSWER = "먼저 광합성의 재료를 떠올려 보면 빛, 물, 이산화탄소가 필요합니다. 따라서 정답은 4번 질소입니다. " * 4
+EVALUATION = "⭕ 정답입니다! 광합성은 엽록체에서 일어나며 빛 에너지로 포도당을 만들고 산소를 방출합니다. " * 5
+
+
+class State(TypedDict):
+    messages: Annotated[list[BaseMessage], add_messages]
+    phase: str
+    difficulty: Optional[str]
+    subject: Optional[str]
+    current_question: Optional[str]
+    student_answer: Optional[str]
+    round_count: int
+    user_input: Optional[str]
+
+
+def build_graph(checkpointer):
+    def setup(state: State) -> State:
+        return {"phase": "questioning"}
+
+    def teacher_question(state: State) -> State:
+        round_count = state.get("round_count", 0) + 1
+        return {
+            "messages": [AIMessage(content=f"👨‍🏫 **Teacher (문제 #{round_count})**\n\n{QUESTION}")],
+            "current_question": QUESTION,
+            "phase": "answering",
+            "round_count": round_count,
+        }
+
+    def student_answer(state: State) -> State:
+        return {
+            "messages": [AIMessage(content=f"🧑‍🎓 **Student**\n\n{ANSWER}")],
+            "student_answer": ANSWER,
+            "phase": "evaluating",
+        }
+
+    def teacher_evaluate(state: State) -> State:
+        return {"messages": [AIMessage(content=f"👨‍🏫 **Teacher (평가)**\n\n{EVALUATION}")], "phase": "complete"}
+
+    builder = StateGraph(State)
+    builder.add_node("setup", setup)
+    builder.add_node("teacher_question", teacher_question)
+    builder.add_node("student_answer", student_answer)
+    builder.add_node("teacher_evaluate", teacher_evaluate)
+    builder.add_edge(START, "setup")
+    builder.add_edge("setup", "teacher_question")
+    builder.add_edge("teacher_question", "student_answer")
+    builder.add_edge("student_answer", "teacher_evaluate")
+    builder.add_edge("teacher_evaluate", END)
+    return builder.compile(checkpointer=checkpointer)
+
+
+def memory_bytes(saver: MemorySaver) -> int:
+    total = 0
+    for namespaces in saver.storage.values():
+        for checkpoints in namespaces.values():
+            for checkpoint, metadata, _ in checkpoints.values():
+                total += len(checkpoint[1]) + len(metadata[1])
+    total += sum(len(blob[1]) for blob in saver.blobs.values())
+    total += sum(len(write[2][1]) for writes in saver.writes.values() for write in writes.values())
+    return total
+
+
+def sqlite_bytes(conn: sqlite3.Connection) -> int:
+    checkpoints = conn.execute("SELECT COALESCE(SUM(LENGTH(checkpoint) + LENGTH(metadata)), 0) FROM checkpoints").fetchone()[0]
+    writes = conn.execute("SELECT COALESCE(SUM(LENGTH(value)), 0) FROM writes").fetchone()[0]
+    return checkpoints + writes
+
+
+def run(graph, stored_bytes, rounds: int) -> tuple[float, float, float]:
+    config = {"configurable": {"thread_id": "bench"}}
+    write_time = read_time = 0.0
+    for i in range(rounds):
+        start = time.perf_counter()
+        graph.invoke({"messages": [HumanMessage(content="다음")], "difficulty": "보통", "subject": "과학",
+                      "user_input": "다음", "round_count": i}, config=config)
+        write_time += time.perf_counter() - start
+        start = time.perf_counter()
+        graph.get_state(config)
+        read_time += time.perf_counter() - start
+    return stored_bytes() / rounds, write_time / rounds * 1000, read_time / rounds * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    serdes = [("default", "none"), ("compact", "none")]
+    if zstandard is not None:
+        serdes.append(("compact", "zstd"))
+
+    print(f"rounds: {args.rounds} (bytes/round는 {args.rounds}라운드 평균, 메시지 누적으로 라운드가 갈수록 증가)")
+    print(f"{'checkpointer':<14}{'serde':<16}{'bytes/round':>13}{'write ms':>10}{'read ms':>10}")
+    for kind, compression in serdes:
+        serde = create_checkpoint_serde(kind, compression)
+        label = kind if compression == "none" else f"{kind}+{compression}"
+
+        saver = MemorySaver(serde=serde)
+        size, write_ms, read_ms = run(build_graph(saver), lambda: memory_bytes(saver), args.rounds)
+        print(f"{'memory':<14}{label:<16}{size:>13,.0f}{write_ms:>10.2f}{read_ms:>10.2f}")
+
+        if SqliteSaver is None:
+            continue
+        with tempfile.TemporaryDirectory() as tmp:
+            conn = sqlite3.connect(Path(tmp) / "checkpoints.db", check_same_thread=False)
+            saver = SqliteSaver(conn, serde=serde)
+            size, write_ms, read_ms = run(build_graph(saver), lambda: sqlite_bytes(conn), args.rounds)
+            conn.close()
+        print(f"{'sqlite':<14}{label:<16}{size:>13,.0f}{write_ms:>10.2f}{read_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""Collector 처리량 로컬 replay 벤치마크
+
+실행:
+    python benchmarks/bench_collector_replay.py --traces recorded.jsonl [--repeat 20] [--concurrency 8]
+
+- k8s/otel-collector-values.yaml + k8s/otel-collector-values-production.yaml을 Helm과 같은 방식
+  (map 병합, list 교체)으로 합친 config에서 exporter만 nop으로 바꿔 로컬 otelcol-contrib 실행
+- 녹화된 trace(collector file exporter의 OTLP JSON lines)를 OTLP/HTTP로 반복 전송 (반복마다 traceId 재발급)
+- 전송 spans/sec, 요청 지연시간, collector 수신/거부 span 수와 RSS를 출력
+
+trace 녹화: collector에 file exporter를 추가해 traces/production 입력을 JSON lines로 저장
+    exporters: {file/record: {path: /tmp/recorded.jsonl}}
+"""
+from pathlib import Path
+import argparse
+import copy
+import json
+import os
+import re
+import secrets
+import shutil
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.request
+
+import yaml
+
+ROOT = Path(__file__).parent.parent
+BASE_VALUES = ROOT / "k8s" / "otel-collector-values.yaml"
+PROFILE_VALUES = ROOT / "k8s" / "otel-collector-values-production.yaml"
+OTLP_HTTP = "127.0.0.1:14318"
+METRICS_ADDR = "127.0.0.1:18888"
+
+
+def deep_merge(base: dict, override: dict) -> dict:
+    """Helm values 병합 규칙 (map 재귀 병합, 그 외 교체)"""
+    merged = copy.deepcopy(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = deep_merge(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def build_replay_config(with_profile: bool) -> dict:
+    values = yaml.safe_load(BASE_VALUES.read_text(encoding="utf-8"))
+    if with_profile:
+        values = deep_merge(values, yaml.safe_load(PROFILE_VALUES.read_text(encoding="utf-8")))
+    config = values["config"]
+
+    # 외부 전송 없이 처리 비용만 측정: 모든 exporter → nop (connector는 유지)
+    connectors = set(config.get("connectors", {}))
+    config["exporters"] = {"nop": {}}
+    for pipeline in config["service"]["pipelines"].values():
+        exporters = [e for e in pipeline.get("exporters", []) if e in connectors]
+        pipeline["exporters"] = exporters or ["nop"]
+
+    config["receivers"] = {"otlp": {"protocols": {"http": {"endpoint": OTLP_HTTP}}}}
+    config["service"]["telemetry"] = {"metrics": {"level": "normal", "address": METRICS_ADDR}}
+    return config
+
+
+def load_requests(path: Path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+
+def count_spans(request: dict) -> int:
+    return sum(
+        len(scope.get("spans", []))
+        for rs in request.get("resourceSpans", [])
+        for scope in rs.get("scopeSpans", [])
+    )
+
+
+def with_new_trace_ids(requests: list[dict]) -> list[bytes]:
+    """반복마다 traceId를 새로 발급 (tail sampling이 이전 반복과 같은 trace로 합치지 않도록)"""
+    mapping: dict[str, str] = {}
+    payloads = []
+    for request in requests:
+        body = json.dumps(request)
+        body = re.sub(
+            r'"traceId":\s*"([0-9a-fA-F]+)"',
+            lambda m: f'"traceId": "{mapping.setdefault(m.group(1), secrets.token_hex(16))}"',
+            body,
+        )
+        payloads.append(body.encode("utf-8"))
+    return payloads
+
+
+def scrape_metrics() -> dict[str, float]:
+    text = urllib.request.urlopen(f"http://{METRICS_ADDR}/metrics", timeout=5).read().decode()
+    totals: dict[str, float] = {}
+    for line in text.splitlines():
+        if line.startswith("#") or not line:
+            continue
+        name = line.split("{", 1)[0].split(" ", 1)[0]
+        if name.startswith(("otelcol_receiver_accepted_spans", "otelcol_receiver_refused_spans",
+                            "otelcol_process_memory_rss")):
+            totals[name] = totals.get(name, 0.0) + float(line.rsplit(" ", 1)[1])
+    return totals
+
+
+def wait_ready(timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            scrape_metrics()
+            return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError("collector not ready")
+
+
+def replay(payloads: list[bytes], concurrency: int) -> list[float]:
+    latencies: list[float] = []
+    lock = threading.Lock()
+    queue = list(payloads)
+
+    def worker():
+        while True:
+            with lock:
+                if not queue:
+                    return
+                body = queue.pop()
+            req = urllib.request.Request(
+                f"http://{OTLP_HTTP}/v1/traces", data=body,
+                headers={"Content-Type": "application/json"}, method="POST",
+            )
+            start = time.perf_counter()
+            urllib.request.urlopen(req, timeout=30).read()
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--traces", type=Path, required=True, help="OTLP JSON lines (file exporter 출력)")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--collector-bin", default=os.getenv("OTELCOL_BIN", "otelcol-contrib"))
+    parser.add_argument("--baseline", action="store_true", help="프로파일 없이 기본 values로 측정")
+    args = parser.parse_args()
+
+    if shutil.which(args.collector_bin) is None:
+        raise SystemExit(f"collector binary not found: {args.collector_bin} (set --collector-bin / OTELCOL_BIN)")
+
+    requests = load_requests(args.traces)
+    spans_per_pass = sum(count_spans(r) for r in requests)
+    payloads = [p for _ in range(args.repeat) for p in with_new_trace_ids(requests)]
+
+    with tempfile.NamedTemporaryFile("w", suffix=".yaml", delete=False) as f:
+        yaml.safe_dump(build_replay_config(with_profile=not args.baseline), f)
+        config_path = f.name
+
+    collector = subprocess.Popen([args.collector_bin, "--config", config_path],
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready()
+        start = time.perf_counter()
+        latencies = replay(payloads, args.concurrency)
+        elapsed = time.perf_counter() - start
+        collector_metrics = scrape_metrics()
+    finally:
+        collector.terminate()
+        collector.wait(timeout=30)
+        os.unlink(config_path)
+
+    total_spans = spans_per_pass * args.repeat
+    q = statistics.quantiles(latencies, n=100)
+    print(f"profile: {'baseline' if args.baseline else 'production'} | {len(payloads)} requests, {total_spans} spans")
+    print(f"throughput: {total_spans / elapsed:,.0f} spans/sec ({len(payloads) / elapsed:,.1f} req/sec)")
+    print(f"request latency: p50 {q[49] * 1000:.1f} ms, p99 {q[98] * 1000:.1f} ms")
+    for name, value in sorted(collector_metrics.items()):
+        print(f"  {name}: {value:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
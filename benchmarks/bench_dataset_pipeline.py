@@ -0,0 +1,118 @@
+"""데이터셋 파이프라인 벤치마크 - JSONL 인덱스(JsonlDataset) vs 전체 로딩(list)
+
+실행: python benchmarks/bench_dataset_pipeline.py [--tasks 50000] [--duplicate-rate 0.05]
+
+임시 디렉터리에 합성 QuizTask JSONL(파일 4개, 일부 중복 / 공백만 다른 중복 포함)을 만들고 측정:
+- load s / memory MiB : 스캔(인덱스) 또는 json.loads 전체 로딩 시간과 유지 메모리 (tracemalloc)
+- split s             : 층별 train / validation 분할 시간
+- max stratum Δ       : 층별 validation 비율과 목표 비율의 최대 차이 (태스크 10개 이상인 층)
+- µs/task             : APO처럼 무작위 인덱스로 태스크를 꺼내는 시간
+"""
+from pathlib import Path
+import argparse
+import gc
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from training.dataset import JsonlDataset, dedupe_tasks, split_dataset, write_jsonl
+
+DIFFICULTIES = ["쉬움", "보통", "어려움", "함정"]
+SUBJECTS = ["수학", "과학", "언어", "논리", "상식", "역사"]
+
+
+def synthetic_tasks(n: int, duplicate_rate: float, rng: random.Random) -> list[dict]:
+    tasks = []
+    for i in range(n):
+        if tasks and rng.random() < duplicate_rate:
+            task = dict(rng.choice(tasks))
+            task["question"] = "  " + task["question"].replace(" ", "  ") + " "  # 공백만 다른 중복
+        else:
+            # 층 크기가 고르지 않도록 (함정 / 논리 쪽이 많음)
+            task = {
+                "question": f"문제 {i}: {rng.randint(1, 999)} 더하기 {rng.randint(1, 999)}는? " + "조건 " * rng.randint(5, 40),
+                "expected_answer": str(rng.randint(1, 2000)),
+                "difficulty": rng.choices(DIFFICULTIES, weights=[1, 2, 2, 5])[0],
+                "subject": rng.choices(SUBJECTS, weights=[3, 2, 2, 5, 1, 1])[0],
+            }
+        tasks.append(task)
+    return tasks
+
+
+def stratum_delta(train, val, fraction: float) -> float:
+    counts: dict = {}
+    for part, dataset in ((0, train), (1, val)):
+        for i in range(len(dataset)):
+            task = dataset[i]
+            entry = counts.setdefault((task["difficulty"], task["subject"]), [0, 0])
+            entry[part] += 1
+    return max(abs(v / (t + v) - fraction) for t, v in counts.values() if t + v >= 10)
+
+
+def measure(load) -> tuple:
+    """(데이터셋, 로딩 시간, 유지 메모리) - 시간은 tracemalloc 없이 따로 측정"""
+    gc.collect()
+    start = time.perf_counter()
+    dataset = load()
+    elapsed = time.perf_counter() - start
+    del dataset
+    gc.collect()
+    tracemalloc.start()
+    dataset = load()
+    gc.collect()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return dataset, elapsed, memory
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=50000)
+    parser.add_argument("--duplicate-rate", type=float, default=0.05)
+    parser.add_argument("--val-fraction", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    tasks = synthetic_tasks(args.tasks, args.duplicate_rate, rng)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for part in range(4):
+            path = f"{tmp}/tasks-{part}.jsonl"
+            write_jsonl(tasks[part::4], path)
+            paths.append(path)
+        size = sum(Path(p).stat().st_size for p in paths)
+        del tasks
+        gc.collect()
+
+        def load_list():
+            loaded = []
+            for path in paths:
+                with open(path, encoding="utf-8") as f:
+                    loaded.extend(json.loads(line) for line in f)
+            return dedupe_tasks(loaded)
+
+        print(f"tasks: {args.tasks} | files: {len(paths)} ({size / 2**20:.1f} MiB) | val fraction: {args.val_fraction}")
+        print(f"{'loader':<8}{'unique':>9}{'load s':>9}{'memory MiB':>12}{'split s':>9}{'max stratum Δ':>15}{'µs/task':>9}")
+        for name, load in (("list", load_list), ("jsonl", lambda: JsonlDataset.scan(paths))):
+            dataset, load_time, memory = measure(load)
+            start = time.perf_counter()
+            train, val = split_dataset(dataset, args.val_fraction, "bench")
+            split_time = time.perf_counter() - start
+            delta = stratum_delta(train, val, args.val_fraction)
+            indices = [rng.randrange(len(train)) for _ in range(5000)]
+            start = time.perf_counter()
+            for i in indices:
+                train[i]
+            access = (time.perf_counter() - start) / len(indices)
+            print(f"{name:<8}{len(dataset):>9}{load_time:>9.2f}{memory / 2**20:>12.1f}{split_time:>9.2f}"
+                  f"{delta:>15.4f}{access * 1e6:>9.1f}")
+            del dataset, train, val
+
+
+if __name__ == "__main__":
+    main()
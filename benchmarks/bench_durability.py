@@ -0,0 +1,99 @@
+"""그래프 durability 모드별 턴당 비용 벤치마크 - 체크포인트 쓰기 횟수 / CPU / 할당
+
+실행: python benchmarks/bench_durability.py [--turns 50] [--serde default|compact]
+
+bench_checkpoint_serde.py와 같은 퀴즈 그래프(LLM 대신 고정 응답)를 /chat/stream처럼 astream(stream_mode="updates")으로
+실행하고 턴마다 get_state로 최종 상태를 읽는다.
+- puts/turn   : checkpointer.put 호출 수
+- CPU ms/turn : process_time (백그라운드 저장 스레드 포함)
+- peak KiB/turn : tracemalloc 기준 턴 중 최대 추가 메모리 (직렬화 버퍼 등 일시 할당 포함)
+- retained KiB/turn : 턴이 끝난 뒤 남은 메모리 증가분 (저장된 체크포인트)
+노드가 즉시 반환하므로 수치는 체크포인트 비용의 상한에 가깝다 (실제 턴은 LLM 대기가 대부분).
+"""
+from pathlib import Path
+import argparse
+import asyncio
+import sys
+import time
+import tracemalloc
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from app.checkpoint_serde import create_checkpoint_serde
+from benchmarks.bench_checkpoint_serde import build_graph
+
+MODES = ("sync", "async", "exit")
+
+
+async def run_turn(graph, durability: str, config: dict, round_count: int):
+    inputs = {"messages": [HumanMessage(content="다음")], "difficulty": "보통", "subject": "과학",
+              "user_input": "다음", "round_count": round_count}
+    async for _ in graph.astream(inputs, config=config, stream_mode="updates", durability=durability):
+        pass
+    graph.get_state(config)
+
+
+async def measure(durability: str, turns: int, serde_kind: str) -> dict:
+    saver = MemorySaver(serde=create_checkpoint_serde(serde_kind))
+    puts = 0
+    put = saver.put
+
+    def counting_put(*args, **kwargs):
+        nonlocal puts
+        puts += 1
+        return put(*args, **kwargs)
+
+    saver.put = counting_put
+    graph = build_graph(saver)
+    for i in range(3):  # warmup
+        await run_turn(graph, durability, {"configurable": {"thread_id": "warmup"}}, i)
+
+    # 1차: CPU / wall (tracemalloc 없이)
+    puts = 0
+    config = {"configurable": {"thread_id": "cpu"}}
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    for i in range(turns):
+        await run_turn(graph, durability, config, i)
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    puts_per_turn = puts / turns
+
+    # 2차: 메모리 (같은 턴 수를 새 세션으로)
+    config = {"configurable": {"thread_id": "memory"}}
+    retained = transient = 0
+    tracemalloc.start()
+    for i in range(turns):
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        await run_turn(graph, durability, config, i)
+        after, peak = tracemalloc.get_traced_memory()
+        transient += peak - current
+        retained += after - current
+    tracemalloc.stop()
+
+    return {
+        "puts": puts_per_turn,
+        "cpu_ms": cpu / turns * 1000,
+        "wall_ms": wall / turns * 1000,
+        "transient_kib": transient / turns / 1024,
+        "retained_kib": retained / turns / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--serde", default="default", choices=["default", "compact"])
+    args = parser.parse_args()
+
+    print(f"turns: {args.turns} | serde: {args.serde} | 메시지가 턴마다 누적")
+    print(f"{'durability':<12}{'puts/turn':>10}{'CPU ms/turn':>13}{'wall ms/turn':>14}{'peak KiB/turn':>15}{'retained KiB/turn':>19}")
+    for mode in MODES:
+        r = asyncio.run(measure(mode, args.turns, args.serde))
+        print(f"{mode:<12}{r['puts']:>10.1f}{r['cpu_ms']:>13.2f}{r['wall_ms']:>14.2f}{r['transient_kib']:>15.1f}{r['retained_kib']:>19.1f}")
+
+
+if __name__ == "__main__":
+    main()
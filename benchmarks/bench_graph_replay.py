@@ -0,0 +1,66 @@
+"""퀴즈 그래프 녹화/재생 벤치마크 - 고정 시나리오의 턴 지연시간 / CPU
+
+실행:
+    # 1) 실제 Azure OpenAI로 한 번 녹화 (cassette 디렉토리에 저장)
+    python benchmarks/bench_graph_replay.py --record --cassette cassettes/quiz
+    # 2) 이후 커밋마다 오프라인 재생으로 비교 (--latency-scale 0이면 LLM 대기 없이 코드 경로만)
+    python benchmarks/bench_graph_replay.py --cassette cassettes/quiz [--latency-scale 1.0]
+
+재생은 녹화 당시 응답 본문 / usage / 첫 토큰 지연 / 생성 속도를 그대로 사용하므로
+그래프, hedging, checkpointer 등 앱 코드 변경에 따른 차이만 남는다.
+"""
+from pathlib import Path
+import argparse
+import os
+import statistics
+import sys
+import time
+
+SCENARIO = [
+    ("보통 난이도로 수학 문제 풀래", "다음", "계속"),
+    ("쉬운 역사 퀴즈", "다음"),
+    ("어려운 과학 문제", "다음", "새로 시작", "보통 영어 퀴즈"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cassette", default="cassettes/quiz")
+    parser.add_argument("--record", action="store_true", help="Azure OpenAI 호출을 녹화")
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    args = parser.parse_args()
+
+    # config는 import 시 환경변수를 읽으므로 그래프 import 전에 설정
+    os.environ["LLM_CASSETTE_MODE"] = "record" if args.record else "replay"
+    os.environ["LLM_CASSETTE_DIR"] = args.cassette
+    os.environ["LLM_CASSETTE_LATENCY_SCALE"] = str(args.latency_scale)
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from langchain_core.messages import HumanMessage
+    from app.graph import create_graph
+
+    graph = create_graph()
+    latencies, cpu_times = [], []
+    for session, turns in enumerate(SCENARIO):
+        config = {"configurable": {"thread_id": f"bench-{session}"}}
+        state = {"difficulty": None, "subject": None, "round_count": 0}
+        for message in turns:
+            if "새로" in message:
+                state = {"difficulty": None, "subject": None, "round_count": 0}
+            inputs = {"messages": [HumanMessage(content=message)], "user_input": message, **state}
+            cpu_start, wall_start = time.process_time(), time.perf_counter()
+            result = graph.invoke(inputs, config=config)
+            latencies.append(time.perf_counter() - wall_start)
+            cpu_times.append(time.process_time() - cpu_start)
+            state = {key: result.get(key) for key in ("difficulty", "subject", "round_count")}
+
+    mode = "record" if args.record else f"replay x{args.latency_scale}"
+    latencies.sort()
+    print(f"mode: {mode} | cassette: {args.cassette} | turns: {len(latencies)}")
+    print(f"latency p50 {statistics.median(latencies) * 1000:.0f} ms | "
+          f"p99 {latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000:.0f} ms | "
+          f"total {sum(latencies):.2f} s")
+    print(f"CPU/turn {statistics.mean(cpu_times) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""Batched LLM-as-Judge 벤치마크 - 실제 Trainer(n_runners) 구성에서 judge 요청 수
+
+실행: python benchmarks/bench_judge_batching.py [--runners 4] [--batch-size 8] [--window 0.2] [--tasks 64]
+
+학습과 같은 agl.Trainer(n_runners=4, ClientServer 실행 = runner마다 fork된 프로세스)로 quiz_agent validation rollout을
+JUDGE_BATCH_SIZE=1 / --batch-size 두 번 실행한다. LLM은 별도 스레드의 Azure OpenAI stand-in
+(student: 문제별로 고정된 정답 / 오답, judge: "정답은 X입니다" 포함 여부로 채점, 호출마다 고정 지연)이라
+자격 증명 없이 돌고, 두 실행의 태스크별 reward가 같아야 한다 (verdict가 다른 rollout에 매핑되지 않았는지 확인).
+단건 채점과의 실제 일치율은 학습 중 JUDGE_CONSISTENCY_SAMPLE_RATE 비율로 apo.judge.consistency 메트릭에 기록된다.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+import zlib
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+RESULT_PREFIX = "BENCH_RESULT "
+
+
+def bench_tasks(n: int) -> list[dict]:
+    """내장 데이터셋(14개)을 n개까지 반복 (문제 문장에 번호를 붙여 rollout마다 고유)"""
+    from training.dataset import create_dataset
+
+    base = create_dataset()
+    return [{**base[i % len(base)], "question": f"{base[i % len(base)]['question']} [{i}]"} for i in range(n)]
+
+
+# === Azure OpenAI stand-in ===
+def student_reply(question: str, expected: str) -> str:
+    # 문제마다 고정: 3개 중 2개 정답
+    if zlib.crc32(question.encode()) % 3:
+        return f"차근차근 풀어보면 답이 나옵니다.\n정답은 {expected}입니다"
+    return f"헷갈리지만 다시 계산해 보았습니다.\n정답은 {expected}0입니다"
+
+
+def judge_verdict(expected: str, answer: str) -> int:
+    return int(f"정답은 {expected}입니다" in answer)
+
+
+class StandIn(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, expected: dict, student_latency: float, judge_latency: float):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.expected = expected
+        self.student_latency = student_latency
+        self.judge_latency = judge_latency
+        self.lock = threading.Lock()
+        self.counts = {"student": 0, "judge_single": 0, "judge_batch": 0, "judged_answers": 0}
+
+    def count(self, **deltas):
+        with self.lock:
+            for name, delta in deltas.items():
+                self.counts[name] += delta
+
+    def take(self) -> dict:
+        with self.lock:
+            counts = dict(self.counts)
+            self.counts = dict.fromkeys(counts, 0)
+        return counts
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        system, user = body["messages"][0]["content"], body["messages"][-1]["content"]
+        server: StandIn = self.server
+        if system.startswith("당신은 매우 엄격한 채점자"):
+            items = re.findall(r"정답: (.*)\n학생 답변: ([\s\S]*?)(?=\n\n\[\d+\]\n|\n\n\d+개 항목|\n\n학생의 최종)", user)
+            time.sleep(server.judge_latency)
+            if body.get("response_format"):
+                content = json.dumps({"verdicts": [judge_verdict(e, a) for e, a in items]})
+                server.count(judge_batch=1, judged_answers=len(items))
+            else:
+                content = str(judge_verdict(*items[0]))
+                server.count(judge_single=1, judged_answers=1)
+        else:
+            question = re.match(r"문제: (.*)\n", user).group(1)
+            time.sleep(server.student_latency)
+            content = student_reply(question, server.expected[question])
+            server.count(student=1)
+        payload = json.dumps({
+            "id": "chatcmpl-bench", "object": "chat.completion", "created": int(time.time()), "model": "bench",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(system + user) // 2, "completion_tokens": len(content) // 2,
+                      "total_tokens": (len(system + user) + len(content)) // 2},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+# === worker: 실제 Trainer로 validation rollout 한 번 ===
+def worker(args):
+    import asyncio
+    from openai import AsyncAzureOpenAI
+    import agentlightning as agl
+    from agentlightning.algorithm.apo import APO
+    from training.agent import initial_prompt_template, quiz_agent
+    from training.evaluator import start_judge_server
+
+    tasks = bench_tasks(args.tasks)
+
+    class ValidationPass(APO):
+        """초기 프롬프트로 태스크 전체를 val rollout (APO.evaluate_prompt_on_batch와 같은 enqueue → 대기)"""
+
+        async def run(self, train_dataset=None, val_dataset=None):
+            store = self.get_store()
+            prompt = self._create_versioned_prompt(initial_prompt_template())
+            update = await store.update_resources(prompt.version, {"prompt_template": prompt.prompt_template})
+            rollout_ids = [
+                (await store.enqueue_rollout(input=task, mode="val", resources_id=update.resources_id)).rollout_id
+                for task in val_dataset
+            ]
+            while len(finished := await store.wait_for_rollouts(rollout_ids=rollout_ids, timeout=0.0)) < len(rollout_ids):
+                await asyncio.sleep(0.2)
+            results = await self.get_rollout_results(finished)
+            self.rewards = {r.input["question"]: result["final_reward"] for r, result in zip(finished, results)}
+
+    algo = ValidationPass(AsyncAzureOpenAI(azure_endpoint=os.environ["AZURE_OPENAI_ENDPOINT"], api_key="bench",
+                                           api_version="2024-12-01-preview"))
+    trainer = agl.Trainer(
+        algorithm=algo,
+        n_runners=args.runners,
+        tracer=agl.OtelTracer(),
+        initial_resources={"prompt_template": initial_prompt_template()},
+        adapter=agl.TraceToMessages(),
+    )
+    judge_server = start_judge_server()
+    start = time.perf_counter()
+    try:
+        trainer.fit(agent=quiz_agent, train_dataset=tasks, val_dataset=tasks)
+    finally:
+        if judge_server is not None:
+            judge_server.close()
+    print(RESULT_PREFIX + json.dumps({"seconds": time.perf_counter() - start, "rewards": algo.rewards}), flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runners", type=int, default=4, help="Trainer n_runners (training/train.py와 같은 4)")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--window", type=float, default=0.2)
+    parser.add_argument("--tasks", type=int, default=64)
+    parser.add_argument("--student-latency", type=float, default=0.5)
+    parser.add_argument("--judge-latency", type=float, default=0.3)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker(args)
+
+    os.environ.setdefault("AZURE_OPENAI_ENDPOINT", "http://127.0.0.1")  # config import용 (worker는 stand-in 주소)
+    os.environ.setdefault("AZURE_OPENAI_API_KEY", "bench")
+    tasks = bench_tasks(args.tasks)
+    server = StandIn({t["question"]: t["expected_answer"] for t in tasks}, args.student_latency, args.judge_latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    print(f"rollouts: {len(tasks)} | runners: {args.runners} | window: {args.window}s | "
+          f"LLM latency: student {args.student_latency}s, judge {args.judge_latency}s")
+    print(f"{'JUDGE_BATCH_SIZE':<18}{'judge requests':>16}{'answers/request':>17}{'seconds':>10}{'mean reward':>13}")
+    runs = {}
+    for batch_size in (1, args.batch_size):
+        env = {
+            **os.environ,
+            "AZURE_OPENAI_ENDPOINT": f"http://127.0.0.1:{server.server_address[1]}",
+            "AZURE_OPENAI_API_KEY": "bench",
+            "LLM_DEPLOYMENTS": "",
+            "LLM_ROLE_ROUTES": "",
+            "LLM_CASSETTE_MODE": "off",
+            "ROLLOUT_CACHE": "off",
+            "JUDGE_BATCH_SIZE": str(batch_size),
+            "JUDGE_BATCH_WINDOW": str(args.window),
+            "JUDGE_CONSISTENCY_SAMPLE_RATE": "0",
+        }
+        server.take()
+        proc = subprocess.run(
+            [sys.executable, __file__, "--worker", "--runners", str(args.runners), "--tasks", str(args.tasks)],
+            env=env, cwd=ROOT, capture_output=True, text=True,
+        )
+        lines = [line for line in proc.stdout.splitlines() if line.startswith(RESULT_PREFIX)]
+        if proc.returncode != 0 or not lines:
+            sys.exit(f"worker failed (JUDGE_BATCH_SIZE={batch_size}):\n{proc.stderr[-3000:]}")
+        result = json.loads(lines[-1][len(RESULT_PREFIX):])
+        counts = server.take()
+        requests = counts["judge_single"] + counts["judge_batch"]
+        rewards = result["rewards"]
+        runs[batch_size] = (requests, rewards)
+        print(f"{batch_size:<18}{requests:>16}{counts['judged_answers'] / max(requests, 1):>17.2f}"
+              f"{result['seconds']:>10.1f}{sum(rewards.values()) / len(rewards):>13.3f}")
+
+    (single_requests, single_rewards), (batch_requests, batch_rewards) = runs[1], runs[args.batch_size]
+    mismatched = sum(single_rewards[q] != batch_rewards.get(q) for q in single_rewards)
+    print(f"request reduction: x{single_requests / max(batch_requests, 1):.1f} | "
+          f"rollouts with a different reward: {mismatched}/{len(single_rewards)}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
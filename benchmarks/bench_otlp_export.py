@@ -0,0 +1,203 @@
+"""OTLP span export 벤치마크 - 프로토콜(grpc / http/protobuf) × 압축(none / gzip)
+
+실행: python benchmarks/bench_otlp_export.py [--spans 5000] [--batch 512] [--llm-fraction 0.4]
+
+collector 대신 별도 프로세스의 stand-in(gRPC TraceService + OTLP/HTTP 수신, 응답만 돌려줌) 앞에
+바이트를 세는 TCP 프록시를 두고, otel_export.py가 만드는 exporter로 같은 span 배치를 전송한다.
+- wire KiB / 1k spans : exporter → collector 방향 TCP 바이트 (HTTP/2 · HTTP/1.1 헤더 / 프레이밍 포함)
+- CPU ms / 1k spans   : 전송 프로세스의 CPU 시간 (protobuf 인코딩 + 압축 + gRPC / requests 스레드 포함)
+- wall ms / 1k spans  : export() 호출 시간 (loopback이라 네트워크 지연 없음)
+
+span 구성: LLM span(프롬프트 / 답변 본문, 일부는 대화 이력이 65535자 한도까지) + 작은 HTTP / 그래프 노드 span
+"""
+from pathlib import Path
+import argparse
+import multiprocessing as mp
+import random
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+WORDS = ("학생 선생님 문제 정답 풀이 단계 계산 먼저 다음 그러므로 따라서 조건 함정 확인 결과 숫자 더하기 빼기 곱하기 "
+         "나누기 과학 역사 상식 논리 언어 질문 답변 설명 이유 예시 평가 점수 피드백 힌트 주의 question answer step").split()
+SYSTEM_PROMPT = ("당신은 퀴즈 문제를 푸는 학생입니다. 문제를 단계적으로 풀고 함정에 주의하세요. "
+                 "마지막 줄에는 정답만 적으세요.\n") * 12
+
+
+def text(rng: random.Random, chars: int) -> str:
+    out, size = [], 0
+    while size < chars:
+        word = rng.choice(WORDS)
+        out.append(word)
+        size += len(word) + 1
+    return " ".join(out)[:chars]
+
+
+def synthetic_spans(n: int, llm_fraction: float, seed: int) -> list:
+    from opentelemetry.sdk.trace import SpanLimits, TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+    rng = random.Random(seed)
+    memory = InMemorySpanExporter()
+    provider = TracerProvider(span_limits=SpanLimits(max_attribute_length=65535))
+    provider.add_span_processor(SimpleSpanProcessor(memory))
+    tracer = provider.get_tracer("bench")
+    for i in range(n):
+        if rng.random() < llm_fraction:
+            with tracer.start_as_current_span("openai.chat") as span:
+                history = 60000 if rng.random() < 0.05 else rng.randint(500, 6000)
+                span.set_attribute("gen_ai.system", "Azure")
+                span.set_attribute("gen_ai.request.model", "gpt-4o")
+                span.set_attribute("gen_ai.prompt.0.role", "system")
+                span.set_attribute("gen_ai.prompt.0.content", SYSTEM_PROMPT)
+                span.set_attribute("gen_ai.prompt.1.role", "user")
+                span.set_attribute("gen_ai.prompt.1.content", text(rng, history))
+                span.set_attribute("gen_ai.completion.0.content", text(rng, rng.randint(200, 2000)))
+                span.set_attribute("gen_ai.usage.prompt_tokens", history // 2)
+                span.set_attribute("gen_ai.usage.completion_tokens", rng.randint(50, 600))
+        else:
+            name = rng.choice(["POST /chat/stream", "teacher_question", "student_answer", "teacher_evaluate"])
+            with tracer.start_as_current_span(name) as span:
+                span.set_attribute("http.method", "POST")
+                span.set_attribute("http.route", "/chat/stream")
+                span.set_attribute("http.status_code", 200)
+                span.set_attribute("quiz.session_id", f"session-{rng.randrange(200)}")
+                span.set_attribute("langgraph.node", name)
+    return memory.get_finished_spans()
+
+
+# === collector stand-in (별도 프로세스) ===
+def _pipe(src: socket.socket, dst: socket.socket, counter):
+    try:
+        while data := src.recv(65536):
+            if counter is not None:
+                with counter.get_lock():
+                    counter.value += len(data)
+            dst.sendall(data)
+    except OSError:
+        pass
+    finally:
+        for s in (src, dst):
+            try:
+                s.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+def _proxy(listener: socket.socket, upstream_port: int, counter):
+    """exporter → upstream 방향 바이트를 counter에 누적하는 TCP 프록시"""
+    while True:
+        client, _ = listener.accept()
+        upstream = socket.create_connection(("127.0.0.1", upstream_port))
+        for sock in (client, upstream):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        threading.Thread(target=_pipe, args=(client, upstream, counter), daemon=True).start()
+        threading.Thread(target=_pipe, args=(upstream, client, None), daemon=True).start()
+
+
+def _collector(grpc_listener, http_listener, counter, ready):
+    from concurrent import futures
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    import grpc
+    from opentelemetry.proto.collector.trace.v1 import trace_service_pb2, trace_service_pb2_grpc
+
+    class TraceService(trace_service_pb2_grpc.TraceServiceServicer):
+        def Export(self, request, context):
+            return trace_service_pb2.ExportTraceServiceResponse()
+
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=4), options=[("grpc.max_receive_message_length", 64 << 20)])
+    trace_service_pb2_grpc.add_TraceServiceServicer_to_server(TraceService(), server)
+    grpc_port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+
+    body = trace_service_pb2.ExportTraceServiceResponse().SerializeToString()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-protobuf")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    http = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=http.serve_forever, daemon=True).start()
+    threading.Thread(target=_proxy, args=(grpc_listener, grpc_port, counter), daemon=True).start()
+    threading.Thread(target=_proxy, args=(http_listener, http.server_address[1], counter), daemon=True).start()
+    ready.set()
+    server.wait_for_termination()
+
+
+def _listener() -> socket.socket:
+    sock = socket.socket()
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(64)
+    return sock
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--spans", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=512, help="BatchSpanProcessor max_export_batch_size")
+    parser.add_argument("--llm-fraction", type=float, default=0.4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    ctx = mp.get_context("spawn")
+    grpc_listener, http_listener = _listener(), _listener()
+    counter, ready = ctx.Value("q", 0), ctx.Event()
+    collector = ctx.Process(target=_collector, args=(grpc_listener, http_listener, counter, ready), daemon=True)
+    collector.start()
+    ready.wait(30)
+
+    # 수신 쪽이 준비된 뒤에 import (grpc 스레드가 fork / spawn 전에 생기지 않도록)
+    from otel_export import span_exporter
+
+    spans = synthetic_spans(args.spans, args.llm_fraction, args.seed)
+    batches = [spans[i:i + args.batch] for i in range(0, len(spans), args.batch)]
+    raw = sum(len(value.encode()) for span in spans for value in span.attributes.values() if isinstance(value, str))
+    print(f"spans: {len(spans)} ({args.llm_fraction:.0%} LLM) | batch: {args.batch} | "
+          f"string attributes: {raw / 2**20:.1f} MiB (UTF-8)")
+    print(f"{'protocol':<15}{'compression':<13}{'wire KiB/1k':>12}{'CPU ms/1k':>11}{'wall ms/1k':>12}{'ratio':>8}")
+
+    endpoints = {
+        "grpc": f"http://127.0.0.1:{grpc_listener.getsockname()[1]}",
+        "http/protobuf": f"http://127.0.0.1:{http_listener.getsockname()[1]}",
+    }
+    baseline = {}
+    for protocol in ("grpc", "http/protobuf"):
+        for compression in ("none", "gzip"):
+            exporter = span_exporter(protocol=protocol, endpoint=endpoints[protocol], compression=compression, timeout=30)
+            exporter.export(batches[0])  # 연결 수립 / warmup
+            time.sleep(0.2)
+            with counter.get_lock():
+                counter.value = 0
+            cpu, wall = time.process_time(), time.perf_counter()
+            for batch in batches:
+                result = exporter.export(batch)
+                if result.name != "SUCCESS":
+                    raise RuntimeError(f"{protocol}/{compression} export failed: {result}")
+            cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+            time.sleep(0.2)  # 프록시 카운터 반영
+            wire = counter.value
+            per_k = 1000 / len(spans)
+            baseline.setdefault(protocol, wire)
+            print(f"{protocol:<15}{compression:<13}{wire * per_k / 1024:>12.0f}{cpu * per_k * 1000:>11.1f}"
+                  f"{wall * per_k * 1000:>12.1f}{wire / baseline[protocol]:>8.2f}")
+    collector.terminate()
+    collector.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""SSE 직렬화 마이크로벤치마크 - events/sec
+
+실행: python benchmarks/bench_serialization.py
+
+baseline: json.dumps(ensure_ascii=False) → f-string(str) → StreamingResponse에서 UTF-8 encode
+current : app.serialization (orjson 또는 stdlib fallback) → bytes, 고정 이벤트는 사전 인코딩
+"""
+from pathlib import Path
+import json
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from app.serialization import JSON_BACKEND, sse_event, stream_format
+
+NODES = ["teacher_question", "student_answer", "teacher_evaluate"]
+SSE_FORMAT = stream_format(sse_event, NODES)  # app/main.py와 같은 사전 인코딩
+# 한국어 위주의 현실적인 노드 출력 길이
+CONTENT = {
+    "teacher_question": "👨‍🏫 **Teacher (문제 #1)**\n\n" + "다음 중 광합성에 필요한 요소가 아닌 것은 무엇일까요? " * 4,
+    "student_answer": "🧑‍🎓 **Student**\n\n" + "먼저 광합성의 재료를 떠올려 보면 빛, 물, 이산화탄소가 필요합니다. " * 6,
+    "teacher_evaluate": "👨‍🏫 **Teacher (평가)**\n\n" + "⭕ 정답입니다! 광합성은 엽록체에서 일어나며 산소를 방출합니다. " * 8,
+}
+
+
+def baseline_turn() -> int:
+    def event(data):
+        return f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+    size = len(event({"type": "session", "session_id": "0f8fad5b-d9cb-469f-a165-70867728950e", "coalesced": False}))
+    for node in NODES:
+        size += len(event({"type": "node_start", "node": node, "label": node}))
+        size += len(event({"type": "message", "node": node, "content": CONTENT[node]}))
+        size += len(event({"type": "node_end", "node": node}))
+        if node in SSE_FORMAT.waiting:
+            size += len(event({"type": "waiting", "message": "🧑‍🎓 Student가 생각 중..."}))
+    size += len(event({"type": "done"}))
+    return size
+
+
+def current_turn() -> int:
+    size = len(sse_event({"type": "session", "session_id": "0f8fad5b-d9cb-469f-a165-70867728950e", "coalesced": False}))
+    for node in NODES:
+        size += len(sse_event({"type": "node_start", "node": node, "label": node}))
+        size += len(sse_event({"type": "message", "node": node, "content": CONTENT[node]}))
+        size += len(SSE_FORMAT.node_end[node])
+        if node in SSE_FORMAT.waiting:
+            size += len(SSE_FORMAT.waiting[node])
+    size += len(SSE_FORMAT.done)
+    return size
+
+
+EVENTS_PER_TURN = 1 + len(NODES) * 3 + len(SSE_FORMAT.waiting) + 1
+
+
+def bench(fn, turns: int = 20000) -> tuple[float, int]:
+    fn()  # warmup
+    start = time.perf_counter()
+    for _ in range(turns):
+        size = fn()
+    elapsed = time.perf_counter() - start
+    return turns * EVENTS_PER_TURN / elapsed, size
+
+
+def main():
+    base_eps, base_size = bench(baseline_turn)
+    cur_eps, cur_size = bench(current_turn)
+    print(f"JSON backend: {JSON_BACKEND} | {EVENTS_PER_TURN} events/turn")
+    print(f"{'path':<12}{'events/sec':>14}{'bytes/turn':>12}")
+    print(f"{'baseline':<12}{base_eps:>14,.0f}{base_size:>12}")
+    print(f"{'current':<12}{cur_eps:>14,.0f}{cur_size:>12}")
+    print(f"speedup: x{cur_eps / base_eps:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""정적 자원 서빙 벤치마크 - 페이지 로드당 전송 bytes / 요청 수 절감량
+
+실행: python benchmarks/bench_static_assets.py
+
+비교 대상:
+- baseline: 매 요청마다 index.html read_text + StaticFiles (압축/immutable 캐시 없음)
+- 첫 방문: 사전 압축본(br > gzip) 전송
+- 재방문: HTML은 ETag 재검증(304), 해시 URL 자원은 immutable 캐시 → 요청 없음
+"""
+from pathlib import Path
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from app.assets import StaticAssetStore, TemplateCache, brotli
+
+ROOT = Path(__file__).parent.parent
+ACCEPT_ENCODING = "gzip, deflate, br" if brotli is not None else "gzip, deflate"
+
+
+def main():
+    assets = StaticAssetStore(ROOT / "static")
+    template = TemplateCache(ROOT / "templates" / "index.html", assets)
+    page_refs = template.static_refs()
+
+    html_raw = (ROOT / "templates" / "index.html").read_bytes()
+    baseline_bytes = len(html_raw) + sum(len(assets.get(ref).body) for ref in page_refs)
+    baseline_requests = 1 + len(page_refs)
+
+    html = template.get()
+    first_bytes = len(html.negotiate(ACCEPT_ENCODING)[0])
+    first_bytes += sum(len(assets.get(ref).negotiate(ACCEPT_ENCODING)[0]) for ref in page_refs)
+
+    repeat_bytes = 0        # 304 응답은 본문 없음
+    repeat_requests = 1     # HTML 재검증만 (해시 URL 자원은 캐시에서)
+
+    print(f"Accept-Encoding: {ACCEPT_ENCODING}")
+    print(f"Page assets: index.html + {page_refs}")
+    print("-" * 60)
+    print(f"{'scenario':<22}{'requests':>10}{'bytes':>12}{'saved':>12}")
+    print(f"{'baseline (per load)':<22}{baseline_requests:>10}{baseline_bytes:>12}{'-':>12}")
+    print(f"{'first visit':<22}{baseline_requests:>10}{first_bytes:>12}{baseline_bytes - first_bytes:>12}")
+    print(f"{'repeat visit':<22}{repeat_requests:>10}{repeat_bytes:>12}{baseline_bytes - repeat_bytes:>12}")
+    print("-" * 60)
+
+    # 디렉터리 전체 압축 효과 (PNG 등 이미 압축된 자원은 원본 그대로 서빙)
+    for rel_path, asset in assets.items().items():
+        variants = ", ".join(f"{enc}={len(body)}" for enc, body in asset.variants.items()) or "identity only"
+        print(f"  {rel_path:<40} {len(asset.body):>8} B  ({variants})")
+
+    # 템플릿 서빙 비용: read_text (baseline) vs 캐시 조회
+    n = 2000
+    start = time.perf_counter()
+    for _ in range(n):
+        (ROOT / "templates" / "index.html").read_text(encoding="utf-8")
+    read_us = (time.perf_counter() - start) / n * 1e6
+    start = time.perf_counter()
+    for _ in range(n):
+        template.get()
+    cached_us = (time.perf_counter() - start) / n * 1e6
+    print("-" * 60)
+    print(f"index.html per hit: read_text {read_us:.1f} µs → cached {cached_us:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
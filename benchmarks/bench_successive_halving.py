@@ -0,0 +1,82 @@
+"""APO 후보 평가 벤치마크 - APO_EVAL_MODE full vs racing vs halving
+
+실행: python benchmarks/bench_successive_halving.py [--trials 500] [--candidates 8] [--val-batch 16] [--beam-width 2]
+
+LLM 없이 후보마다 실제 정답률(true accuracy)을 정해 두고 태스크별 reward를 Bernoulli로 뽑아
+training/racing.py의 race_candidates로 beam을 고른다 (APO 기본 설정: beam_width 2, branch_factor 2 → 후보 최대 8개).
+- rollouts/round : 라운드(후보 집합 하나)당 평가 rollout 수
+- top-1 acc      : 선택된 beam 1위의 실제 정답률 평균 (학습이 최종 프롬프트로 가져가는 품질)
+- regret         : 후보 중 최고 정답률 - 선택된 1위 정답률 (평균)
+- best kept      : 실제 최고 후보가 beam에 남은 비율
+"""
+from pathlib import Path
+import argparse
+import asyncio
+import random
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from training.racing import race_candidates
+
+
+async def run_trial(rng: random.Random, args, mode: str, accuracies: list[float], seed: int) -> dict:
+    # 같은 trial은 모드와 상관없이 같은 (후보, 태스크) reward를 보도록 결과를 미리 뽑아 둠
+    task_rng = random.Random(seed)
+    outcomes = [[1.0 if task_rng.random() < acc else 0.0 for _ in range(args.val_batch)] for acc in accuracies]
+    tasks = list(range(args.val_batch))
+
+    async def evaluate(candidate: int, batch) -> list[float]:
+        return [outcomes[candidate][task] for task in batch]
+
+    if mode == "full":
+        ranked, spent = await race_candidates(range(len(accuracies)), tasks, evaluate, keep=len(accuracies))
+    else:
+        ranked, spent = await race_candidates(
+            range(len(accuracies)), tasks, evaluate, keep=args.beam_width, mode=mode,
+            min_tasks=args.min_tasks, budget=args.budget, confidence=args.confidence,
+        )
+    beam = [score.candidate for score in ranked[:args.beam_width]]
+    best = max(range(len(accuracies)), key=lambda c: accuracies[c])
+    return {
+        "rollouts": spent,
+        "top1": accuracies[beam[0]],
+        "regret": accuracies[best] - accuracies[beam[0]],
+        "best_kept": best in beam,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trials", type=int, default=500)
+    parser.add_argument("--candidates", type=int, default=8)
+    parser.add_argument("--val-batch", type=int, default=16)
+    parser.add_argument("--beam-width", type=int, default=2)
+    parser.add_argument("--min-tasks", type=int, default=2)
+    parser.add_argument("--budget", type=int, default=0)
+    parser.add_argument("--confidence", type=float, default=0.9)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    # 후보 정답률: 대부분 비슷한 수준 + 가끔 확실히 나쁜 편집 (APO 편집 결과 분포를 흉내)
+    trials = []
+    for _ in range(args.trials):
+        accuracies = [min(0.95, max(0.05, rng.gauss(0.6, 0.1))) if rng.random() > 0.3 else rng.uniform(0.1, 0.4)
+                      for _ in range(args.candidates)]
+        trials.append((accuracies, rng.randrange(1 << 30)))
+
+    print(f"trials: {args.trials} | candidates: {args.candidates} | val batch: {args.val_batch} | "
+          f"beam width: {args.beam_width} | min tasks: {args.min_tasks} | budget: {args.budget or 'unlimited'}")
+    print(f"{'mode':<10}{'rollouts/round':>16}{'vs full':>10}{'top-1 acc':>12}{'regret':>10}{'best kept':>12}")
+    full_rollouts = args.candidates * args.val_batch
+    for mode in ("full", "racing", "halving"):
+        results = [asyncio.run(run_trial(rng, args, mode, accuracies, seed)) for accuracies, seed in trials]
+        n = len(results)
+        rollouts = sum(r["rollouts"] for r in results) / n
+        print(f"{mode:<10}{rollouts:>16.1f}{rollouts / full_rollouts:>10.0%}"
+              f"{sum(r['top1'] for r in results) / n:>12.3f}{sum(r['regret'] for r in results) / n:>10.3f}"
+              f"{sum(r['best_kept'] for r in results) / n:>12.0%}")
+
+
+if __name__ == "__main__":
+    main()
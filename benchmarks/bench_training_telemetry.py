@@ -0,0 +1,128 @@
+"""학습 telemetry 오버헤드 벤치마크 - TRAINING_TELEMETRY detailed vs summary
+
+실행: python benchmarks/bench_training_telemetry.py [--rounds 20] [--rollouts-per-round 16]
+
+LLM / Agent Lightning runner 없이 hook만 rollout 수만큼 호출하고 (가짜 runner / reward span),
+span은 OTLP 대신 in-memory exporter로 받아 측정한다.
+- µs/rollout     : rollout 하나당 hook 호출에 쓴 시간 (span 생성 + 속성 설정 + 집계)
+- spans/rollout  : export된 span 수
+- attr KiB/rollout : export된 span 속성 크기 (문자열 길이 합, 대략적인 전송량)
+- retained KiB   : 전체 실행 후 hook이 들고 있는 메모리 (tracemalloc, gc 이후, export된 span 제외)
+"""
+from pathlib import Path
+import argparse
+import asyncio
+import gc
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from training import telemetry
+
+PROMPT = "당신은 퀴즈 문제를 푸는 학생입니다. 문제를 단계적으로 풀고 마지막 줄에 정답만 적으세요.\n" * 30
+
+
+class FakeStore:
+    def __init__(self, prompts: dict):
+        self.prompts = prompts
+
+    async def get_resources_by_id(self, resources_id: str):
+        return SimpleNamespace(resources_id=resources_id, resources={"prompt_template": SimpleNamespace(template=self.prompts[resources_id])})
+
+
+class FakeRunner:
+    def __init__(self, store: FakeStore):
+        self.store = store
+        self.resources_id = None
+
+    def get_store(self):
+        return self.store
+
+    def get_worker_id(self):
+        return "bench-0"
+
+    def get_resources(self):
+        return {"prompt_template": SimpleNamespace(template=self.store.prompts[self.resources_id])}
+
+
+def reward_spans(reward: float) -> list:
+    """LLM 호출 span 몇 개 + 마지막 reward span (Agent Lightning emit_reward 형식)"""
+    llm = [SimpleNamespace(name="openai.chat", attributes={"agentlightning.message.body": "정답은 4번입니다. " * 40})
+           for _ in range(3)]
+    reward_span = SimpleNamespace(name="agentlightning.annotation", attributes={
+        "agentlightning.reward.0.name": "primary", "agentlightning.reward.0.value": reward,
+    })
+    return llm + [reward_span]
+
+
+async def run_hook(hook, rounds: int, per_round: int) -> float:
+    prompts = {f"res-{r}": f"{PROMPT}\n# 버전 {r}" for r in range(rounds)}
+    runner = FakeRunner(FakeStore(prompts))
+    agent = SimpleNamespace(__name__="quiz_agent")
+    elapsed = 0.0
+    for r in range(rounds):
+        runner.resources_id = f"res-{r}"
+        for i in range(per_round):
+            rollout = SimpleNamespace(rollout_id=f"ro-{r}-{i}", resources_id=runner.resources_id)
+            spans = reward_spans(float((r + i) % 2))
+            start = time.perf_counter()
+            await hook.on_rollout_start(agent=agent, runner=runner, rollout=rollout)
+            await hook.on_trace_start(agent=agent, runner=runner, tracer=None, rollout=rollout)
+            await hook.on_trace_end(agent=agent, runner=runner, tracer=None, rollout=rollout)
+            await hook.on_rollout_end(agent=agent, runner=runner, rollout=rollout, spans=spans)
+            elapsed += time.perf_counter() - start
+    start = time.perf_counter()
+    telemetry.flush_training_telemetry()  # 열린 라운드 요약 + export 큐
+    return elapsed + (time.perf_counter() - start)
+
+
+def attribute_bytes(spans) -> int:
+    total = 0
+    for span in spans:
+        for key, value in (span.attributes or {}).items():
+            total += len(key) + len(str(value))
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--rollouts-per-round", type=int, default=16)
+    args = parser.parse_args()
+
+    from training.train import DetailedTrainingHook
+
+    exporter = InMemorySpanExporter()
+    telemetry.configure_span_exporter(exporter)
+    rollouts = args.rounds * args.rollouts_per_round
+    hooks = (("detailed", DetailedTrainingHook), ("summary", telemetry.SummaryTrainingHook))
+    for _, factory in hooks:  # warmup: export 파이프라인 / OTel 내부 지연 초기화
+        asyncio.run(run_hook(factory(initial_prompt=PROMPT), 1, 2))
+
+    print(f"rounds: {args.rounds} | rollouts/round: {args.rollouts_per_round} | prompt: {len(PROMPT)} chars")
+    print(f"{'mode':<10}{'µs/rollout':>12}{'spans/rollout':>15}{'attr KiB/rollout':>18}{'retained KiB':>14}")
+    for mode, factory in hooks:
+        tracemalloc.start()
+        hook = factory(initial_prompt=PROMPT)
+        exporter.clear()
+        gc.collect()
+        before = tracemalloc.get_traced_memory()[0]
+        elapsed = asyncio.run(run_hook(hook, args.rounds, args.rollouts_per_round))
+        spans = exporter.get_finished_spans()
+        span_count, span_bytes = len(spans), attribute_bytes(spans)
+        exporter.clear()
+        del spans
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        print(f"{mode:<10}{elapsed / rollouts * 1e6:>12.1f}{span_count / rollouts:>15.2f}"
+              f"{span_bytes / rollouts / 1024:>18.2f}{retained / 1024:>14.1f}")
+        del hook
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""워커 수별 처리량/지연시간 벤치마크 - SERVER_WORKERS 기본값 검증용
+
+실행 (배포와 같은 CPU limit 컨테이너 안에서):
+    docker run --cpus=1 ... python benchmarks/bench_workers.py --workers 1 2 4
+
+각 워커 수로 run_server.py를 띄우고 동시 요청을 보내 RPS / p50 / p99를 측정한다.
+AZURE_OPENAI_ENDPOINT 등 서버 실행에 필요한 환경변수가 설정되어 있어야 한다.
+"""
+from pathlib import Path
+import argparse
+import http.client
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = Path(__file__).parent.parent
+
+
+def wait_ready(port: int, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"server on :{port} not ready after {timeout}s")
+
+
+def load(port: int, path: str, concurrency: int, duration: float) -> list[float]:
+    latencies: list[float] = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        local = []
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            conn.request("GET", path, headers={"Accept-Encoding": "gzip, br"})
+            conn.getresponse().read()
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--path", default="/health")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--port", type=int, default=18000)
+    args = parser.parse_args()
+
+    print(f"path={args.path} concurrency={args.concurrency} duration={args.duration}s cpus={os.cpu_count()}")
+    print(f"{'workers':>8}{'rps':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for workers in args.workers:
+        env = {**os.environ, "SERVER_WORKERS": str(workers), "SERVER_PORT": str(args.port)}
+        server = subprocess.Popen([sys.executable, "run_server.py"], cwd=ROOT, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_ready(args.port)
+            latencies = load(args.port, args.path, args.concurrency, args.duration)
+        finally:
+            server.terminate()
+            server.wait(timeout=60)
+        q = statistics.quantiles(latencies, n=100)
+        print(f"{workers:>8}{len(latencies) / args.duration:>10.0f}{q[49] * 1000:>10.1f}{q[98] * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""퀴즈 스트림 전송 벤치마크 - SSE(/chat/stream) vs WebSocket(/chat/ws)
+
+실행: AZURE_OPENAI_ENDPOINT=https://x AZURE_OPENAI_API_KEY=x python benchmarks/bench_ws_stream.py [--turns 50]
+
+uvicorn을 같은 프로세스에서 띄우고 (lifespan off) LLM 대신 고정 응답을 내는 가짜 그래프로 한 세션의 여러 턴을 실행한다.
+클라이언트 ↔ 서버 사이에 바이트를 세는 TCP 프록시를 둔다.
+- sse/new       : 턴마다 새 TCP 연결로 POST (Connection: close) - 프록시 / 브라우저가 연결을 재사용하지 못하는 경우
+- sse/keepalive : 연결 하나에 턴마다 POST
+- ws            : 연결 하나 (업그레이드 한 번)에 턴마다 텍스트 요청 → 바이너리 이벤트
+측정 (턴 평균): connect ms (TCP 연결 / 업그레이드), first event ms (요청 전송 → 첫 이벤트),
+turn ms (요청 전송 → done, 노드 메시지마다 서버의 0.1초 대기 포함), 요청 / 응답 바이트 (HTTP 헤더 / 프레이밍 포함)
+"""
+from pathlib import Path
+import argparse
+import http.client
+import json
+import socket
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+NODES = ("teacher_question", "student_answer", "teacher_evaluate")
+CONTENT = {
+    "teacher_question": "👨‍🏫 **Teacher (문제 #1)**\n\n" + "다음 중 광합성에 필요한 요소가 아닌 것은 무엇일까요? " * 4,
+    "student_answer": "🧑‍🎓 **Student**\n\n" + "먼저 광합성의 재료를 떠올려 보면 빛, 물, 이산화탄소가 필요합니다. " * 6,
+    "teacher_evaluate": "👨‍🏫 **Teacher (평가)**\n\n" + "⭕ 정답입니다! 광합성은 엽록체에서 일어나며 산소를 방출합니다. " * 8,
+}
+FIRST_MESSAGE = "보통 난이도로 수학 문제 풀래"
+
+
+class FakeGraph:
+    """노드 출력만 흉내내는 그래프 (astream updates + get_state)"""
+
+    async def astream(self, state, config=None, stream_mode=None, durability=None):
+        from langchain_core.messages import AIMessage
+        for node in NODES:
+            yield {node: {"messages": [AIMessage(content=CONTENT[node])]}}
+
+    def get_state(self, config):
+        class Snapshot:
+            values = {"phase": "complete", "difficulty": "보통", "subject": "수학", "round_count": 1}
+        return Snapshot()
+
+
+# === 바이트 카운팅 프록시 ===
+class Counter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sent = self.received = 0
+
+    def add(self, upstream: bool, size: int):
+        with self.lock:
+            if upstream:
+                self.sent += size
+            else:
+                self.received += size
+
+    def take(self) -> tuple[int, int]:
+        with self.lock:
+            values = self.sent, self.received
+            self.sent = self.received = 0
+        return values
+
+
+def _pipe(src: socket.socket, dst: socket.socket, counter: Counter, upstream: bool):
+    try:
+        while data := src.recv(65536):
+            counter.add(upstream, len(data))
+            dst.sendall(data)
+    except OSError:
+        pass
+    finally:
+        for s in (src, dst):
+            try:
+                s.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+def _proxy(listener: socket.socket, upstream_port: int, counter: Counter):
+    while True:
+        client, _ = listener.accept()
+        upstream = socket.create_connection(("127.0.0.1", upstream_port))
+        for sock in (client, upstream):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        threading.Thread(target=_pipe, args=(client, upstream, counter, True), daemon=True).start()
+        threading.Thread(target=_pipe, args=(upstream, client, counter, False), daemon=True).start()
+
+
+def start_server() -> int:
+    import uvicorn
+    from opentelemetry import trace
+    import app.main as main
+
+    main.graph = FakeGraph()
+    main.tracer = trace.get_tracer("bench")
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=0, lifespan="off", log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server.servers[0].sockets[0].getsockname()[1]
+
+
+# === 클라이언트 ===
+def sse_turns(port: int, turns: int, keepalive: bool) -> list[dict]:
+    results, session_id, session_state, conn = [], None, None, None
+    for i in range(turns):
+        start = time.perf_counter()
+        if conn is None:
+            conn = http.client.HTTPConnection("127.0.0.1", port)
+            conn.connect()
+        connected = time.perf_counter()
+        body = json.dumps({"message": FIRST_MESSAGE if i == 0 else "다음", "session_id": session_id,
+                           "session_state": session_state})
+        headers = {"Content-Type": "application/json"}
+        if not keepalive:
+            headers["Connection"] = "close"
+        conn.request("POST", "/chat/stream", body=body, headers=headers)
+        response = conn.getresponse()
+        if response.status != 200:
+            raise RuntimeError(f"/chat/stream {response.status}: {response.read()[:200]!r}")
+        first = None
+        while line := response.readline():
+            if not line.startswith(b"data: "):
+                continue
+            first = first or time.perf_counter()
+            event = json.loads(line[6:])
+            if event["type"] == "session":
+                session_id = event["session_id"]
+            elif event["type"] == "state":
+                session_state = event["session_state"]
+        done = time.perf_counter()
+        if not keepalive:
+            conn.close()
+            conn = None
+        results.append({"connect": connected - start, "first": first - connected, "turn": done - connected})
+    if conn is not None:
+        conn.close()
+    return results
+
+
+def ws_turns(port: int, turns: int) -> list[dict]:
+    from websockets.sync.client import connect
+    from app.serialization import WS_EVENT_CODES
+
+    done_code = WS_EVENT_CODES["done"]
+    results = []
+    start = time.perf_counter()
+    with connect(f"ws://127.0.0.1:{port}/chat/ws", compression=None) as ws:
+        connect_time = time.perf_counter() - start
+        for i in range(turns):
+            sent = time.perf_counter()
+            # session_id는 연결이 기억하므로 메시지만 보냄
+            ws.send(json.dumps({"message": FIRST_MESSAGE if i == 0 else "다음"}))
+            first = None
+            while True:
+                frame = ws.recv()
+                first = first or time.perf_counter()
+                # [code, ...] - fixarray 헤더 1바이트 뒤 positive fixint 이벤트 코드
+                if frame[1] == done_code:
+                    break
+            done = time.perf_counter()
+            results.append({"connect": connect_time if i == 0 else 0.0, "first": first - sent, "turn": done - sent})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=50)
+    args = parser.parse_args()
+
+    port = start_server()
+    listener = socket.socket()
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(64)
+    counter = Counter()
+    threading.Thread(target=_proxy, args=(listener, port, counter), daemon=True).start()
+    proxy_port = listener.getsockname()[1]
+
+    print(f"turns: {args.turns} (턴마다 노드 {len(NODES)}개, 노드 메시지마다 서버 대기 0.1초)")
+    print(f"{'transport':<15}{'connect ms':>11}{'first event ms':>16}{'turn ms':>9}{'p95 turn ms':>13}"
+          f"{'req B/turn':>12}{'resp B/turn':>13}")
+    runs = {
+        "sse/new": lambda: sse_turns(proxy_port, args.turns, keepalive=False),
+        "sse/keepalive": lambda: sse_turns(proxy_port, args.turns, keepalive=True),
+        "ws": lambda: ws_turns(proxy_port, args.turns),
+    }
+    for name, run in runs.items():
+        counter.take()
+        results = run()
+        time.sleep(0.2)  # 프록시 카운터 반영
+        sent, received = counter.take()
+        turns = [r["turn"] * 1000 for r in results]
+        print(f"{name:<15}{statistics.mean(r['connect'] for r in results) * 1000:>11.2f}"
+              f"{statistics.mean(r['first'] for r in results) * 1000:>16.2f}"
+              f"{statistics.mean(turns):>9.1f}{statistics.quantiles(turns, n=20)[-1]:>13.1f}"
+              f"{sent / len(results):>12.0f}{received / len(results):>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
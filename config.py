@@ -4,7 +4,9 @@
 1. AZURE_OPENAI_API_KEY 환경변수가 있으면 API Key 인증
 2. 없으면 DefaultAzureCredential (AKS Workload Identity / Service Connector)
 """
+import math
 import os
+from pathlib import Path
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -34,5 +36,210 @@ else:
 AZURE_OPENAI_DEPLOYMENT_NAME = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME", "gpt-4o")
 AZURE_OPENAI_API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION", "2024-08-01-preview")
 
-# === OpenTelemetry ===
-OTEL_EXPORTER_OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4317")
+# === LLM Router (llm_router.py) ===
+# 배포 목록 "alias=deployment@endpoint" / 역할별 배포 "role=alias|alias" (콤마 구분)
+# 예: LLM_DEPLOYMENTS="gpt-4o-mini,gpt-4o-swe=gpt-4o@https://swe.openai.azure.com/"
+#     LLM_ROLE_ROUTES="student=gpt-4o-mini,teacher_evaluate=gpt-4o|gpt-4o-swe"
+LLM_DEPLOYMENTS = os.getenv("LLM_DEPLOYMENTS", "")
+LLM_ROLE_ROUTES = os.getenv("LLM_ROLE_ROUTES", "")
+
+# === Hedged LLM 요청 (app/hedging.py) ===
+# 첫 토큰이 최근 HEDGE_PERCENTILE 백분위 지연보다 늦으면 중복 요청, hedge 비율은 HEDGE_MAX_RATE 이하
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "false").lower() == "true"
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "2.0"))  # 샘플이 쌓이기 전 / 최소 hedge 지연 (초)
+HEDGE_MAX_RATE = float(os.getenv("HEDGE_MAX_RATE", "0.05"))
+# hedging 중 노드 LLM 스트림의 읽기 timeout (초) - 첫 청크 전에 멈춘 요청(취소된 쪽 포함)이 hedge 스레드를 붙잡는 상한
+HEDGE_REQUEST_TIMEOUT = float(os.getenv("HEDGE_REQUEST_TIMEOUT", "30"))
+# hedge 요청 스레드 풀 크기 - 동시에 실행되는 노드 LLM 호출 수 이상
+# (동기 노드는 asyncio 기본 executor에서 실행되어 프로세스당 최대 min(32, CPU + 4)개)
+HEDGE_MAX_WORKERS = int(os.getenv("HEDGE_MAX_WORKERS", "32"))
+
+# === Batched LLM-as-Judge (training/evaluator.py) ===
+# JUDGE_BATCH_SIZE > 1이면 runner 프로세스들의 채점 요청을 메인 프로세스의 judge 서버가 JUDGE_BATCH_WINDOW(초) 동안 모아 한 번에 채점
+JUDGE_BATCH_SIZE = int(os.getenv("JUDGE_BATCH_SIZE", "1"))
+JUDGE_BATCH_WINDOW = float(os.getenv("JUDGE_BATCH_WINDOW", "0.2"))
+JUDGE_CONSISTENCY_SAMPLE_RATE = float(os.getenv("JUDGE_CONSISTENCY_SAMPLE_RATE", "0.05"))  # 단건 재채점 비교 비율
+
+# === 학습 telemetry (training/telemetry.py) ===
+# detailed: rollout마다 시작/결과 span + 프롬프트 본문 / summary: 라운드(프롬프트 버전)당 요약 span 하나, 프롬프트는 hash로 한 번만
+TRAINING_TELEMETRY = os.getenv("TRAINING_TELEMETRY", "detailed")
+if TRAINING_TELEMETRY not in ("detailed", "summary"):
+    raise RuntimeError(f"Invalid TRAINING_TELEMETRY '{TRAINING_TELEMETRY}' (expected detailed or summary)")
+
+# === Rollout 캐시 (training/rollout_cache.py) ===
+# on: 같은 프롬프트/태스크/모델 rollout의 reward를 재사용 / SAMPLES>1이면 키마다 N개 결과를 모은 뒤 무작위 재사용
+ROLLOUT_CACHE = os.getenv("ROLLOUT_CACHE", "off")
+if ROLLOUT_CACHE not in ("off", "on"):
+    raise RuntimeError(f"Invalid ROLLOUT_CACHE '{ROLLOUT_CACHE}' (expected off or on)")
+ROLLOUT_CACHE_PATH = os.getenv("ROLLOUT_CACHE_PATH", "cache/rollouts.sqlite")
+ROLLOUT_CACHE_SAMPLES = int(os.getenv("ROLLOUT_CACHE_SAMPLES", "1"))
+
+# === 학습 reward (training/reward.py) ===
+# correctness: 정답 여부만 / composite: 정답 - student 토큰 / 지연 패널티 (APO가 빠르고 짧은 프롬프트를 선호)
+REWARD_MODE = os.getenv("REWARD_MODE", "correctness")
+if REWARD_MODE not in ("correctness", "composite"):
+    raise RuntimeError(f"Invalid REWARD_MODE '{REWARD_MODE}' (expected correctness or composite)")
+REWARD_PROMPT_TOKEN_PENALTY = float(os.getenv("REWARD_PROMPT_TOKEN_PENALTY", "0.05"))  # 입력 1000 토큰당
+REWARD_COMPLETION_TOKEN_PENALTY = float(os.getenv("REWARD_COMPLETION_TOKEN_PENALTY", "0.2"))  # 출력 1000 토큰당
+REWARD_LATENCY_PENALTY = float(os.getenv("REWARD_LATENCY_PENALTY", "0.02"))  # 지연 1초당
+
+# === 학습 데이터셋 (training/dataset.py) ===
+# DATASET_PATHS: 콤마로 구분한 JSONL 경로 / glob (비우면 내장 데이터셋)
+DATASET_PATHS = [p.strip() for p in os.getenv("DATASET_PATHS", "").split(",") if p.strip()]
+DATASET_VAL_FRACTION = float(os.getenv("DATASET_VAL_FRACTION", "0.2"))
+if not 0 < DATASET_VAL_FRACTION < 1:
+    raise RuntimeError(f"Invalid DATASET_VAL_FRACTION {DATASET_VAL_FRACTION} (expected between 0 and 1)")
+DATASET_SPLIT_SEED = os.getenv("DATASET_SPLIT_SEED", "quiz")  # 분할 / 샤드 해시 키
+_dataset_shard = os.getenv("DATASET_SHARD", "0/1")  # "i/n": n개 학습 작업 중 i번째가 쓸 train 샤드
+try:
+    DATASET_SHARD = tuple(int(part) for part in _dataset_shard.split("/"))
+    if len(DATASET_SHARD) != 2 or not 0 <= DATASET_SHARD[0] < DATASET_SHARD[1]:
+        raise ValueError
+except ValueError:
+    raise RuntimeError(f"Invalid DATASET_SHARD '{_dataset_shard}' (expected i/n with 0 <= i < n)") from None
+
+# === Gradient 태스크 샘플링 (training/sampler.py) ===
+# uniform: APO 기본 균등 샘플링 / adaptive: 실패하거나 불확실한 태스크 가중 (SAMPLER_FLOOR 비율은 균등)
+TRAINING_SAMPLER = os.getenv("TRAINING_SAMPLER", "uniform")
+if TRAINING_SAMPLER not in ("uniform", "adaptive"):
+    raise RuntimeError(f"Invalid TRAINING_SAMPLER '{TRAINING_SAMPLER}' (expected uniform or adaptive)")
+SAMPLER_FLOOR = float(os.getenv("SAMPLER_FLOOR", "0.2"))
+if not 0 <= SAMPLER_FLOOR <= 1:
+    raise RuntimeError(f"Invalid SAMPLER_FLOOR {SAMPLER_FLOOR} (expected between 0 and 1)")
+SAMPLER_DECAY = float(os.getenv("SAMPLER_DECAY", "0.9"))  # 관측마다 이전 통계에 곱하는 감쇠 (1: 감쇠 없음)
+if not 0 < SAMPLER_DECAY <= 1:
+    raise RuntimeError(f"Invalid SAMPLER_DECAY {SAMPLER_DECAY} (expected 0 < decay <= 1)")
+
+# === 학습 체크포인트 (training/checkpoint.py) ===
+# 라운드마다 APO 상태 저장 위치 (비우면 저장 안 함), run_training.py --resume으로 이어서 실행
+TRAINING_CHECKPOINT_DIR = os.getenv("TRAINING_CHECKPOINT_DIR", "checkpoints/training")
+
+# === APO 후보 평가 (training/racing.py) ===
+# full: 모든 후보를 validation batch 전체로 채점 / racing: 신뢰구간으로 열세 후보 조기 탈락 / halving: racing + 단계마다 상위 1/2
+APO_EVAL_MODE = os.getenv("APO_EVAL_MODE", "full")
+if APO_EVAL_MODE not in ("full", "racing", "halving"):
+    raise RuntimeError(f"Invalid APO_EVAL_MODE '{APO_EVAL_MODE}' (expected full, racing or halving)")
+APO_EVAL_MIN_TASKS = int(os.getenv("APO_EVAL_MIN_TASKS", "2"))  # 첫 단계 태스크 수 (이후 2배씩)
+if APO_EVAL_MIN_TASKS < 1:
+    raise RuntimeError(f"Invalid APO_EVAL_MIN_TASKS {APO_EVAL_MIN_TASKS} (expected >= 1)")
+APO_EVAL_BUDGET = int(os.getenv("APO_EVAL_BUDGET", "0"))  # 라운드당 후보 평가 rollout 상한 (0: 무제한)
+APO_EVAL_CONFIDENCE = float(os.getenv("APO_EVAL_CONFIDENCE", "0.9"))  # 탈락 판정 신뢰수준
+if not 0 < APO_EVAL_CONFIDENCE < 1:
+    raise RuntimeError(f"Invalid APO_EVAL_CONFIDENCE {APO_EVAL_CONFIDENCE} (expected between 0 and 1)")
+
+# === LLM Cassette (llm_cassette.py) ===
+# record: 모든 LLM 요청/응답을 LLM_CASSETTE_DIR에 녹화 / replay: 녹화된 응답을 (배율 적용한) 원래 지연으로 재생
+LLM_CASSETTE_MODE = os.getenv("LLM_CASSETTE_MODE", "off")
+LLM_CASSETTE_DIR = os.getenv("LLM_CASSETTE_DIR", "cassettes/default")
+LLM_CASSETTE_LATENCY_SCALE = float(os.getenv("LLM_CASSETTE_LATENCY_SCALE", "1.0"))
+
+# === 체크포인트 직렬화 (app/checkpoint_serde.py) ===
+# default: LangGraph 기본 serde / compact: 퀴즈 State 전용 msgpack + 메시지 본문 중복 제거
+CHECKPOINT_SERDE = os.getenv("CHECKPOINT_SERDE", "default")
+if CHECKPOINT_SERDE not in ("default", "compact"):
+    raise RuntimeError(f"Invalid CHECKPOINT_SERDE '{CHECKPOINT_SERDE}' (expected default or compact)")
+CHECKPOINT_COMPRESSION = os.getenv("CHECKPOINT_COMPRESSION", "none")  # compact 전용
+if CHECKPOINT_COMPRESSION not in ("none", "zstd"):
+    raise RuntimeError(f"Invalid CHECKPOINT_COMPRESSION '{CHECKPOINT_COMPRESSION}' (expected none or zstd)")
+CHECKPOINT_ZSTD_LEVEL = int(os.getenv("CHECKPOINT_ZSTD_LEVEL", "3"))
+
+# === 그래프 실행 durability (app/main.py) ===
+# sync: 매 step 체크포인트 저장 후 다음 step / async: 다음 step과 병렬로 백그라운드 저장 / exit: 실행 종료 시 1회 저장
+GRAPH_DURABILITY = os.getenv("GRAPH_DURABILITY", "async")
+if GRAPH_DURABILITY not in ("sync", "async", "exit"):
+    raise RuntimeError(f"Invalid GRAPH_DURABILITY '{GRAPH_DURABILITY}' (expected sync, async or exit)")
+
+# === 관리자 / 프로파일링 (app/main.py /admin/*, app/profiling.py) ===
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")  # 비어 있으면 /admin/* 비활성 (404), 요청은 Authorization: Bearer <token>
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))  # /chat 요청 중 프로파일링 비율 (0 = 끔)
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))   # 스택 샘플링 간격 (초)
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+MEMORY_TRACEMALLOC_FRAMES = int(os.getenv("MEMORY_TRACEMALLOC_FRAMES", "0"))  # >0이면 워커 시작부터 tracemalloc (traceback 프레임 수)
+
+# === OpenTelemetry (otel_export.py) ===
+# grpc: OTLP/gRPC (4317) / http/protobuf: OTLP/HTTP (4318, 신호별 /v1/traces · /v1/metrics 경로 추가)
+OTEL_EXPORTER_OTLP_PROTOCOL = os.getenv("OTEL_EXPORTER_OTLP_PROTOCOL", "grpc")
+if OTEL_EXPORTER_OTLP_PROTOCOL not in ("grpc", "http/protobuf"):
+    raise RuntimeError(f"Invalid OTEL_EXPORTER_OTLP_PROTOCOL '{OTEL_EXPORTER_OTLP_PROTOCOL}' (expected grpc or http/protobuf)")
+OTEL_EXPORTER_OTLP_ENDPOINT = os.getenv(
+    "OTEL_EXPORTER_OTLP_ENDPOINT",
+    "http://localhost:4318" if OTEL_EXPORTER_OTLP_PROTOCOL == "http/protobuf" else "http://localhost:4317",
+)
+OTEL_EXPORTER_OTLP_COMPRESSION = os.getenv("OTEL_EXPORTER_OTLP_COMPRESSION", "gzip")  # gzip | none
+if OTEL_EXPORTER_OTLP_COMPRESSION not in ("gzip", "none"):
+    raise RuntimeError(f"Invalid OTEL_EXPORTER_OTLP_COMPRESSION '{OTEL_EXPORTER_OTLP_COMPRESSION}' (expected gzip or none)")
+OTLP_EXPORT_TIMEOUT = float(os.getenv("OTLP_EXPORT_TIMEOUT", "10"))  # export 한 번의 deadline (초, 재시도 backoff 포함)
+# BatchSpanProcessor: 큐가 차면 새 span은 버려짐 / 한 번에 보내는 span 수 / export 주기
+OTLP_MAX_QUEUE_SIZE = int(os.getenv("OTLP_MAX_QUEUE_SIZE", "2048"))
+OTLP_MAX_EXPORT_BATCH_SIZE = int(os.getenv("OTLP_MAX_EXPORT_BATCH_SIZE", "512"))
+if not 0 < OTLP_MAX_EXPORT_BATCH_SIZE <= OTLP_MAX_QUEUE_SIZE:
+    raise RuntimeError(f"Invalid OTLP_MAX_EXPORT_BATCH_SIZE {OTLP_MAX_EXPORT_BATCH_SIZE} (expected 1 ~ OTLP_MAX_QUEUE_SIZE)")
+OTLP_SCHEDULE_DELAY = float(os.getenv("OTLP_SCHEDULE_DELAY", "5"))  # 초
+
+# === 앱 메트릭 (app/metric_views.py) ===
+# reduced: HTTP 계측 attribute 축소 + METRICS_DROP 계측 제거 + 지연 histogram 경계 / default: SDK 기본 view
+METRICS_VIEWS = os.getenv("METRICS_VIEWS", "reduced")
+if METRICS_VIEWS not in ("reduced", "default"):
+    raise RuntimeError(f"Invalid METRICS_VIEWS '{METRICS_VIEWS}' (expected reduced or default)")
+# 내보내지 않을 계측 이름 (콤마 구분, * 와일드카드) - 노드 단위 지표는 collector hostmetrics / kubelet이 수집
+METRICS_DROP = [
+    p.strip() for p in os.getenv(
+        "METRICS_DROP", "system.cpu.utilization,system.network.*,system.disk.*,system.swap.*,process.runtime.context_switches"
+    ).split(",") if p.strip()
+]
+# 지연 histogram 경계 (초, ms 단위 계측은 ×1000) - LLM 호출은 수 초 ~ 수십 초
+METRICS_LATENCY_BUCKETS = [
+    float(b) for b in os.getenv("METRICS_LATENCY_BUCKETS", "0.05,0.1,0.25,0.5,1,2,4,8,15,30,60,120").split(",") if b.strip()
+]
+if not METRICS_LATENCY_BUCKETS or METRICS_LATENCY_BUCKETS != sorted(set(METRICS_LATENCY_BUCKETS)) or METRICS_LATENCY_BUCKETS[0] <= 0:
+    raise RuntimeError(f"Invalid METRICS_LATENCY_BUCKETS {METRICS_LATENCY_BUCKETS} (expected increasing positive seconds)")
+# cumulative: 시작부터 누적 (Prometheus) / delta: 주기별 증분 (Azure Monitor, collector 메모리 절감) / lowmemory: 동기 계측만 delta
+METRICS_TEMPORALITY = os.getenv("METRICS_TEMPORALITY", "cumulative")
+if METRICS_TEMPORALITY not in ("cumulative", "delta", "lowmemory"):
+    raise RuntimeError(f"Invalid METRICS_TEMPORALITY '{METRICS_TEMPORALITY}' (expected cumulative, delta or lowmemory)")
+# trace_based: 샘플링된 span 안에서 기록한 값만 exemplar (trace_id / span_id) / always_on / always_off
+METRICS_EXEMPLARS = os.getenv("METRICS_EXEMPLARS", "trace_based")
+if METRICS_EXEMPLARS not in ("trace_based", "always_on", "always_off"):
+    raise RuntimeError(f"Invalid METRICS_EXEMPLARS '{METRICS_EXEMPLARS}' (expected trace_based, always_on or always_off)")
+METRICS_EXPORT_INTERVAL = float(os.getenv("METRICS_EXPORT_INTERVAL", "15"))  # 초
+
+
+# === Server ===
+def _cgroup_cpu_limit() -> float | None:
+    """컨테이너 CPU limit (cgroup v2 cpu.max / v1 cfs quota), 제한 없으면 None"""
+    try:
+        quota, period = Path("/sys/fs/cgroup/cpu.max").read_text().split()
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        quota = int(Path("/sys/fs/cgroup/cpu/cpu.cfs_quota_us").read_text())
+        period = int(Path("/sys/fs/cgroup/cpu/cpu.cfs_period_us").read_text())
+        return None if quota <= 0 else quota / period
+    except (OSError, ValueError):
+        return None
+
+
+def default_workers() -> int:
+    """CPU limit 기준 워커 수 (워커당 1 CPU, 최소 1)
+
+    LLM 대기가 대부분인 async 워크로드는 워커 하나가 CPU 하나를 다 쓰기 전까지 워커를 늘려도 처리량이
+    늘지 않고, limit보다 워커가 많으면 CFS throttling으로 p99가 나빠진다.
+    배포 환경의 CPU limit별 수치는 benchmarks/bench_workers.py로 측정해 SERVER_WORKERS로 조정.
+    """
+    cpus = _cgroup_cpu_limit() or os.cpu_count() or 1
+    return max(1, math.floor(cpus))
+
+
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS") or default_workers())
+# 종료 예산 (초): SIGTERM → 진행 중인 SSE / WebSocket 턴 drain (GRACEFUL_SHUTDOWN_TIMEOUT)
+# → uvicorn이 남은 연결 종료 대기 (GRACEFUL_CLOSE_TIMEOUT, 넘으면 task 취소) → span/metric flush (OTLP_EXPORT_TIMEOUT)
+# k8s에서는 preStop sleep까지 더한 합이 terminationGracePeriodSeconds보다 작아야 함 (k8s/deployment.yaml)
+GRACEFUL_SHUTDOWN_TIMEOUT = float(os.getenv("GRACEFUL_SHUTDOWN_TIMEOUT", "20"))
+GRACEFUL_CLOSE_TIMEOUT = float(os.getenv("GRACEFUL_CLOSE_TIMEOUT", "5"))
+# /chat/ws: 요청 없이 연결을 유지하는 시간 / 이벤트 프레임 하나를 보내는 데 기다리는 시간 (초, 넘으면 연결 종료)
+WS_IDLE_TIMEOUT = float(os.getenv("WS_IDLE_TIMEOUT", "600"))
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "30"))
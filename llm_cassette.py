@@ -0,0 +1,283 @@
+"""LLM Cassette - LLM 요청/응답 녹화 및 재생 (오프라인 성능 벤치마크용)
+
+설정 (config.py):
+- LLM_CASSETTE_MODE: off(기본) / record / replay
+- LLM_CASSETTE_DIR: cassette 디렉토리 (프로세스별 cassette-<pid>.jsonl.gz, replay 시 디렉토리 전체 로드)
+- LLM_CASSETTE_LATENCY_SCALE: replay 지연 배율 (1.0 = 녹화 당시 지연, 0 = 지연 없음)
+
+녹화 단위: 역할 + 입력 메시지 → 응답 본문, usage, 첫 토큰 지연(ttft), 전체 소요 시간.
+배포(deployment)는 키에 포함하지 않으므로 LLM_ROLE_ROUTES가 달라도 같은 cassette로 재생된다.
+같은 키의 녹화가 여러 개면 녹화 순서대로 돌아가며 재생한다.
+hedge로 같은 요청이 두 번 나가도 녹화는 먼저 첫 청크를 받은 쪽만, 재생은 두 요청 모두 같은 녹화를 사용한다.
+
+적용 지점:
+- app/graph.py 노드: LangChain 스트림 (wrap_stream)
+- training/agent.py, training/evaluator.py: OpenAI chat.completions (call)
+- training/train.py APO gradient/apply_edit: AsyncOpenAI 클라이언트 래퍼 (wrap_async_client)
+"""
+import asyncio
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Iterable, Iterator, Optional
+
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from openai.types.chat import ChatCompletion
+
+from config import LLM_CASSETTE_MODE, LLM_CASSETTE_DIR, LLM_CASSETTE_LATENCY_SCALE
+
+
+class CassetteMissError(LookupError):
+    """replay 모드에서 녹화되지 않은 요청"""
+
+
+def request_key(role: str, messages: list) -> str:
+    """역할 + (메시지 역할, 본문) 목록의 해시"""
+    normalized = [
+        [message.type, message.content] if isinstance(message, BaseMessage) else [message["role"], message["content"]]
+        for message in messages
+    ]
+    payload = json.dumps([role, normalized], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:24]
+
+
+class Cassette:
+    def __init__(self, mode: str, directory: str, latency_scale: float = 1.0):
+        if mode not in ("off", "record", "replay"):
+            raise RuntimeError(f"Invalid LLM_CASSETTE_MODE '{mode}' (expected off, record or replay)")
+        self.mode = mode
+        self.directory = Path(directory)
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._file = None
+        self._recordings: dict[str, list[dict]] = {}
+        self._cursors: dict[str, int] = {}
+        if mode == "replay":
+            self._load()
+
+    # === 저장 / 로드 ===
+    def _load(self):
+        paths = sorted(self.directory.glob("*.jsonl.gz"))
+        if not paths:
+            raise RuntimeError(f"LLM_CASSETTE_MODE=replay but no cassettes in '{self.directory}'")
+        for path in paths:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    record = json.loads(line)
+                    self._recordings.setdefault(record["key"], []).append(record)
+
+    def record(self, role: str, key: str, model: str, content: Optional[str], usage: dict,
+               ttft: float, duration: float, finish_reason: Optional[str] = None):
+        record = {
+            "key": key, "role": role, "model": model, "content": content, "usage": usage,
+            "ttft": round(ttft, 4), "duration": round(duration, 4), "finish_reason": finish_reason,
+        }
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._file is None:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                # append 모드 gzip: 재실행해도 같은 파일에 member로 이어 씀 (gzip.open이 연속 member를 읽음)
+                self._file = gzip.open(self.directory / f"cassette-{os.getpid()}.jsonl.gz", "at", encoding="utf-8")
+                atexit.register(self.close)
+            self._file.write(line)
+            self._file.flush()  # 프로세스가 비정상 종료해도 기록된 요청까지는 남도록
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def lookup(self, role: str, key: str) -> dict:
+        with self._lock:
+            recordings = self._recordings.get(key)
+            if not recordings:
+                raise CassetteMissError(f"No cassette recording for role '{role}' (key {key})")
+            index = self._cursors.get(key, 0)
+            self._cursors[key] = index + 1
+        return recordings[index % len(recordings)]
+
+    # === LangChain 스트림 (app/graph.py) ===
+    def wrap_stream(self, role: str, model: str, messages: list,
+                    stream_fn: Callable[[], Iterable[AIMessageChunk]]) -> Callable[[], Iterable[AIMessageChunk]]:
+        """llm.stream 대신 쓸 stream_fn (off면 그대로)"""
+        if self.mode == "off":
+            return stream_fn
+        key = request_key(role, messages)
+        if self.mode == "replay":
+            # 호출당 한 번만 조회 - hedge 요청도 같은 녹화를 재생 (커서는 논리 요청마다 한 칸)
+            record = self.lookup(role, key)
+            return lambda: self._replay_stream(record)
+        first = []  # 먼저 첫 청크를 받은 스트림 (hedge 승자와 같은 기준)
+        return lambda: self._record_stream(role, key, model, stream_fn(), first)
+
+    def _record_stream(self, role: str, key: str, model: str, stream: Iterable[AIMessageChunk],
+                       first: list) -> Iterator[AIMessageChunk]:
+        started = time.perf_counter()
+        token = object()
+        ttft = None
+        result = None
+        try:
+            for chunk in stream:
+                if ttft is None:
+                    ttft = time.perf_counter() - started
+                    with self._lock:
+                        if not first:
+                            first.append(token)
+                result = chunk if result is None else result + chunk
+                yield chunk
+            # 먼저 첫 청크를 받아 끝까지 받은 스트림만 기록 (hedge에서 진 스트림은 끝까지 받아도 제외)
+            with self._lock:
+                if not first:
+                    first.append(token)  # 청크 없이 끝난 응답
+            if first[0] is not token:
+                return
+            usage = (result.usage_metadata or {}) if result is not None else {}
+            self.record(
+                role, key, model,
+                content=result.content if result is not None else "",
+                usage={
+                    "input_tokens": usage.get("input_tokens", 0),
+                    "cached_input_tokens": (usage.get("input_token_details") or {}).get("cache_read", 0),
+                    "output_tokens": usage.get("output_tokens", 0),
+                },
+                ttft=ttft or 0.0,
+                duration=time.perf_counter() - started,
+            )
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+
+    def _replay_stream(self, record: dict) -> Iterator[AIMessageChunk]:
+        """녹화된 본문을 출력 토큰 수만큼 나눠 녹화 당시 ttft / 생성 속도(× latency_scale)로 전달"""
+        content = record["content"] or ""
+        usage = record["usage"]
+        pieces = max(1, min(len(content), usage.get("output_tokens") or len(content) // 4 or 1))
+        size = -(-len(content) // pieces)
+        chunks = [content[i:i + size] for i in range(0, len(content), size)] or [""]
+
+        started = time.monotonic()
+        ttft = record["ttft"] * self.latency_scale
+        step = max(0.0, record["duration"] * self.latency_scale - ttft) / max(1, len(chunks) - 1)
+        for i, text in enumerate(chunks):
+            delay = started + ttft + step * i - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            yield AIMessageChunk(content=text)
+        yield AIMessageChunk(content="", usage_metadata={
+            "input_tokens": usage["input_tokens"],
+            "output_tokens": usage["output_tokens"],
+            "total_tokens": usage["input_tokens"] + usage["output_tokens"],
+            "input_token_details": {"cache_read": usage["cached_input_tokens"]},
+        })
+
+    # === OpenAI chat.completions (training) ===
+    def call(self, role: str, model: str, messages: list, fn: Callable[[], ChatCompletion]) -> ChatCompletion:
+        """fn() (chat.completions.create) 녹화/재생"""
+        if self.mode == "off":
+            return fn()
+        key = request_key(role, messages)
+        if self.mode == "replay":
+            record = self.lookup(role, key)
+            time.sleep(record["duration"] * self.latency_scale)
+            return self._completion(record)
+        started = time.perf_counter()
+        response = fn()
+        self._record_completion(role, key, model, response, time.perf_counter() - started)
+        return response
+
+    async def acall(self, role: str, model: str, messages: list,
+                    fn: Callable[[], Awaitable[ChatCompletion]]) -> ChatCompletion:
+        """call()의 async 버전"""
+        if self.mode == "off":
+            return await fn()
+        key = request_key(role, messages)
+        if self.mode == "replay":
+            record = self.lookup(role, key)
+            await asyncio.sleep(record["duration"] * self.latency_scale)
+            return self._completion(record)
+        started = time.perf_counter()
+        response = await fn()
+        self._record_completion(role, key, model, response, time.perf_counter() - started)
+        return response
+
+    def _record_completion(self, role: str, key: str, model: str, response: ChatCompletion, duration: float):
+        choice = response.choices[0]
+        usage = response.usage
+        details = getattr(usage, "prompt_tokens_details", None)
+        self.record(
+            role, key, model,
+            content=choice.message.content,
+            usage={
+                "input_tokens": usage.prompt_tokens if usage else 0,
+                "cached_input_tokens": (getattr(details, "cached_tokens", 0) or 0) if details else 0,
+                "output_tokens": usage.completion_tokens if usage else 0,
+            },
+            ttft=duration,  # 비스트리밍: 첫 토큰 = 전체 응답
+            duration=duration,
+            finish_reason=choice.finish_reason,
+        )
+
+    @staticmethod
+    def _completion(record: dict) -> ChatCompletion:
+        usage = record["usage"]
+        return ChatCompletion.model_validate({
+            "id": f"cassette-{record['key']}",
+            "object": "chat.completion",
+            "created": 0,
+            "model": record.get("model") or "cassette",
+            "choices": [{
+                "index": 0,
+                "finish_reason": record.get("finish_reason") or "stop",
+                "message": {"role": "assistant", "content": record["content"]},
+            }],
+            "usage": {
+                "prompt_tokens": usage["input_tokens"],
+                "completion_tokens": usage["output_tokens"],
+                "total_tokens": usage["input_tokens"] + usage["output_tokens"],
+                "prompt_tokens_details": {"cached_tokens": usage["cached_input_tokens"]},
+            },
+        })
+
+    def wrap_async_client(self, client: Any, role: str) -> Any:
+        """AsyncOpenAI 클라이언트의 chat.completions.create를 녹화/재생 (off면 그대로)"""
+        if self.mode == "off":
+            return client
+        return _AsyncClientRecorder(client, self, role)
+
+
+class _AsyncClientRecorder:
+    """chat.completions.create만 가로채고 나머지 속성은 원래 클라이언트로 위임"""
+
+    def __init__(self, client: Any, cassette: Cassette, role: str):
+        self._client = client
+        self._cassette = cassette
+        self._role = role
+        self.chat = self
+        self.completions = self
+
+    async def create(self, *, model: str, messages: list, **kwargs) -> ChatCompletion:
+        return await self._cassette.acall(
+            self._role, model, messages,
+            lambda: self._client.chat.completions.create(model=model, messages=messages, **kwargs),
+        )
+
+    def __getattr__(self, name: str):
+        return getattr(self._client, name)
+
+
+_cassette: Optional[Cassette] = None
+
+
+def get_cassette() -> Cassette:
+    """config 기반 Cassette 싱글톤"""
+    global _cassette
+    if _cassette is None:
+        _cassette = Cassette(LLM_CASSETTE_MODE, LLM_CASSETTE_DIR, LLM_CASSETTE_LATENCY_SCALE)
+    return _cassette
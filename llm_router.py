@@ -0,0 +1,227 @@
+"""LLM Router - 역할별 배포 선택, 지연시간/429 기반 분산, 자동 failover
+
+설정 (config.py):
+- LLM_DEPLOYMENTS: 사용할 배포 목록 "alias=deployment@endpoint" (콤마 구분)
+    - "gpt-4o"                                   → alias/배포명 gpt-4o, AZURE_OPENAI_ENDPOINT
+    - "gpt-4o-swe=gpt-4o@https://swe.openai.azure.com/" → 다른 리전의 같은 배포명
+- LLM_ROLE_ROUTES: 역할 → 배포 alias 목록 "role=alias|alias" (콤마 구분)
+    - 앱 역할: teacher_question, student_answer, teacher_evaluate
+    - 학습 역할: student, judge, gradient, apply_edit
+    - 지정하지 않은 역할은 AZURE_OPENAI_DEPLOYMENT_NAME 사용
+
+같은 역할에 여러 배포가 있으면 관측 지연시간(EWMA)과 429 비율로 가중치를 계산해 분산하고,
+429 / 5xx / timeout이면 다음 배포로 failover (429는 Retry-After 동안 제외).
+"""
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from opentelemetry import metrics
+
+from config import (
+    AZURE_OPENAI_ENDPOINT,
+    AZURE_OPENAI_DEPLOYMENT_NAME,
+    LLM_DEPLOYMENTS,
+    LLM_ROLE_ROUTES,
+)
+
+T = TypeVar("T")
+
+EWMA_ALPHA = 0.2                 # 최근 관측 가중치
+RATE_LIMIT_PENALTY = 4.0         # 429 비율 1.0이면 점수 5배
+DEFAULT_COOLDOWN_SECONDS = 10.0  # Retry-After 없는 429
+ERROR_COOLDOWN_SECONDS = 30.0    # 연속 오류 후 제외 시간
+MAX_CONSECUTIVE_ERRORS = 3
+
+_meter = metrics.get_meter(__name__)
+duration_histogram = _meter.create_histogram(
+    "llm.deployment.duration", unit="s", description="LLM call latency per deployment",
+)
+error_counter = _meter.create_counter(
+    "llm.deployment.errors", description="LLM call errors per deployment (rate_limited / server / timeout / other)",
+)
+failover_counter = _meter.create_counter(
+    "llm.deployment.failovers", description="Calls retried on another deployment",
+)
+
+
+@dataclass(frozen=True)
+class Deployment:
+    alias: str
+    deployment: str
+    endpoint: str
+
+
+@dataclass
+class DeploymentStats:
+    latency_ewma: Optional[float] = None
+    rate_limit_ewma: float = 0.0
+    consecutive_errors: int = 0
+    cooldown_until: float = 0.0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+
+def classify_error(error: Exception) -> Optional[str]:
+    """failover 대상 오류면 유형 반환, 아니면 None (요청 자체의 오류 - 400 등)"""
+    status = getattr(error, "status_code", None)
+    if status == 429:
+        return "rate_limited"
+    if status is not None and status >= 500:
+        return "server"
+    name = type(error).__name__
+    if "Timeout" in name:
+        return "timeout"
+    if "Connection" in name:
+        return "connection"
+    return None
+
+
+def _retry_after(error: Exception) -> float:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after", DEFAULT_COOLDOWN_SECONDS))
+    except (TypeError, ValueError):
+        return DEFAULT_COOLDOWN_SECONDS
+
+
+class LLMRouter:
+    """역할별 배포 선택 + 지연시간 기반 분산 + failover"""
+
+    def __init__(self, deployments: dict[str, Deployment], routes: dict[str, list[str]], default: str):
+        self.deployments = deployments
+        self.routes = routes
+        self.default = default
+        self.stats = {alias: DeploymentStats() for alias in deployments}
+
+    def primary(self, role: str) -> Deployment:
+        """역할의 첫 번째 배포 (단일 클라이언트만 받는 API용, 예: APO gradient/apply_edit)"""
+        return self.deployments[self.routes.get(role, [self.default])[0]]
+
+    def candidates(self, role: str) -> list[Deployment]:
+        """시도 순서: 가중 랜덤으로 고른 배포 → 나머지는 점수 순 (cooldown 중인 배포는 뒤로)"""
+        aliases = self.routes.get(role, [self.default])
+        now = time.monotonic()
+        available = [a for a in aliases if self.stats[a].cooldown_until <= now]
+        cooling = sorted((a for a in aliases if a not in available), key=lambda a: self.stats[a].cooldown_until)
+        if not available:
+            return [self.deployments[a] for a in cooling]
+
+        scores = {a: self._score(a) for a in available}
+        first = random.choices(available, weights=[1.0 / scores[a] for a in available])[0]
+        rest = sorted((a for a in available if a != first), key=scores.get)
+        return [self.deployments[a] for a in [first, *rest, *cooling]]
+
+    def _score(self, alias: str) -> float:
+        """낮을수록 좋음: 지연시간 EWMA × 429 페널티 (관측 전이면 알려진 최소 지연시간으로 탐색)"""
+        stats = self.stats[alias]
+        known = [s.latency_ewma for s in self.stats.values() if s.latency_ewma is not None]
+        latency = stats.latency_ewma if stats.latency_ewma is not None else (min(known) if known else 1.0)
+        return max(latency, 1e-3) * (1.0 + RATE_LIMIT_PENALTY * stats.rate_limit_ewma)
+
+    def record(self, role: str, deployment: Deployment, latency: float, error_type: Optional[str] = None,
+               cooldown: float = 0.0):
+        stats = self.stats[deployment.alias]
+        with stats.lock:
+            rate_limited = 1.0 if error_type == "rate_limited" else 0.0
+            stats.rate_limit_ewma += EWMA_ALPHA * (rate_limited - stats.rate_limit_ewma)
+            if error_type is None:
+                stats.latency_ewma = latency if stats.latency_ewma is None else (
+                    stats.latency_ewma + EWMA_ALPHA * (latency - stats.latency_ewma)
+                )
+                stats.consecutive_errors = 0
+            elif error_type != "other":  # 요청 자체 오류(400 등)는 배포 상태와 무관
+                stats.consecutive_errors += 1
+                if stats.consecutive_errors >= MAX_CONSECUTIVE_ERRORS:
+                    cooldown = max(cooldown, ERROR_COOLDOWN_SECONDS)
+                if cooldown:
+                    stats.cooldown_until = time.monotonic() + cooldown
+
+        attributes = {"llm.deployment": deployment.alias, "llm.role": role, "outcome": error_type or "ok"}
+        duration_histogram.record(latency, attributes)
+        if error_type is not None:
+            error_counter.add(1, {"llm.deployment": deployment.alias, "error.type": error_type})
+
+    def _on_error(self, role: str, deployment: Deployment, started: float, error: Exception, has_next: bool) -> str:
+        """재시도 가능한 오류면 기록 후 반환 (다음 배포가 있을 때만 failover로 집계), 아니면 raise"""
+        error_type = classify_error(error)
+        if error_type is None:
+            self.record(role, deployment, time.perf_counter() - started, "other")
+            raise error
+        cooldown = _retry_after(error) if error_type == "rate_limited" else 0.0
+        self.record(role, deployment, time.perf_counter() - started, error_type, cooldown)
+        if has_next:
+            failover_counter.add(1, {"llm.deployment": deployment.alias, "llm.role": role})
+        return error_type
+
+    def call(self, role: str, fn: Callable[[Deployment], T]) -> T:
+        """fn(deployment) 실행, 재시도 가능한 오류면 다음 배포로 failover"""
+        last_error = None
+        candidates = self.candidates(role)
+        for index, deployment in enumerate(candidates):
+            started = time.perf_counter()
+            try:
+                result = fn(deployment)
+            except Exception as e:
+                self._on_error(role, deployment, started, e, has_next=index + 1 < len(candidates))
+                last_error = e
+                continue
+            self.record(role, deployment, time.perf_counter() - started)
+            return result
+        raise last_error  # 모든 배포 실패 → 마지막 배포의 원래 오류
+
+    async def acall(self, role: str, fn: Callable[[Deployment], Awaitable[T]]) -> T:
+        """call()의 async 버전"""
+        last_error = None
+        candidates = self.candidates(role)
+        for index, deployment in enumerate(candidates):
+            started = time.perf_counter()
+            try:
+                result = await fn(deployment)
+            except Exception as e:
+                self._on_error(role, deployment, started, e, has_next=index + 1 < len(candidates))
+                last_error = e
+                continue
+            self.record(role, deployment, time.perf_counter() - started)
+            return result
+        raise last_error  # 모든 배포 실패 → 마지막 배포의 원래 오류
+
+
+def parse_deployments(spec: str, default_endpoint: str, default_deployment: str) -> dict[str, Deployment]:
+    """'alias=deployment@endpoint,...' 파싱 (기본 배포는 항상 포함)"""
+    deployments = {default_deployment: Deployment(default_deployment, default_deployment, default_endpoint)}
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        alias, _, target = item.partition("=")
+        target = target or alias
+        deployment, _, endpoint = target.partition("@")
+        deployments[alias.strip()] = Deployment(alias.strip(), deployment.strip(), endpoint.strip() or default_endpoint)
+    return deployments
+
+
+def parse_routes(spec: str, deployments: dict[str, Deployment]) -> dict[str, list[str]]:
+    """'role=alias|alias,...' 파싱"""
+    routes = {}
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        role, _, aliases = item.partition("=")
+        targets = [a.strip() for a in aliases.split("|") if a.strip()]
+        unknown = [a for a in targets if a not in deployments]
+        if unknown:
+            raise RuntimeError(f"LLM_ROLE_ROUTES: unknown deployment alias {unknown} for role '{role.strip()}'")
+        if targets:
+            routes[role.strip()] = targets
+    return routes
+
+
+_router: Optional[LLMRouter] = None
+
+
+def get_router() -> LLMRouter:
+    """config 기반 LLMRouter 싱글톤"""
+    global _router
+    if _router is None:
+        deployments = parse_deployments(LLM_DEPLOYMENTS, AZURE_OPENAI_ENDPOINT, AZURE_OPENAI_DEPLOYMENT_NAME)
+        routes = parse_routes(LLM_ROLE_ROUTES, deployments)
+        _router = LLMRouter(deployments, routes, default=AZURE_OPENAI_DEPLOYMENT_NAME)
+    return _router
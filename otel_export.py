@@ -0,0 +1,157 @@
+"""OTLP exporter 팩토리 - 앱(app/main.py)과 학습(training/telemetry.py)이 같은 전송 설정을 사용
+
+설정 (config.py):
+- OTEL_EXPORTER_OTLP_PROTOCOL: grpc (기본) / http/protobuf
+- OTEL_EXPORTER_OTLP_COMPRESSION: gzip (기본) / none - span 속성은 최대 65535자 (프롬프트 / 답변 본문)라 압축 효과가 큼
+- OTLP_EXPORT_TIMEOUT: export 한 번의 deadline (초) - exporter는 UNAVAILABLE / 429 등에서 지수 backoff로 이 안에서 재시도
+- OTLP_MAX_QUEUE_SIZE / OTLP_MAX_EXPORT_BATCH_SIZE / OTLP_SCHEDULE_DELAY: BatchSpanProcessor 큐 / 배치 크기 / 주기
+
+연결은 프로세스당 하나: gRPC는 span / metric exporter가 채널 하나를, HTTP는 requests.Session 하나(연결 풀)를 공유한다.
+fork된 자식 프로세스(uvicorn 워커, Agent Lightning runner)는 pid가 바뀌므로 처음 exporter를 만들 때 새로 연결한다.
+"""
+import os
+import threading
+from typing import Optional
+
+import grpc
+import requests
+from opentelemetry.exporter.otlp.proto.grpc.metric_exporter import OTLPMetricExporter as GrpcMetricExporter
+from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter as GrpcSpanExporter
+from opentelemetry.exporter.otlp.proto.http import Compression as HttpCompression
+from opentelemetry.exporter.otlp.proto.http.metric_exporter import OTLPMetricExporter as HttpMetricExporter
+from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter as HttpSpanExporter
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter
+
+from config import (
+    OTEL_EXPORTER_OTLP_PROTOCOL,
+    OTEL_EXPORTER_OTLP_ENDPOINT,
+    OTEL_EXPORTER_OTLP_COMPRESSION,
+    OTLP_EXPORT_TIMEOUT,
+    OTLP_MAX_QUEUE_SIZE,
+    OTLP_MAX_EXPORT_BATCH_SIZE,
+    OTLP_SCHEDULE_DELAY,
+)
+
+_lock = threading.Lock()
+_channels: dict[tuple, "_SharedChannel"] = {}  # (pid, endpoint, insecure, compression) → 채널
+_sessions: dict[int, requests.Session] = {}    # pid → HTTP 세션
+
+
+class _SharedChannel:
+    """프로세스 공유 gRPC 채널
+
+    exporter는 shutdown과 UNAVAILABLE 재연결 때 자기 채널을 close()하는데, 공유 채널을 닫으면 다른 exporter의 다음 export가
+    실패하므로 close()는 무시한다. gRPC 채널은 끊기면 스스로 재연결한다.
+    """
+
+    def __init__(self, channel: grpc.Channel):
+        self._channel = channel
+
+    def close(self):
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self._channel, name)
+
+
+def _grpc_channel(endpoint: str, insecure: bool, credentials, compression, options) -> _SharedChannel:
+    key = (os.getpid(), endpoint, insecure, compression)
+    with _lock:
+        channel = _channels.get(key)
+        if channel is None:
+            if insecure:
+                raw = grpc.insecure_channel(endpoint, compression=compression, options=options)
+            else:
+                raw = grpc.secure_channel(endpoint, credentials, compression=compression, options=options)
+            channel = _channels[key] = _SharedChannel(raw)
+        return channel
+
+
+def _http_session() -> requests.Session:
+    with _lock:
+        return _sessions.setdefault(os.getpid(), requests.Session())
+
+
+class _SharedChannelMixin:
+    """exporter가 만든 채널 대신 프로세스 공유 채널로 stub을 만든다
+
+    1.40.0+ exporter는 생성 / UNAVAILABLE 재연결 때 _initialize_channel_and_stub()을 호출하므로 이 메서드로 대체되고,
+    hook이 없는 이전 버전(>=1.27.0)은 __init__ 뒤에 직접 교체한다 (exporter가 만든 채널은 RPC 전이라 연결 없이 닫힘).
+    """
+
+    def __init__(self, *, insecure: bool, compression, **kwargs):
+        self._shared_channel_args = (insecure, compression)
+        super().__init__(insecure=insecure, compression=compression, **kwargs)
+        own = getattr(self, "_channel", None)
+        self._initialize_channel_and_stub()
+        if own is not None and own is not self._channel:
+            own.close()
+
+    def _initialize_channel_and_stub(self):
+        insecure, compression = self._shared_channel_args
+        credentials = None if insecure else getattr(self, "_credentials", None) or grpc.ssl_channel_credentials()
+        self._channel = _grpc_channel(
+            self._endpoint, insecure, credentials, compression, getattr(self, "_channel_options", None),
+        )
+        self._client = self._stub(self._channel)
+
+
+class _SharedChannelSpanExporter(_SharedChannelMixin, GrpcSpanExporter):
+    pass
+
+
+class _SharedChannelMetricExporter(_SharedChannelMixin, GrpcMetricExporter):
+    pass
+
+
+def _grpc_kwargs(endpoint: str, compression: str, timeout: float) -> dict:
+    return {
+        "endpoint": endpoint,
+        "insecure": not endpoint.startswith("https://"),
+        "compression": grpc.Compression.Gzip if compression == "gzip" else grpc.Compression.NoCompression,
+        "timeout": timeout,
+    }
+
+
+def _http_kwargs(endpoint: str, signal: str, compression: str, timeout: float) -> dict:
+    return {
+        "endpoint": f"{endpoint.rstrip('/')}/v1/{signal}",
+        "compression": HttpCompression.Gzip if compression == "gzip" else HttpCompression.NoCompression,
+        "timeout": timeout,
+        "session": _http_session(),
+    }
+
+
+def span_exporter(protocol: str = OTEL_EXPORTER_OTLP_PROTOCOL, endpoint: str = OTEL_EXPORTER_OTLP_ENDPOINT,
+                  compression: str = OTEL_EXPORTER_OTLP_COMPRESSION, timeout: float = OTLP_EXPORT_TIMEOUT) -> SpanExporter:
+    if protocol == "http/protobuf":
+        return HttpSpanExporter(**_http_kwargs(endpoint, "traces", compression, timeout))
+    return _SharedChannelSpanExporter(**_grpc_kwargs(endpoint, compression, timeout))
+
+
+def metric_exporter(preferred_temporality: Optional[dict] = None, protocol: str = OTEL_EXPORTER_OTLP_PROTOCOL,
+                    endpoint: str = OTEL_EXPORTER_OTLP_ENDPOINT, compression: str = OTEL_EXPORTER_OTLP_COMPRESSION,
+                    timeout: float = OTLP_EXPORT_TIMEOUT):
+    if protocol == "http/protobuf":
+        return HttpMetricExporter(
+            preferred_temporality=preferred_temporality, **_http_kwargs(endpoint, "metrics", compression, timeout),
+        )
+    return _SharedChannelMetricExporter(
+        preferred_temporality=preferred_temporality, **_grpc_kwargs(endpoint, compression, timeout),
+    )
+
+
+def batch_span_processor(exporter: Optional[SpanExporter] = None) -> BatchSpanProcessor:
+    """exporter(기본: span_exporter())를 OTLP_* 큐 / 배치 설정으로 감싼 BatchSpanProcessor"""
+    return BatchSpanProcessor(
+        exporter or span_exporter(),
+        max_queue_size=OTLP_MAX_QUEUE_SIZE,
+        max_export_batch_size=OTLP_MAX_EXPORT_BATCH_SIZE,
+        schedule_delay_millis=OTLP_SCHEDULE_DELAY * 1000,
+        export_timeout_millis=OTLP_EXPORT_TIMEOUT * 1000,
+    )
+
+
+def describe() -> str:
+    """시작 로그용 "endpoint (protocol, compression)" """
+    return f"{OTEL_EXPORTER_OTLP_ENDPOINT} ({OTEL_EXPORTER_OTLP_PROTOCOL}, {OTEL_EXPORTER_OTLP_COMPRESSION})"
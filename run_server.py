@@ -1,6 +1,30 @@
-"""운영 서버 진입점"""
+"""운영 서버 진입점
+
+SERVER_WORKERS 개수만큼 uvicorn 워커 프로세스로 실행 (기본: CPU limit 기준, config.default_workers).
+- 워커마다 app을 새로 import → graph / tracer / session_states / OTel provider가 워커별로 독립 (shared-nothing)
+- 세션 상태는 클라이언트가 session_state로 재전송하므로 다른 워커로 라우팅돼도 이어서 진행
+- uvloop / httptools가 설치되어 있으면 사용
+- 종료: SIGTERM → GRACEFUL_SHUTDOWN_TIMEOUT 동안 진행 중인 SSE / WebSocket 턴 drain (app.main.install_drain_on_signal)
+  → GRACEFUL_CLOSE_TIMEOUT 동안 남은 연결 종료 대기 → span/metric flush (OTLP_EXPORT_TIMEOUT)
+"""
+import importlib.util
+
 import uvicorn
-from app.main import app
+from config import SERVER_HOST, SERVER_PORT, SERVER_WORKERS, GRACEFUL_CLOSE_TIMEOUT
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    print(f"🚀 Starting {SERVER_WORKERS} worker(s) on {SERVER_HOST}:{SERVER_PORT}")
+    uvicorn.run(
+        "app.main:app",  # import string: 멀티 워커는 워커 프로세스에서 app을 import
+        host=SERVER_HOST,
+        port=SERVER_PORT,
+        workers=SERVER_WORKERS,
+        loop="uvloop" if _installed("uvloop") else "asyncio",
+        http="httptools" if _installed("httptools") else "h11",
+        timeout_graceful_shutdown=int(GRACEFUL_CLOSE_TIMEOUT),  # drain은 이미 끝난 뒤 (남은 연결만)
+    )
@@ -1,5 +1,13 @@
-"""Agent Lightning 학습 진입점"""
+"""Agent Lightning 학습 진입점
+
+실행: python run_training.py [--resume]
+"""
+import argparse
+
 from training.train import main
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--resume", action="store_true", help="TRAINING_CHECKPOINT_DIR의 마지막 스냅샷부터 이어서 학습")
+    args = parser.parse_args()
+    main(resume=args.resume)
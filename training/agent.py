@@ -1,6 +1,7 @@
 """Agent Lightning 에이전트 - APO 학습용"""
 from pathlib import Path
 import sys
+import time
 import yaml
 
 from openai import AzureOpenAI
@@ -10,14 +11,18 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from config import (
     AZURE_OPENAI_ENDPOINT,
     AZURE_OPENAI_API_KEY,
-    AZURE_OPENAI_DEPLOYMENT_NAME,
     AZURE_OPENAI_API_VERSION,
 )
+from llm_cassette import get_cassette
+from llm_router import Deployment, get_router
 from .dataset import QuizTask
-from .evaluator import evaluate_answer
+from .evaluator import grade_answer, judge_fingerprint
+from .reward import reward_dimensions, student_cost
+from .rollout_cache import get_rollout_cache, role_models, rollout_key
+from .usage import record_usage, track_tokens
 
 # 모듈 레벨 캐시 (rollout마다 재생성 방지)
-_cached_client = None
+_cached_clients: dict[str, AzureOpenAI] = {}  # {endpoint: client}
 _cached_prompts = None
 
 
@@ -36,20 +41,19 @@ def load_prompts() -> dict:
         raise RuntimeError(f"Permission denied when reading prompts file: '{prompts_path}'") from e
 
 
-def create_azure_client() -> AzureOpenAI:
-    """Azure OpenAI 클라이언트 생성 (싱글톤)"""
-    global _cached_client
-    if _cached_client is None:
-        _cached_client = AzureOpenAI(
-            azure_endpoint=AZURE_OPENAI_ENDPOINT,
+def create_azure_client(endpoint: str = AZURE_OPENAI_ENDPOINT) -> AzureOpenAI:
+    """Azure OpenAI 클라이언트 생성 (엔드포인트별 싱글톤)"""
+    if endpoint not in _cached_clients:
+        _cached_clients[endpoint] = AzureOpenAI(
+            azure_endpoint=endpoint,
             api_key=AZURE_OPENAI_API_KEY,
             api_version=AZURE_OPENAI_API_VERSION,
         )
-    return _cached_client
+    return _cached_clients[endpoint]
 
 
 @agl.rollout
-def quiz_agent(task: QuizTask, prompt_template: agl.PromptTemplate) -> float:
+def quiz_agent(task: QuizTask, prompt_template: agl.PromptTemplate, rollout: agl.Rollout) -> None:
     """
     Quiz Agent - Student 프롬프트 최적화
     
@@ -58,12 +62,12 @@ def quiz_agent(task: QuizTask, prompt_template: agl.PromptTemplate) -> float:
     Args:
         task: 퀴즈 태스크 (question, expected_answer, difficulty, subject)
         prompt_template: APO가 최적화하는 Student 프롬프트
+        rollout: rollout 메타데이터 (mode: train / val / test)
     
-    Returns:
-        reward: 1.0 (정답) 또는 0.0 (오답)
+    reward는 emit_quiz_reward가 다차원으로 emit하고 None을 반환한다 (float를 반환하면 runner가 reward span을 하나 더 남김).
+    primary 값: REWARD_MODE=correctness면 1.0 (정답) 또는 0.0 (오답), composite면 정답 - 토큰 / 지연 패널티
     """
     global _cached_prompts
-    client = create_azure_client()
     if _cached_prompts is None:
         _cached_prompts = load_prompts()
     prompts = _cached_prompts
@@ -81,34 +85,76 @@ def quiz_agent(task: QuizTask, prompt_template: agl.PromptTemplate) -> float:
         persona=persona,
     )
     
-    # Student가 문제에 답변
-    response = client.chat.completions.create(
-        model=AZURE_OPENAI_DEPLOYMENT_NAME,
-        messages=[
-            {"role": "system", "content": student_system},
-            {"role": "user", "content": f"문제: {question}\n\n이 문제의 정답을 말해주세요."},
-        ],
-    )
+    # Student가 문제에 답변할 메시지 (템플릿의 고정 지시문이 prefix, 문제는 마지막 user 메시지)
+    messages = [
+        {"role": "system", "content": student_system},
+        {"role": "user", "content": f"문제: {question}\n\n이 문제의 정답을 말해주세요."},
+    ]
+    
+    # 같은 프롬프트/태스크/모델 rollout은 캐시된 reward 재사용 (ROLLOUT_CACHE=on)
+    # validation rollout만 적중 - train rollout의 student / judge span은 APO textual gradient의 입력이므로 항상 실행
+    cache = get_rollout_cache()
+    key = None
+    if cache is not None:
+        router = get_router()
+        key = rollout_key(messages, dict(task), role_models(router, "student"), role_models(router, "judge"),
+                          judge_fingerprint())
+    if cache is not None and rollout.mode == "val":
+        cached = cache.lookup(key)
+        if cached is not None:
+            correctness, cost = cached
+            reward = emit_quiz_reward(correctness, cost)
+            print(f"  Q: {question[:40]}... | Expected: {expected_answer} | [CACHED] | R: {reward}")
+            return None
+    
+    with track_tokens() as usage:
+        correctness, cost = answer_and_grade(messages, question, expected_answer)
+    if cache is not None:
+        cache.store(key, correctness, usage["tokens"], cost)
+    
+    # Agent Lightning에 reward emit
+    emit_quiz_reward(correctness, cost)
+    return None
+
+
+def emit_quiz_reward(correctness: float, cost: dict | None) -> float:
+    """정답 + student 비용 차원을 reward span 하나로 emit (primary는 REWARD_MODE) → primary 값 (로그용)"""
+    dimensions, primary = reward_dimensions(correctness, cost)
+    agl.emit_reward(dimensions, primary_key=primary)
+    return dimensions[primary]
+
+
+def answer_and_grade(messages: list, question: str, expected_answer: str) -> tuple[float, dict]:
+    """Student 답변 생성 + LLM-as-Judge 채점 → (정답 reward, student 비용)"""
+    # Student가 문제에 답변 (student 역할 배포, failover 포함, LLM_CASSETTE_MODE면 녹화/재생)
+    def ask_student(deployment: Deployment):
+        response = get_cassette().call("student", deployment.deployment, messages, lambda: (
+            create_azure_client(deployment.endpoint).chat.completions.create(
+                model=deployment.deployment,
+                messages=messages,
+            )
+        ))
+        record_usage("student", deployment.deployment, response.usage)
+        return response
+    
+    start = time.perf_counter()
+    response = get_router().call("student", ask_student)
+    cost = student_cost(response.usage, time.perf_counter() - start)
     
     # Content filter로 인해 None이 반환될 수 있음
     content = response.choices[0].message.content
     if content is None:
         print(f"  Q: {question[:40]}... | Expected: {expected_answer} | Got: [FILTERED] | R: 0.0")
-        agl.emit_reward(0.0)
-        return 0.0
+        return 0.0, cost
     
     student_answer = content.strip()
     
-    # Reward 계산 (LLM-as-Judge)
-    reward = evaluate_answer(student_answer, expected_answer, question)
+    # Reward 계산 (LLM-as-Judge, JUDGE_BATCH_SIZE > 1이면 동시 rollout과 묶어서 채점)
+    reward = grade_answer(student_answer, expected_answer, question)
     
     # 디버깅 출력
     print(f"  Q: {question[:40]}... | Expected: {expected_answer} | Got: {student_answer[:30]}... | R: {reward}")
-    
-    # Agent Lightning에 reward emit
-    agl.emit_reward(reward)
-    
-    return reward
+    return reward, cost
 
 
 def initial_prompt_template() -> agl.PromptTemplate:
@@ -0,0 +1,377 @@
+"""APO 학습 체크포인트 / 재개
+
+trainer.fit이 중간에 죽으면 beam, 최고 프롬프트, 생성한 후보가 모두 사라진다.
+TRAINING_CHECKPOINT_DIR가 설정되어 있으면 (기본 checkpoints/training) 라운드마다 두 번 상태를 원자적으로 저장한다.
+- 후보 생성 직후 (phase=candidates): gradient / apply_edit LLM 호출 결과
+- beam 선택 + 최고 프롬프트 갱신 직후 (phase=selected): 다음 라운드 시작점
+run_training.py --resume은 마지막 스냅샷부터 이어서 실행한다 - 끝난 라운드는 다시 돌리지 않고,
+후보까지 만든 라운드는 후보 평가부터 시작.
+
+진행 중인 라운드는 journal.jsonl에 이벤트마다 한 줄씩 추가한다 (append + fsync, state.json은 라운드 경계에서만 저장).
+- 뽑은 부모 프롬프트, gradient / validation 배치 (재개 시 같은 태스크로 다시 실행되도록)
+- 끝난 evaluate_prompt_on_batch 결과와 gradient + apply_edit 결과
+  train 결과는 gradient 계산에 span이 필요해 그대로, val 결과는 final_reward / status만
+재개한 라운드는 journal을 순서대로 재생하고 남은 작업만 새로 실행한다 (rollout 캐시 설정과 무관).
+journal 줄에는 state.json의 journal_id를 붙여, 라운드 경계 저장 직후 journal을 비우기 전에 죽어도 이전 라운드 기록은 무시한다.
+
+저장: state.json (tmp 파일 → fsync → os.replace), journal.jsonl, best_prompt.txt (라운드마다 현재 최고 프롬프트)
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Iterator, Optional, Sequence, cast
+import sys
+
+import poml
+from agentlightning.algorithm.apo import APO
+from agentlightning.algorithm.apo.apo import VersionedPromptTemplate
+from agentlightning.algorithm.utils import with_llm_proxy, with_store
+from agentlightning.types import PromptTemplate
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from config import TRAINING_CHECKPOINT_DIR
+from training.dataset import task_keys
+
+STATE_VERSION = 1
+
+
+def atomic_write_text(path: Path, text: str):
+    """같은 디렉터리의 임시 파일에 쓰고 fsync 후 교체 (중간에 죽어도 이전 내용 또는 새 내용만 남음)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    dir_fd = os.open(path.parent, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)  # rename 자체를 디스크에 반영
+    finally:
+        os.close(dir_fd)
+
+
+def dataset_fingerprint(dataset) -> str:
+    """태스크 문제 해시 목록의 해시 (재개 시 데이터셋이 바뀌었는지 확인용)"""
+    digest = hashlib.sha256()
+    for qhash in task_keys(dataset)[0]:
+        digest.update(qhash.to_bytes(8, "big"))
+    return digest.hexdigest()[:16]
+
+
+def _dump_prompt(prompt: VersionedPromptTemplate) -> dict:
+    return {
+        "version": prompt.version,
+        "template": prompt.prompt_template.template,
+        "engine": prompt.prompt_template.engine,
+        "score": prompt.score,
+    }
+
+
+def _load_prompt(data: dict) -> VersionedPromptTemplate:
+    return VersionedPromptTemplate(
+        version=data["version"],
+        prompt_template=PromptTemplate(template=data["template"], engine=data["engine"]),
+        score=data["score"],
+    )
+
+
+def _jsonable(value):
+    """journal에 넣을 값 (span 속성 등 JSON이 아닌 값은 문자열)"""
+    return json.loads(json.dumps(value, ensure_ascii=False, default=str))
+
+
+def evaluation_key(template: str, tasks: Sequence[Any], mode: str) -> str:
+    payload = json.dumps([template, mode, _jsonable(list(tasks))], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def empty_journal() -> dict:
+    return {"parents": [], "batches": {"grad": [], "val": []}, "evaluations": {}, "edits": []}
+
+
+def _journal_results(results: list, mode: str) -> list:
+    """journal에 남길 rollout 결과 - val은 선택 / 점수에 쓰는 final_reward와 status만"""
+    if mode != "val":
+        return _jsonable(results)
+    return [{"status": result["status"], "final_reward": result["final_reward"], "spans": [], "messages": []}
+            for result in results]
+
+
+class _JournaledBatches:
+    """APO 배치 iterator - 재생할 배치가 남아 있으면 그것부터, 이후 원래 iterator (뽑은 배치는 journal에 기록)"""
+
+    def __init__(self, iterator: Iterator, owner: "CheckpointingAPO", name: str):
+        self._iterator = iterator
+        self._owner = owner
+        self._name = name
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        replay = self._owner._replay["batches"][self._name]
+        if replay:
+            return replay.pop(0)
+        batch = _jsonable(list(next(self._iterator)))
+        self._owner._append_journal({"type": "batch", "name": self._name, "batch": batch})
+        return batch
+
+
+class TrainingCheckpoint:
+    """체크포인트 디렉터리 (state.json + journal.jsonl + best_prompt.txt)"""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.state_path = self.directory / "state.json"
+        self.journal_path = self.directory / "journal.jsonl"
+        self.best_prompt_path = self.directory / "best_prompt.txt"
+
+    def load(self) -> Optional[dict]:
+        """라운드 경계 스냅샷 + 진행 중인 라운드 journal (state["journal"])"""
+        if not self.state_path.exists():
+            return None
+        state = json.loads(self.state_path.read_text(encoding="utf-8"))
+        if state.get("state_version") != STATE_VERSION:
+            raise RuntimeError(f"Unsupported training checkpoint version in {self.state_path}")
+        state["journal"] = self.read_journal(state.get("journal_id"))
+        return state
+
+    def save(self, state: dict) -> str:
+        """라운드 경계 스냅샷 저장 후 journal을 비움 → 새 journal_id"""
+        journal_id = uuid.uuid4().hex
+        state = {"state_version": STATE_VERSION, "saved_at": time.time(), "journal_id": journal_id, **state}
+        atomic_write_text(self.state_path, json.dumps(state, ensure_ascii=False, indent=2))
+        atomic_write_text(self.journal_path, "")
+        if state.get("best"):
+            atomic_write_text(self.best_prompt_path, state["best"]["template"])
+        return journal_id
+
+    def append(self, journal_id: str, event: dict):
+        """journal 이벤트 한 줄 추가 (fsync 후 반환)"""
+        line = json.dumps({"journal_id": journal_id, **event}, ensure_ascii=False)
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def read_journal(self, journal_id: Optional[str]) -> dict:
+        """journal_id가 같은 이벤트를 재생용 구조로 (쓰다 만 마지막 줄은 무시)"""
+        journal = empty_journal()
+        if journal_id is None or not self.journal_path.exists():
+            return journal
+        with open(self.journal_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                if event.get("journal_id") != journal_id:
+                    continue
+                kind = event["type"]
+                if kind == "parents":
+                    journal["parents"] = event["indices"]
+                elif kind == "batch":
+                    journal["batches"][event["name"]].append(event["batch"])
+                elif kind == "evaluation":
+                    journal["evaluations"].setdefault(event["key"], []).append(
+                        {"results": event["results"], "score": event["score"]})
+                    for name in ("sampler", "candidate_costs"):
+                        if name in event:
+                            journal[name] = event[name]  # 마지막 평가 시점 값
+                elif kind == "edit":
+                    journal["edits"].append(event["prompt"])
+        return journal
+
+
+class CheckpointingAPO(APO):
+    """라운드마다 상태를 저장하고 resume_state부터 이어서 실행하는 APO
+
+    AdaptiveSamplingAPO의 태스크 통계, RacingAPO의 라운드별 rollout 수, RewardReportAPO의 후보별 비용도 함께 저장 / 복원.
+    run()은 agentlightning 0.3.0 algorithm/apo/apo.py의 APO.run()을 옮겨 체크포인트를 끼워 넣은 것이고,
+    journal은 비공개 메서드(_sample_parent_prompts, _version_counter, _history_best_* 등)에 의존하므로
+    agentlightning을 올릴 때 upstream run()과 다시 맞춰야 한다 (pyproject에서 <0.4로 고정).
+    """
+
+    def __init__(self, *args, checkpoint: Optional[TrainingCheckpoint] = None,
+                 resume_state: Optional[dict] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkpoint = checkpoint or TrainingCheckpoint(TRAINING_CHECKPOINT_DIR)
+        self.resume_state = resume_state
+        self.round_history: list[dict] = []  # 라운드별 {"round", "beam": [{"version", "score"}], "best_score"}
+        self._fingerprints: dict = {}
+        self._journal_id: Optional[str] = None  # 마지막 라운드 경계 스냅샷의 journal_id (없으면 journal 기록 안 함)
+        self._replay = empty_journal()          # 재개한 라운드에서 재생할 기록
+
+    # === 저장 / 복원 ===
+    def _state(self, beam: list, completed_rounds: int, candidates: Optional[list] = None) -> dict:
+        best = None
+        if self._history_best_prompt is not None:
+            best = {
+                "version": self._history_best_version,
+                "template": self._history_best_prompt.template,
+                "engine": self._history_best_prompt.engine,
+                "score": self._history_best_score if self._history_best_score != float("-inf") else None,
+            }
+        state = {
+            "completed_rounds": completed_rounds,
+            "beam_rounds": self.beam_rounds,
+            "phase": "candidates" if candidates is not None else "selected",
+            "beam": [_dump_prompt(prompt) for prompt in beam],
+            "candidates": [_dump_prompt(prompt) for prompt in candidates] if candidates is not None else None,
+            "best": best,
+            "version_counter": self._version_counter,
+            "round_history": self.round_history,
+            "datasets": self._fingerprints,
+        }
+        if hasattr(self, "sampler"):
+            state["sampler"] = {str(qhash): entry for qhash, entry in self.sampler.stats.items()}
+        if hasattr(self, "round_rollouts"):
+            state["round_rollouts"] = self.round_rollouts
+        if hasattr(self, "candidate_costs"):
+            state["candidate_costs"] = self.candidate_costs
+        return state
+
+    def _save_round(self, state: dict):
+        """라운드 경계 스냅샷 저장 (journal은 다음 라운드용으로 비움)"""
+        self._journal_id = self.checkpoint.save(state)
+
+    def _append_journal(self, event: dict):
+        if self._journal_id is not None:
+            self.checkpoint.append(self._journal_id, event)
+
+    def _restore(self, state: dict) -> tuple[list, int, Optional[list]]:
+        """→ (beam, 완료된 라운드 수, 평가 전 후보 또는 None)"""
+        for name, fingerprint in state.get("datasets", {}).items():
+            if self._fingerprints.get(name) != fingerprint:
+                self._log(logging.WARNING, f"{name} dataset changed since the checkpoint was saved")
+        best = state["best"]
+        if best is not None:
+            self._history_best_prompt = PromptTemplate(template=best["template"], engine=best["engine"])
+            self._history_best_version = best["version"]
+            self._history_best_score = best["score"] if best["score"] is not None else float("-inf")
+        self._version_counter = state["version_counter"]
+        self.round_history = state["round_history"]
+        if hasattr(self, "sampler") and "sampler" in state:
+            self.sampler.stats = {int(qhash): entry for qhash, entry in state["sampler"].items()}
+        if hasattr(self, "round_rollouts") and "round_rollouts" in state:
+            self.round_rollouts = state["round_rollouts"]
+        if hasattr(self, "candidate_costs") and "candidate_costs" in state:
+            self.candidate_costs = state["candidate_costs"]
+        self._replay = state.get("journal") or empty_journal()
+        # 재생할 평가 결과가 반영된 샘플러 통계 / 후보별 비용 (journal의 마지막 평가 시점)
+        if hasattr(self, "sampler") and "sampler" in self._replay:
+            self.sampler.stats = {int(qhash): entry for qhash, entry in self._replay["sampler"].items()}
+        if hasattr(self, "candidate_costs") and "candidate_costs" in self._replay:
+            self.candidate_costs = self._replay["candidate_costs"]
+        # 재개 후 새 이벤트는 같은 journal에 이어서 기록 (재생한 이벤트는 이미 파일에 있음)
+        self._journal_id = state.get("journal_id")
+        if self._journal_id is None:
+            self._save_round({key: value for key, value in state.items()
+                              if key not in ("state_version", "saved_at", "journal_id", "journal")})
+        candidates = state["candidates"]
+        return (
+            [_load_prompt(prompt) for prompt in state["beam"]],
+            state["completed_rounds"],
+            [_load_prompt(prompt) for prompt in candidates] if candidates is not None else None,
+        )
+
+    # === 라운드 journal (재생 → 없으면 실행 후 기록) ===
+    def _sample_parent_prompts(self, beam, round_num):
+        if self._replay["parents"]:
+            indices, self._replay["parents"] = self._replay["parents"], []
+            return [(index, beam[index]) for index in indices]
+        parents = super()._sample_parent_prompts(beam, round_num)
+        self._append_journal({"type": "parents", "indices": [index for index, _ in parents]})
+        return parents
+
+    async def evaluate_prompt_on_batch(self, prompt, resource_name, dataset, mode, *, prefix=None):
+        key = evaluation_key(prompt.prompt_template.template, dataset, mode)
+        replayed = self._replay["evaluations"].get(key)
+        if replayed:
+            entry = replayed.pop(0)
+            self._log(logging.INFO, f"Replaying {len(entry['results'])} {mode} rollouts from the checkpoint journal",
+                      prefix=prefix)
+            return entry["results"], entry["score"]
+        results, score = await super().evaluate_prompt_on_batch(prompt, resource_name, dataset, mode, prefix=prefix)
+        event = {"type": "evaluation", "key": key, "results": _journal_results(results, mode), "score": score}
+        if hasattr(self, "sampler") and mode == "train":
+            event["sampler"] = {str(qhash): entry for qhash, entry in self.sampler.stats.items()}
+        if hasattr(self, "candidate_costs") and mode == "val":
+            event["candidate_costs"] = self.candidate_costs
+        self._append_journal(event)
+        return results, score
+
+    async def textual_gradient_and_apply_edit(self, current_prompt, rollout, *, prefix=None):
+        if self._replay["edits"]:
+            return self._replay["edits"].pop(0)
+        new_prompt = await super().textual_gradient_and_apply_edit(current_prompt, rollout, prefix=prefix)
+        self._append_journal({"type": "edit", "prompt": new_prompt})
+        return new_prompt
+
+    def _journaled(self, iterator: Iterator, name: str) -> _JournaledBatches:
+        return _JournaledBatches(iterator, self, name)
+
+    # === APO.run + 체크포인트 ===
+    @with_llm_proxy()
+    @with_store
+    async def run(self, store, llm_proxy, train_dataset=None, val_dataset=None) -> None:
+        resource_name, seed_prompt, grad_iterator, val_iterator = self._initialize_beam(train_dataset, val_dataset)
+        grad_iterator, val_iterator = self._journaled(grad_iterator, "grad"), self._journaled(val_iterator, "val")
+        if self._poml_trace:
+            poml.set_trace(trace_dir="pomltrace")
+        assert val_dataset is not None
+        self._fingerprints = {"train": dataset_fingerprint(train_dataset), "val": dataset_fingerprint(val_dataset)}
+
+        pending: Optional[list] = None
+        if self.resume_state is not None:
+            beam, start_round, pending = self._restore(self.resume_state)
+            self._log(
+                logging.INFO,
+                f"Resuming from checkpoint: {start_round}/{self.beam_rounds} rounds done"
+                + (f", {len(pending)} candidates awaiting evaluation" if pending is not None else ""),
+            )
+        else:
+            seed_versioned = self._create_versioned_prompt(seed_prompt)
+            beam = [seed_versioned]
+            self._history_best_prompt = seed_prompt
+            self._history_best_version = seed_versioned.version
+            start_round = 0
+            if self.run_initial_validation:
+                seed_prefix = self._format_log_prefix(round_num=0, prompt_version=seed_versioned.version)
+                _, seed_score = await self.evaluate_prompt_on_batch(
+                    seed_versioned, resource_name, cast(Sequence[Any], val_dataset), mode="val", prefix=seed_prefix,
+                )
+                self._log(logging.INFO, f"Seed prompt baseline score: {seed_score:.3f}", prefix=seed_prefix)
+                self._history_best_score = seed_score
+            self._save_round(self._state(beam, 0))
+
+        for rnd in range(start_round, self.beam_rounds):
+            round_prefix = self._format_log_prefix(round_num=rnd + 1)
+            self._log(logging.INFO, f"Round {rnd + 1}/{self.beam_rounds}...", prefix=round_prefix)
+
+            if pending is None:
+                parent_prompts = self._sample_parent_prompts(beam, rnd)
+                new_candidates = await self._generate_candidate_prompts(parent_prompts, resource_name, grad_iterator, rnd)
+                self._save_round(self._state(beam, rnd, candidates=new_candidates))
+            else:
+                new_candidates, pending = pending, None
+
+            beam = await self._evaluate_and_select_beam([*beam, *new_candidates], resource_name, val_iterator, rnd)
+            await self._update_best_prompt(beam, resource_name, val_dataset, rnd)
+            self.round_history.append({
+                "round": rnd + 1,
+                "beam": [{"version": prompt.version, "score": prompt.score} for prompt in beam],
+                "best_score": self._history_best_score,
+            })
+            self._save_round(self._state(beam, rnd + 1))
+            self._log(logging.INFO, f"Checkpoint saved to {self.checkpoint.state_path}", prefix=round_prefix)
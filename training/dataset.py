@@ -1,5 +1,30 @@
-"""학습 데이터셋 정의"""
-from typing import TypedDict
+"""학습 데이터셋 정의
+
+- create_dataset: 내장 함정 문제 (DATASET_PATHS 미설정 시)
+- JSONL 데이터셋: 파일을 한 번 스캔해 (파일, byte offset) 인덱스만 메모리에 두고 태스크는 접근할 때 읽음
+  정규화한 문제 해시로 중복 제거 (파일 / 줄 순서상 먼저 나온 것 유지)
+- split_dataset: (difficulty, subject) 층별 train / validation 분할
+  층별 validation 수는 최대 잉여 배분(전체 round(N × fraction)), 층 안에서는 seed 키 해시가 작은 순으로 선택
+  → 파일 순서와 무관하게 결정적, 태스크가 추가돼도 기존 배정이 대부분 유지
+- shard_dataset: 문제 해시 기준 i/n 샤드 (여러 학습 작업이 같은 데이터를 나눠 쓸 때)
+"""
+import glob
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from array import array
+from collections import defaultdict
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Iterable, TypedDict, Union
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from config import DATASET_PATHS, DATASET_VAL_FRACTION, DATASET_SPLIT_SEED, DATASET_SHARD
+
+REQUIRED_FIELDS = ("question", "expected_answer", "difficulty", "subject")
 
 
 class QuizTask(TypedDict):
@@ -99,3 +124,212 @@ def create_dataset() -> list[QuizTask]:
             "subject": "논리"
         },
     ]
+
+
+# === JSONL 데이터셋 ===
+def normalize_question(question: str) -> str:
+    """NFKC + casefold + 공백 정리 (띄어쓰기 / 전각 문자만 다른 중복 제거용)"""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", question).casefold()).strip()
+
+
+def question_hash(question: str) -> int:
+    """정규화한 문제의 64bit 해시"""
+    digest = hashlib.blake2b(normalize_question(question).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def _keyed(seed: str, value: int) -> int:
+    digest = hashlib.blake2b(value.to_bytes(8, "big"), digest_size=8, key=seed.encode("utf-8")[:64]).digest()
+    return int.from_bytes(digest, "big")
+
+
+def _parse_task(line: bytes, path: str, lineno: int) -> QuizTask:
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"{path}:{lineno}: invalid JSON ({e.msg})") from None
+    missing = [key for key in REQUIRED_FIELDS if not isinstance(record.get(key), str)]
+    if missing:
+        raise ValueError(f"{path}:{lineno}: missing or non-string fields {missing}")
+    return {key: record[key] for key in REQUIRED_FIELDS}
+
+
+def expand_paths(patterns: Iterable[str]) -> list[str]:
+    """콤마로 나눈 경로 / glob → 정렬된 파일 목록 (일치하는 파일이 없으면 에러)"""
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern))
+        if not matches:
+            raise ValueError(f"No dataset files match '{pattern}'")
+        paths.extend(matches)
+    return paths
+
+
+class JsonlDataset(Sequence):
+    """JSONL 태스크의 지연 로딩 Sequence - 인덱스(파일 번호, offset, 해시, 층)만 메모리에 유지
+
+    Agent Lightning Dataset 프로토콜(__len__ / __getitem__)을 만족하므로 trainer.fit에 그대로 전달.
+    """
+
+    def __init__(self, paths: list[str], file_ids: array, offsets: array, hashes: array,
+                 strata: array, stratum_names: list[tuple[str, str]], duplicates: int = 0):
+        self.paths = paths
+        self.file_ids = file_ids
+        self.offsets = offsets
+        self.hashes = hashes
+        self.strata = strata
+        self.stratum_names = stratum_names
+        self.duplicates = duplicates
+        self._handles: dict = {}
+        self._pid = os.getpid()
+
+    @classmethod
+    def scan(cls, paths: list[str]) -> "JsonlDataset":
+        """파일을 한 줄씩 읽어 인덱스 생성 (빈 줄 무시, 형식 오류는 파일:줄 번호와 함께 ValueError)"""
+        file_ids, offsets, hashes, strata = array("H"), array("q"), array("Q"), array("H")
+        stratum_ids: dict[tuple[str, str], int] = {}
+        seen: set[int] = set()
+        duplicates = 0
+        for file_id, path in enumerate(paths):
+            with open(path, "rb") as f:
+                offset = 0
+                for lineno, line in enumerate(f, 1):
+                    start, offset = offset, offset + len(line)
+                    if not line.strip():
+                        continue
+                    task = _parse_task(line, path, lineno)
+                    qhash = question_hash(task["question"])
+                    if qhash in seen:
+                        duplicates += 1
+                        continue
+                    seen.add(qhash)
+                    stratum = stratum_ids.setdefault((task["difficulty"], task["subject"]), len(stratum_ids))
+                    file_ids.append(file_id)
+                    offsets.append(start)
+                    hashes.append(qhash)
+                    strata.append(stratum)
+        return cls(paths, file_ids, offsets, hashes, strata, list(stratum_ids), duplicates)
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.subset(range(len(self))[index])
+        f = self._handle(self.file_ids[index])
+        f.seek(self.offsets[index])
+        return _parse_task(f.readline(), self.paths[self.file_ids[index]], -1)
+
+    def subset(self, positions: Iterable[int]) -> "JsonlDataset":
+        positions = list(positions)
+        return JsonlDataset(
+            self.paths,
+            array("H", (self.file_ids[i] for i in positions)),
+            array("q", (self.offsets[i] for i in positions)),
+            array("Q", (self.hashes[i] for i in positions)),
+            array("H", (self.strata[i] for i in positions)),
+            self.stratum_names,
+        )
+
+    def _handle(self, file_id: int):
+        # 파일 핸들은 프로세스별 (fork된 프로세스가 offset을 공유하지 않도록)
+        if self._pid != os.getpid():
+            self._handles, self._pid = {}, os.getpid()
+        f = self._handles.get(file_id)
+        if f is None:
+            f = self._handles[file_id] = open(self.paths[file_id], "rb")
+        return f
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_handles"] = {}
+        return state
+
+    def stratum_counts(self) -> dict[str, int]:
+        counts: dict[str, int] = defaultdict(int)
+        for stratum in self.strata:
+            counts["/".join(self.stratum_names[stratum])] += 1
+        return dict(counts)
+
+
+TaskDataset = Union[JsonlDataset, list[QuizTask]]
+
+
+def task_keys(dataset: TaskDataset) -> tuple[Sequence[int], Sequence]:
+    """(문제 해시, 층) 목록 - JSONL은 인덱스에서, 리스트는 태스크에서 계산"""
+    if isinstance(dataset, JsonlDataset):
+        return dataset.hashes, dataset.strata
+    return ([question_hash(task["question"]) for task in dataset],
+            [(task["difficulty"], task["subject"]) for task in dataset])
+
+
+def _select(dataset: TaskDataset, positions: list[int]) -> TaskDataset:
+    if isinstance(dataset, JsonlDataset):
+        return dataset.subset(positions)
+    return [dataset[i] for i in positions]
+
+
+def dedupe_tasks(tasks: list[QuizTask]) -> list[QuizTask]:
+    """정규화한 문제 해시 기준 중복 제거 (먼저 나온 것 유지)"""
+    seen: set[int] = set()
+    unique = []
+    for task in tasks:
+        qhash = question_hash(task["question"])
+        if qhash not in seen:
+            seen.add(qhash)
+            unique.append(task)
+    return unique
+
+
+def split_dataset(dataset: TaskDataset, val_fraction: float = DATASET_VAL_FRACTION,
+                  seed: str = DATASET_SPLIT_SEED) -> tuple[TaskDataset, TaskDataset]:
+    """층별 train / validation 분할 (결정적) → (train, val)"""
+    hashes, strata = task_keys(dataset)
+    groups: dict = defaultdict(list)
+    for position, (qhash, stratum) in enumerate(zip(hashes, strata)):
+        groups[stratum].append((_keyed(seed, qhash), position))
+
+    # 층별 validation 수: floor(n × fraction) 후 남은 수를 소수부가 큰 층부터 배분
+    target = round(len(hashes) * val_fraction)
+    quotas = {stratum: int(len(members) * val_fraction) for stratum, members in groups.items()}
+    remainders = sorted(
+        groups,
+        key=lambda stratum: (len(groups[stratum]) * val_fraction - quotas[stratum], min(groups[stratum])[0]),
+        reverse=True,
+    )
+    for stratum in remainders[:max(0, target - sum(quotas.values()))]:
+        quotas[stratum] += 1
+
+    val_positions = set()
+    for stratum, members in groups.items():
+        val_positions.update(position for _, position in sorted(members)[:quotas[stratum]])
+    train = [position for position in range(len(hashes)) if position not in val_positions]
+    return _select(dataset, train), _select(dataset, sorted(val_positions))
+
+
+def shard_dataset(dataset: TaskDataset, index: int, count: int, seed: str = DATASET_SPLIT_SEED) -> TaskDataset:
+    """문제 해시 기준 index번째 샤드 (count개 샤드가 겹치지 않고 전체를 덮음)"""
+    if count == 1:
+        return dataset
+    hashes, _ = task_keys(dataset)
+    return _select(dataset, [position for position, qhash in enumerate(hashes) if _keyed(seed, qhash) % count == index])
+
+
+def load_splits() -> tuple[TaskDataset, TaskDataset]:
+    """설정(DATASET_PATHS / VAL_FRACTION / SPLIT_SEED / SHARD)대로 (train, val) 준비
+
+    DATASET_PATHS가 비어 있으면 내장 데이터셋. 샤드는 train에만 적용 (validation은 모든 작업이 같은 기준으로 비교).
+    """
+    if DATASET_PATHS:
+        dataset = JsonlDataset.scan(expand_paths(DATASET_PATHS))
+    else:
+        dataset = dedupe_tasks(create_dataset())
+    train, val = split_dataset(dataset)
+    shard_index, shard_count = DATASET_SHARD
+    return shard_dataset(train, shard_index, shard_count), val
+
+
+def write_jsonl(tasks: Iterable[QuizTask], path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        for task in tasks:
+            f.write(json.dumps(task, ensure_ascii=False) + "\n")
@@ -1,6 +1,22 @@
-"""LLM-as-Judge 평가기"""
+"""LLM-as-Judge 평가기
+
+- evaluate_answer: 답변 1개를 1회 호출로 채점
+- BatchJudge: 동시에 진행 중인 rollout들의 채점 요청을 짧은 window 동안 모아 1회 호출로 채점
+  (verdict 배열 응답을 각 rollout에 매핑, 응답 형식이 어긋나면 단건 채점으로 fallback)
+- JudgeServer: Agent Lightning runner는 프로세스마다 rollout을 하나씩 순차 실행하므로 프로세스 안에서는 묶을 요청이 없다.
+  학습 메인 프로세스에서 BatchJudge 하나를 Unix 소켓으로 열고, fork된 runner들의 grade_answer가 여기로 요청을 보낸다.
+"""
+from multiprocessing.connection import Client, Connection, Listener
 from pathlib import Path
+import hashlib
+import json
+import os
+import random
+import secrets
 import sys
+import threading
+from dataclasses import dataclass, field
+from typing import Optional
 
 from openai import AzureOpenAI
 
@@ -8,18 +24,54 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from config import (
     AZURE_OPENAI_ENDPOINT,
     AZURE_OPENAI_API_KEY,
-    AZURE_OPENAI_DEPLOYMENT_NAME,
     AZURE_OPENAI_API_VERSION,
+    JUDGE_BATCH_SIZE,
+    JUDGE_BATCH_WINDOW,
+    JUDGE_CONSISTENCY_SAMPLE_RATE,
+)
+from opentelemetry import metrics
+from llm_cassette import get_cassette
+from llm_router import Deployment, get_router
+from .usage import add_tracked_tokens, record_usage, track_tokens
+
+_cached_clients: dict[str, AzureOpenAI] = {}  # {endpoint: client}
+
+_meter = metrics.get_meter(__name__)
+judge_requests_counter = _meter.create_counter(
+    "apo.judge.requests", description="Judge LLM requests by mode (single / batch / fallback)",
+)
+judge_batch_size_histogram = _meter.create_histogram(
+    "apo.judge.batch_size", description="Answers graded per judge request",
+)
+judge_agreement_counter = _meter.create_counter(
+    "apo.judge.consistency", description="Sampled batch verdicts re-graded singly (agree / disagree)",
 )
 
+JUDGE_SYSTEM_PROMPT = """당신은 매우 엄격한 채점자입니다. 학생의 최종 답변만 평가합니다.
+
+엄격한 평가 기준:
+1. 학생이 제시한 "최종 숫자/값"만 정답과 비교하세요.
+2. 풀이 과정이 맞아도 최종 답이 틀리면 0점입니다.
+3. 정답과 정확히 일치하는 값이 최종 답변에 없으면 0점입니다.
+4. "알 수 없다", "정보 부족" 등의 답변은 정답이 그것일 때만 1점입니다.
+
+예시:
+- 정답 "0", 학생 "방주는 노아가 만들었으므로 모세는 0쌍을 태웠습니다" → 최종값 0 → 1점
+- 정답 "0", 학생 "노아가 7쌍씩 태웠습니다" → 최종값 7 → 0점  
+- 정답 "47", 학생 "절반은 24일" → 최종값 24 → 0점
+- 정답 "철수", 학생 "셋째는 삼월입니다" → 최종값 삼월 → 0점
+- 정답 "2", 학생 "2개 가져가면 3개 남습니다" → 최종값 3 → 0점 (남은 개수가 아니라 가져간 개수를 물었음)"""
+
 
-def create_azure_client() -> AzureOpenAI:
-    """Azure OpenAI 클라이언트 생성"""
-    return AzureOpenAI(
-        azure_endpoint=AZURE_OPENAI_ENDPOINT,
-        api_key=AZURE_OPENAI_API_KEY,
-        api_version=AZURE_OPENAI_API_VERSION,
-    )
+def create_azure_client(endpoint: str = AZURE_OPENAI_ENDPOINT) -> AzureOpenAI:
+    """Azure OpenAI 클라이언트 생성 (엔드포인트별 싱글톤)"""
+    if endpoint not in _cached_clients:
+        _cached_clients[endpoint] = AzureOpenAI(
+            azure_endpoint=endpoint,
+            api_key=AZURE_OPENAI_API_KEY,
+            api_version=AZURE_OPENAI_API_VERSION,
+        )
+    return _cached_clients[endpoint]
 
 
 def evaluate_answer(student_answer: str, expected_answer: str, question: str) -> float:
@@ -34,33 +86,30 @@ def evaluate_answer(student_answer: str, expected_answer: str, question: str) ->
     Returns:
         1.0 (정답) 또는 0.0 (오답)
     """
-    client = create_azure_client()
-    
-    eval_prompt = f"""당신은 매우 엄격한 채점자입니다. 학생의 최종 답변만 평가합니다.
-
-문제: {question}
+    # 고정 채점 기준/예시를 system prefix로, 문제별 값은 마지막 user 메시지로 (프롬프트 캐시 적중)
+    user_prompt = f"""문제: {question}
 정답: {expected_answer}
 학생 답변: {student_answer}
 
-엄격한 평가 기준:
-1. 학생이 제시한 "최종 숫자/값"만 정답과 비교하세요.
-2. 풀이 과정이 맞아도 최종 답이 틀리면 0점입니다.
-3. 정답과 정확히 일치하는 값이 최종 답변에 없으면 0점입니다.
-4. "알 수 없다", "정보 부족" 등의 답변은 정답이 그것일 때만 1점입니다.
-
-예시:
-- 정답 "0", 학생 "방주는 노아가 만들었으므로 모세는 0쌍을 태웠습니다" → 최종값 0 → 1점
-- 정답 "0", 학생 "노아가 7쌍씩 태웠습니다" → 최종값 7 → 0점  
-- 정답 "47", 학생 "절반은 24일" → 최종값 24 → 0점
-- 정답 "철수", 학생 "셋째는 삼월입니다" → 최종값 삼월 → 0점
-- 정답 "2", 학생 "2개 가져가면 3개 남습니다" → 최종값 3 → 0점 (남은 개수가 아니라 가져간 개수를 물었음)
-
 학생의 최종 답변 값이 정답 "{expected_answer}"와 정확히 일치하면 1, 아니면 0을 출력하세요:"""
 
-    response = client.chat.completions.create(
-        model=AZURE_OPENAI_DEPLOYMENT_NAME,
-        messages=[{"role": "user", "content": eval_prompt}],
-    )
+    messages = [
+        {"role": "system", "content": JUDGE_SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt},
+    ]
+
+    def judge(deployment: Deployment):
+        response = get_cassette().call("judge", deployment.deployment, messages, lambda: (
+            create_azure_client(deployment.endpoint).chat.completions.create(
+                model=deployment.deployment,
+                messages=messages,
+            )
+        ))
+        record_usage("judge", deployment.deployment, response.usage)
+        return response
+    
+    response = get_router().call("judge", judge)
+    judge_requests_counter.add(1, {"mode": "single"})
     
     content = response.choices[0].message.content
     if content is None:
@@ -72,3 +121,263 @@ def evaluate_answer(student_answer: str, expected_answer: str, question: str) ->
     if result == "1":
         return 1.0
     return 0.0
+
+
+BATCH_JUDGE_INSTRUCTION = """여러 학생 답변을 한 번에 채점합니다. 각 항목을 서로 독립적으로, 위 기준 그대로 채점하세요.
+반드시 다음 JSON 형식으로만 출력하세요 (항목 순서대로, 정확히 일치하면 1, 아니면 0):
+{"verdicts": [1, 0, ...]}"""
+
+
+@dataclass
+class _PendingJudgement:
+    question: str
+    expected_answer: str
+    student_answer: str
+    event: threading.Event = field(default_factory=threading.Event)
+    leader: bool = False
+    reward: Optional[float] = None
+    tokens: int = 0  # batch 채점 토큰 중 이 항목 몫 (균등 분배)
+    error: Optional[Exception] = None
+
+
+def _parse_verdicts(content: Optional[str], expected_count: int) -> Optional[list[float]]:
+    """{"verdicts": [...]} → reward 목록, 형식이 어긋나면 None (단건과 같은 엄격 기준: 정확히 1만 정답)"""
+    try:
+        verdicts = json.loads(content or "")["verdicts"]
+    except (ValueError, KeyError, TypeError):
+        return None
+    if not isinstance(verdicts, list) or len(verdicts) != expected_count:
+        return None
+    if any(not (type(v) is int and v in (0, 1)) and v not in ("0", "1") for v in verdicts):
+        return None
+    return [1.0 if v in (1, "1") else 0.0 for v in verdicts]
+
+
+def evaluate_answers_batch(items: list[tuple[str, str, str]]) -> list[float]:
+    """(student_answer, expected_answer, question) 여러 개를 1회 호출로 채점"""
+    if len(items) == 1:
+        return [evaluate_answer(*items[0])]
+
+    blocks = [
+        f"[{i}]\n문제: {question}\n정답: {expected_answer}\n학생 답변: {student_answer}"
+        for i, (student_answer, expected_answer, question) in enumerate(items, start=1)
+    ]
+    user_prompt = "\n\n".join(blocks) + f"\n\n{len(items)}개 항목의 verdicts를 출력하세요:"
+
+    messages = [
+        {"role": "system", "content": JUDGE_SYSTEM_PROMPT + "\n\n" + BATCH_JUDGE_INSTRUCTION},
+        {"role": "user", "content": user_prompt},
+    ]
+
+    def judge(deployment: Deployment):
+        response = get_cassette().call("judge", deployment.deployment, messages, lambda: (
+            create_azure_client(deployment.endpoint).chat.completions.create(
+                model=deployment.deployment,
+                messages=messages,
+                response_format={"type": "json_object"},
+            )
+        ))
+        record_usage("judge", deployment.deployment, response.usage)
+        return response
+
+    response = get_router().call("judge", judge)
+    judge_requests_counter.add(1, {"mode": "batch"})
+    judge_batch_size_histogram.record(len(items))
+
+    rewards = _parse_verdicts(response.choices[0].message.content, len(items))
+    if rewards is None:
+        # 형식 오류 → reward 의미가 바뀌지 않도록 단건 채점
+        judge_requests_counter.add(len(items), {"mode": "fallback"})
+        return [evaluate_answer(*item) for item in items]
+
+    if random.random() < JUDGE_CONSISTENCY_SAMPLE_RATE:
+        record_consistency(items, rewards)
+    return rewards
+
+
+def record_consistency(items: list[tuple[str, str, str]], batch_rewards: list[float]) -> float:
+    """batch 결과를 단건 채점과 비교해 일치율 반환 (apo.judge.consistency 메트릭 기록)"""
+    agree = 0
+    for item, batch_reward in zip(items, batch_rewards):
+        matched = evaluate_answer(*item) == batch_reward
+        agree += matched
+        judge_agreement_counter.add(1, {"result": "agree" if matched else "disagree"})
+    return agree / len(items) if items else 1.0
+
+
+class BatchJudge:
+    """동시 rollout의 채점 요청을 window 동안 모아 한 번에 채점
+
+    처음 도착한 요청이 leader가 되어 window까지 기다린 뒤 모인 요청을 채점하고, 나머지는 결과를 기다린다.
+    max_batch개 또는 participants(요청을 보낼 수 있는 runner 수, 알 때만)개가 모이면 window 전에 바로 채점한다.
+    """
+
+    def __init__(self, window: float, max_batch: int):
+        self.window = window
+        self.max_batch = max_batch
+        self.participants: Optional[int] = None
+        self.requests = 0  # 보낸 채점 요청 수 (batch 1회 = 1)
+        self.answers = 0   # 채점한 답변 수
+        self._pending: list[_PendingJudgement] = []
+        self._cond = threading.Condition()
+
+    def evaluate(self, student_answer: str, expected_answer: str, question: str) -> tuple[float, int]:
+        """→ (reward, 이 답변 몫의 judge 토큰)"""
+        item = _PendingJudgement(question, expected_answer, student_answer)
+        with self._cond:
+            self._pending.append(item)
+            item.leader = len(self._pending) == 1
+            self._cond.notify_all()
+
+        while item.reward is None and item.error is None:
+            if item.leader:
+                self._lead()
+            else:
+                item.event.wait()
+                item.event.clear()
+
+        if item.error is not None:
+            raise item.error
+        return item.reward, item.tokens
+
+    def _batch_limit(self) -> int:
+        return min(self.max_batch, self.participants) if self.participants else self.max_batch
+
+    def _lead(self):
+        with self._cond:
+            self._cond.wait_for(lambda: len(self._pending) >= self._batch_limit(), timeout=self.window)
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            if self._pending:
+                # 남은 요청 중 첫 번째가 다음 batch의 leader
+                self._pending[0].leader = True
+                self._pending[0].event.set()
+            self.requests += 1
+            self.answers += len(batch)
+
+        try:
+            with track_tokens() as usage:
+                rewards = evaluate_answers_batch(
+                    [(item.student_answer, item.expected_answer, item.question) for item in batch]
+                )
+            for item, reward in zip(batch, rewards):
+                item.reward = reward
+                item.tokens = usage["tokens"] // len(batch)
+        except Exception as e:
+            for item in batch:
+                item.error = e
+        for item in batch:
+            item.leader = False
+            item.event.set()
+
+
+JUDGE_SERVER_ENV = "JUDGE_SERVER_ADDRESS"  # fork된 runner가 상속받는 JudgeServer 소켓 주소
+JUDGE_SERVER_KEY_ENV = "JUDGE_SERVER_AUTHKEY"
+
+
+class JudgeServer:
+    """runner 프로세스들의 채점 요청을 BatchJudge 하나로 모으는 서버 (trainer.fit 전에 메인 프로세스에서 시작)
+
+    연결 하나 = runner 하나라서 연결 수를 BatchJudge.participants로 써서
+    모든 runner가 채점을 기다리면 window를 채우지 않고 바로 보낸다.
+    """
+
+    def __init__(self, batch_judge: BatchJudge):
+        self.batch_judge = batch_judge
+        self._authkey = secrets.token_bytes(16)
+        self._listener = Listener(family="AF_UNIX", authkey=self._authkey)
+        self._lock = threading.Lock()
+        self._clients = 0
+
+    @property
+    def address(self) -> str:
+        return self._listener.address
+
+    def start(self) -> "JudgeServer":
+        os.environ[JUDGE_SERVER_ENV] = self.address
+        os.environ[JUDGE_SERVER_KEY_ENV] = self._authkey.hex()
+        threading.Thread(target=self._accept, name="judge-server", daemon=True).start()
+        return self
+
+    def close(self):
+        os.environ.pop(JUDGE_SERVER_ENV, None)
+        os.environ.pop(JUDGE_SERVER_KEY_ENV, None)
+        self._listener.close()
+
+    def _accept(self):
+        while True:
+            try:
+                conn = self._listener.accept()
+            except OSError:  # close()
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn: Connection):
+        with self._lock:
+            self._clients += 1
+            self.batch_judge.participants = self._clients
+        try:
+            while True:
+                item = conn.recv()
+                try:
+                    conn.send(("ok", *self.batch_judge.evaluate(*item)))
+                except Exception as e:
+                    conn.send(("error", f"{type(e).__name__}: {e}"))
+        except (EOFError, OSError):  # runner 종료
+            pass
+        finally:
+            conn.close()
+            with self._lock:
+                self._clients -= 1
+                self.batch_judge.participants = self._clients or None
+
+
+_batch_judge: Optional[BatchJudge] = None
+_judge_client: Optional[tuple[int, Connection]] = None  # (pid, JudgeServer 연결)
+_judge_client_lock = threading.Lock()
+
+
+def start_judge_server() -> Optional[JudgeServer]:
+    """JUDGE_BATCH_SIZE > 1이면 JudgeServer 시작 (runner fork 전에 호출), 아니면 None"""
+    if JUDGE_BATCH_SIZE <= 1:
+        return None
+    return JudgeServer(BatchJudge(window=JUDGE_BATCH_WINDOW, max_batch=JUDGE_BATCH_SIZE)).start()
+
+
+def _grade_remote(address: str, item: tuple[str, str, str]) -> tuple[float, int]:
+    global _judge_client
+    with _judge_client_lock:
+        if _judge_client is None or _judge_client[0] != os.getpid():
+            conn = Client(address, family="AF_UNIX", authkey=bytes.fromhex(os.environ[JUDGE_SERVER_KEY_ENV]))
+            _judge_client = (os.getpid(), conn)
+        conn = _judge_client[1]
+        conn.send(item)
+        status, *result = conn.recv()
+    if status == "error":
+        raise RuntimeError(f"Judge server failed: {result[0]}")
+    return result[0], result[1]
+
+
+def judge_fingerprint() -> str:
+    """채점 기준 해시 - judge 시스템 프롬프트 + 채점 방식 (단건 / batch 지시문), rollout 캐시 키용"""
+    mode = BATCH_JUDGE_INSTRUCTION if JUDGE_BATCH_SIZE > 1 else "single"
+    return hashlib.sha256(f"{JUDGE_SYSTEM_PROMPT}\n{mode}".encode("utf-8")).hexdigest()[:16]
+
+
+def grade_answer(student_answer: str, expected_answer: str, question: str) -> float:
+    """설정에 따라 batch(JUDGE_BATCH_SIZE > 1) 또는 단건 채점
+
+    JudgeServer가 떠 있으면 (학습 runner) 그쪽으로, 없으면 같은 프로세스의 동시 호출끼리 묶는다.
+    batch 채점 토큰은 항목 수로 나눠 각 rollout의 track_tokens에 합산.
+    """
+    global _batch_judge
+    if JUDGE_BATCH_SIZE <= 1:
+        return evaluate_answer(student_answer, expected_answer, question)
+    address = os.environ.get(JUDGE_SERVER_ENV)
+    if address:
+        reward, tokens = _grade_remote(address, (student_answer, expected_answer, question))
+    else:
+        if _batch_judge is None:
+            _batch_judge = BatchJudge(window=JUDGE_BATCH_WINDOW, max_batch=JUDGE_BATCH_SIZE)
+        reward, tokens = _batch_judge.evaluate(student_answer, expected_answer, question)
+    add_tracked_tokens(tokens)
+    return reward
@@ -0,0 +1,155 @@
+"""후보 프롬프트 racing / successive halving 평가 - APO beam 선택의 rollout 비용 절감
+
+APO는 라운드마다 모든 후보를 validation batch 전체로 채점한 뒤 상위 beam_width개를 고른다.
+APO_EVAL_MODE가 racing / halving이면 후보를 점점 커지는 태스크 부분집합(APO_EVAL_MIN_TASKS부터 2배씩)으로 채점하며
+중간에 탈락시킨다.
+- racing : Hoeffding 신뢰구간(reward ∈ [0, 1]) 상한이 beam_width번째 후보의 하한보다 낮으면 탈락 (통계적으로 열세)
+- halving: racing 탈락 + 단계마다 상위 1/2만 다음 단계로 (beam_width개 미만으로는 줄이지 않음)
+APO_EVAL_BUDGET(> 0)이면 라운드당 평가 rollout 수 상한 - 다음 단계를 다 돌릴 수 없으면 그때까지의 평균으로 선택.
+"""
+import asyncio
+import logging
+import math
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterator, List, Optional, Sequence
+from pathlib import Path
+import sys
+
+from agentlightning.algorithm.apo import APO  # agl.APO는 지연 import 함수라 상속 불가
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from config import APO_EVAL_MODE, APO_EVAL_MIN_TASKS, APO_EVAL_BUDGET, APO_EVAL_CONFIDENCE
+
+HALVING_ETA = 2
+
+
+@dataclass
+class CandidateScore:
+    candidate: Any
+    rewards: list[float] = field(default_factory=list)
+    pruned_at: Optional[int] = None  # 탈락한 단계의 태스크 수
+
+    @property
+    def mean(self) -> float:
+        return sum(self.rewards) / len(self.rewards) if self.rewards else 0.0
+
+    def bounds(self, confidence: float) -> tuple[float, float]:
+        """Hoeffding 양측 신뢰구간 (reward ∈ [0, 1])"""
+        if not self.rewards:
+            return 0.0, 1.0
+        radius = math.sqrt(math.log(2 / (1 - confidence)) / (2 * len(self.rewards)))
+        return max(0.0, self.mean - radius), min(1.0, self.mean + radius)
+
+
+def rung_sizes(total: int, min_tasks: int) -> list[int]:
+    """단계별 누적 태스크 수: min_tasks, 2배, ... , total"""
+    sizes = []
+    size = max(1, min(min_tasks, total))
+    while size < total:
+        sizes.append(size)
+        size *= 2
+    sizes.append(total)
+    return sizes
+
+
+async def race_candidates(
+    candidates: Sequence[Any],
+    tasks: Sequence[Any],
+    evaluate: Callable[[Any, Sequence[Any]], Awaitable[list[float]]],
+    keep: int,
+    mode: str = "racing",
+    min_tasks: int = 2,
+    budget: int = 0,
+    confidence: float = 0.9,
+) -> tuple[list[CandidateScore], int]:
+    """후보를 단계적으로 채점 → (평균 reward 내림차순 점수 목록, 사용한 rollout 수)
+
+    evaluate(candidate, tasks)는 tasks 각각의 reward 목록을 반환 (None reward는 0으로 처리).
+    탈락한 후보도 결과에 포함되며 그때까지 채점한 태스크의 평균을 점수로 가진다.
+    """
+    scores = [CandidateScore(candidate) for candidate in candidates]
+    alive = list(scores)
+    spent = 0
+    done = 0
+    for size in rung_sizes(len(tasks), min_tasks):
+        batch = tasks[done:size]
+        cost = len(batch) * len(alive)
+        if budget > 0 and done > 0 and spent + cost > budget:
+            break
+        results = await asyncio.gather(*(evaluate(score.candidate, batch) for score in alive))
+        for score, rewards in zip(alive, results):
+            score.rewards.extend(reward or 0.0 for reward in rewards)
+        spent += cost
+        done = size
+        if size == len(tasks) or len(alive) <= keep:
+            continue
+
+        # 통계적으로 열세: 상한이 keep번째 후보의 하한보다 낮음
+        ranked = sorted(alive, key=lambda s: s.mean, reverse=True)
+        threshold = sorted((s.bounds(confidence)[0] for s in alive), reverse=True)[keep - 1]
+        survivors = [s for s in ranked if s.bounds(confidence)[1] >= threshold]
+        if mode == "halving":
+            survivors = survivors[:max(keep, math.ceil(len(alive) / HALVING_ETA))]
+        for score in alive:
+            if score not in survivors:
+                score.pruned_at = size
+        alive = survivors
+
+    ranked = sorted(scores, key=lambda s: (s.pruned_at is None, s.mean, len(s.rewards)), reverse=True)
+    return ranked, spent
+
+
+class RacingAPO(APO):
+    """_evaluate_and_select_beam만 racing / successive halving으로 교체한 APO
+
+    그 외 (gradient, apply_edit, 라운드별 beam 1위의 전체 validation 채점)는 APO와 같다.
+    agentlightning 0.3.0 APO._evaluate_and_select_beam의 시그니처 / 반환값을 따른다 (pyproject에서 <0.4로 고정).
+    """
+
+    def __init__(self, *args, eval_mode: str = APO_EVAL_MODE, min_tasks: int = APO_EVAL_MIN_TASKS,
+                 budget: int = APO_EVAL_BUDGET, confidence: float = APO_EVAL_CONFIDENCE, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.eval_mode = eval_mode
+        self.min_tasks = min_tasks
+        self.budget = budget
+        self.confidence = confidence
+        self.round_rollouts: list[dict] = []  # 라운드별 {"round", "candidates", "rollouts", "full_rollouts"}
+
+    async def _evaluate_and_select_beam(
+        self,
+        candidates: List[Any],
+        resource_name: str,
+        val_dataset_iterator: Iterator[Sequence[Any]],
+        round_num: int,
+    ) -> List[Any]:
+        round_prefix = self._format_log_prefix(round_num=round_num + 1)
+        val_batch = list(next(val_dataset_iterator))
+
+        async def evaluate(prompt, tasks: Sequence[Any]) -> list[float]:
+            prefix = self._format_log_prefix(round_num=round_num + 1, prompt_version=prompt.version)
+            results, _ = await self.evaluate_prompt_on_batch(prompt, resource_name, tasks, mode="val", prefix=prefix)
+            return [result["final_reward"] for result in results]
+
+        ranked, spent = await race_candidates(
+            candidates, val_batch, evaluate, keep=self.beam_width, mode=self.eval_mode,
+            min_tasks=self.min_tasks, budget=self.budget, confidence=self.confidence,
+        )
+        for score in ranked:
+            score.candidate.score = score.mean
+        self.round_rollouts.append({
+            "round": round_num + 1,
+            "candidates": len(candidates),
+            "rollouts": spent,
+            "full_rollouts": len(candidates) * len(val_batch),
+        })
+        self._log(
+            logging.INFO,
+            f"{self.eval_mode}: {spent} rollouts (full evaluation: {len(candidates) * len(val_batch)}), "
+            f"pruned {sum(1 for s in ranked if s.pruned_at is not None)}/{len(candidates)}",
+            prefix=round_prefix,
+        )
+
+        selected = [score.candidate for score in ranked[:self.beam_width]]
+        if not selected:
+            raise ValueError("No beam candidates any more")
+        return selected
@@ -0,0 +1,131 @@
+"""정답 + 비용(토큰 / 지연) 복합 reward와 후보별 Pareto 보고
+
+quiz_agent는 rollout마다 다차원 reward를 emit한다 (primary가 APO가 최적화하는 값).
+- correctness       : LLM-as-Judge 채점 (1.0 / 0.0)
+- prompt_tokens     : student 호출 입력 토큰 (최적화 대상 프롬프트 길이가 그대로 반영)
+- completion_tokens : student 답변 토큰
+- latency_s         : student 호출 지연 (failover 포함)
+- composite         : correctness - 토큰 / 지연 패널티, [0, 1]로 자름 (틀린 답은 비용과 무관하게 0)
+
+REWARD_MODE=correctness(기본)면 primary가 correctness, composite면 composite.
+비용 차원은 모드와 상관없이 기록되어 후보별 (정답률, 토큰, 지연) Pareto 보고에 쓰인다.
+"""
+from pathlib import Path
+from typing import Optional
+import sys
+
+from agentlightning.algorithm.apo import APO
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from config import (
+    REWARD_MODE,
+    REWARD_PROMPT_TOKEN_PENALTY,
+    REWARD_COMPLETION_TOKEN_PENALTY,
+    REWARD_LATENCY_PENALTY,
+)
+
+COST_DIMENSIONS = ("prompt_tokens", "completion_tokens", "latency_s")
+REWARD_ATTRIBUTE_PREFIX = "agentlightning.reward."
+
+
+def student_cost(usage, latency_s: float) -> dict:
+    """student chat.completions usage + 측정 지연 → 비용 차원 (usage가 없으면 토큰 0)"""
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        "latency_s": round(latency_s, 3),
+    }
+
+
+def composite_reward(correctness: float, cost: dict) -> float:
+    """correctness - (입력 토큰 / 1000 × α + 출력 토큰 / 1000 × β + 지연 초 × γ), [0, 1]"""
+    penalty = (
+        cost.get("prompt_tokens", 0) / 1000 * REWARD_PROMPT_TOKEN_PENALTY
+        + cost.get("completion_tokens", 0) / 1000 * REWARD_COMPLETION_TOKEN_PENALTY
+        + cost.get("latency_s", 0.0) * REWARD_LATENCY_PENALTY
+    )
+    return min(1.0, max(0.0, correctness - penalty))
+
+
+def reward_dimensions(correctness: float, cost: Optional[dict]) -> tuple[dict, str]:
+    """agl.emit_reward(dict, primary_key=...) 인자 → (차원별 값, primary 이름)"""
+    cost = cost or {}
+    dimensions = {
+        "correctness": correctness,
+        "composite": composite_reward(correctness, cost),
+        **{name: float(cost[name]) for name in COST_DIMENSIONS if name in cost},
+    }
+    return dimensions, REWARD_MODE
+
+
+def span_reward_dimensions(spans: list) -> dict:
+    """rollout span(dict 또는 객체)의 reward 차원 {이름: 값} (reward span이 여러 개면 마지막)"""
+    dimensions: dict = {}
+    for span in spans:
+        attributes = span.get("attributes") if isinstance(span, dict) else getattr(span, "attributes", None)
+        if not attributes:
+            continue
+        found = {}
+        index = 0
+        while f"{REWARD_ATTRIBUTE_PREFIX}{index}.name" in attributes:
+            found[attributes[f"{REWARD_ATTRIBUTE_PREFIX}{index}.name"]] = attributes.get(f"{REWARD_ATTRIBUTE_PREFIX}{index}.value")
+            index += 1
+        if found:
+            dimensions = found
+    return dimensions
+
+
+def pareto_front(candidates: list[dict]) -> set[str]:
+    """정답률은 높을수록, 토큰 / 지연은 낮을수록 좋은 기준으로 지배되지 않는 후보 version 집합"""
+    def dominates(a: dict, b: dict) -> bool:
+        better_or_equal = (a["correctness"] >= b["correctness"]
+                           and all(a[name] <= b[name] for name in COST_DIMENSIONS))
+        strictly = (a["correctness"] > b["correctness"]
+                    or any(a[name] < b[name] for name in COST_DIMENSIONS))
+        return better_or_equal and strictly
+
+    return {
+        c["version"] for c in candidates
+        if not any(dominates(other, c) for other in candidates if other is not c)
+    }
+
+
+class RewardReportAPO(APO):
+    """validation 평가마다 후보별 평균 정답률 / 토큰 / 지연을 모으는 APO (Pareto 보고용)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.candidate_costs: dict[str, dict] = {}  # {version: 누적 합계}
+
+    async def evaluate_prompt_on_batch(self, prompt, resource_name, dataset, mode, *, prefix=None):
+        results, score = await super().evaluate_prompt_on_batch(prompt, resource_name, dataset, mode, prefix=prefix)
+        if mode == "val":
+            entry = self.candidate_costs.setdefault(prompt.version, {
+                "version": prompt.version,
+                "prompt": prompt.prompt_template.template,
+                "n": 0, "correctness": 0.0, "composite": 0.0, **{name: 0.0 for name in COST_DIMENSIONS},
+            })
+            for result in results:
+                dimensions = span_reward_dimensions(result["spans"])
+                if not dimensions:
+                    continue
+                entry["n"] += 1
+                for name in ("correctness", "composite", *COST_DIMENSIONS):
+                    entry[name] += dimensions.get(name) or 0.0
+        return results, score
+
+    def pareto_report(self) -> list[dict]:
+        """후보별 평균 (rollout이 있는 후보만), 정답률 내림차순 + Pareto 여부"""
+        candidates = [
+            {
+                "version": entry["version"],
+                "prompt": entry["prompt"],
+                "rollouts": entry["n"],
+                **{name: entry[name] / entry["n"] for name in ("correctness", "composite", *COST_DIMENSIONS)},
+            }
+            for entry in self.candidate_costs.values() if entry["n"]
+        ]
+        front = pareto_front(candidates)
+        for candidate in candidates:
+            candidate["pareto"] = candidate["version"] in front
+        return sorted(candidates, key=lambda c: (c["correctness"], -c["prompt_tokens"]), reverse=True)
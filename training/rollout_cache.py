@@ -0,0 +1,142 @@
+"""Rollout 캐시 - 같은 (프롬프트, 태스크, 모델, 채점 기준) rollout의 reward 재사용
+
+APO는 beam에 남은 후보 프롬프트를 라운드마다 같은 validation 태스크로 다시 채점하므로
+student 답변 + judge 채점 호출이 반복된다. ROLLOUT_CACHE=on이면 reward를 SQLite에 저장해 재사용한다.
+
+- validation rollout만 적중 (train rollout은 student / judge 대화가 gradient 입력이라 항상 실행, 결과는 저장)
+- 키: 렌더링된 student 메시지(프롬프트 템플릿 + 페르소나 + 문제) + 태스크 + student/judge 배포 + 채점 기준(judge 프롬프트 + 단건 / batch)의 해시
+- ROLLOUT_CACHE_SAMPLES=1: 첫 결과를 계속 재사용 (결정적)
+- ROLLOUT_CACHE_SAMPLES=N: 키마다 N개 결과가 쌓일 때까지 실제 실행, 이후 N개 중 무작위 하나 (확률적 재샘플링)
+- runner 프로세스들이 같은 파일을 공유 (WAL), 학습 실행별 적중 / 절감 토큰은 runs 테이블에 누적
+"""
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+from uuid import uuid4
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from config import ROLLOUT_CACHE, ROLLOUT_CACHE_PATH, ROLLOUT_CACHE_SAMPLES
+from llm_router import LLMRouter
+
+RUN_ID_ENV = "ROLLOUT_CACHE_RUN_ID"  # runner 프로세스가 상속받는 학습 실행 ID
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollouts (
+    key TEXT NOT NULL,
+    sample INTEGER NOT NULL,
+    reward REAL NOT NULL,
+    tokens INTEGER NOT NULL,
+    created REAL NOT NULL,
+    cost TEXT,
+    PRIMARY KEY (key, sample)
+);
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0,
+    tokens_saved INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def role_models(router: LLMRouter, role: str) -> list[str]:
+    """역할에 라우팅된 배포 이름 (failover 대상 포함)"""
+    return [router.deployments[alias].deployment for alias in router.routes.get(role, [router.default])]
+
+
+def rollout_key(messages: list, task: dict, student_models: list[str], judge_models: list[str],
+                judge: str) -> str:
+    """judge: evaluator.judge_fingerprint() - 채점 기준이 바뀌면 이전 reward를 재사용하지 않음"""
+    payload = json.dumps(
+        [messages, task, student_models, judge_models, judge],
+        ensure_ascii=False, sort_keys=True, separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class RolloutCache:
+    def __init__(self, path: str, samples: int = 1):
+        if samples < 1:
+            raise RuntimeError(f"Invalid ROLLOUT_CACHE_SAMPLES {samples} (expected >= 1)")
+        self.path = Path(path)
+        self.samples = samples
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        # 연결은 프로세스 / 스레드별 (fork된 runner가 부모 연결을 공유하지 않도록)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(rollouts)")}
+            if "cost" not in columns:  # cost 컬럼 이전에 만든 캐시 파일
+                conn.execute("ALTER TABLE rollouts ADD COLUMN cost TEXT")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def lookup(self, key: str) -> Optional[tuple[float, Optional[dict]]]:
+        """저장된 결과가 samples개 이상이면 그중 하나의 (정답 reward, student 비용) (적중 기록), 아니면 None (미스 기록)"""
+        rows = self._conn().execute("SELECT reward, tokens, cost FROM rollouts WHERE key = ?", (key,)).fetchall()
+        if len(rows) < self.samples:
+            self._count(misses=1)
+            return None
+        reward, tokens, cost = random.choice(rows)
+        self._count(hits=1, tokens_saved=tokens)
+        return reward, json.loads(cost) if cost else None
+
+    def store(self, key: str, reward: float, tokens: int, cost: Optional[dict] = None):
+        """샘플이 samples개 미만일 때만 추가 (동시에 실행된 같은 키는 PRIMARY KEY 충돌로 무시)
+
+        reward는 정답 여부 (복합 reward는 저장된 비용으로 매번 계산 → REWARD_* 설정이 바뀌어도 캐시 유효)
+        """
+        self._conn().execute(
+            "INSERT OR IGNORE INTO rollouts (key, sample, reward, tokens, created, cost) "
+            "SELECT ?, COUNT(*), ?, ?, ?, ? FROM rollouts WHERE key = ? HAVING COUNT(*) < ?",
+            (key, reward, tokens, time.time(), json.dumps(cost) if cost else None, key, self.samples),
+        )
+
+    def _count(self, hits: int = 0, misses: int = 0, tokens_saved: int = 0):
+        run_id = os.environ.get(RUN_ID_ENV)
+        if not run_id:
+            return
+        self._conn().execute(
+            "INSERT INTO runs (run_id, hits, misses, tokens_saved) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(run_id) DO UPDATE SET hits = hits + excluded.hits, misses = misses + excluded.misses, "
+            "tokens_saved = tokens_saved + excluded.tokens_saved",
+            (run_id, hits, misses, tokens_saved),
+        )
+
+    def begin_run(self) -> str:
+        """학습 실행 ID 발급 (trainer.fit 전에 호출 → runner 프로세스가 환경변수로 상속)"""
+        run_id = uuid4().hex
+        os.environ[RUN_ID_ENV] = run_id
+        return run_id
+
+    def run_stats(self, run_id: str) -> dict:
+        row = self._conn().execute(
+            "SELECT hits, misses, tokens_saved FROM runs WHERE run_id = ?", (run_id,)
+        ).fetchone()
+        hits, misses, tokens_saved = row or (0, 0, 0)
+        return {"hits": hits, "misses": misses, "tokens_saved": tokens_saved}
+
+
+_cache: Optional[RolloutCache] = None
+
+
+def get_rollout_cache() -> Optional[RolloutCache]:
+    """ROLLOUT_CACHE=on이면 RolloutCache 싱글톤, off면 None"""
+    global _cache
+    if ROLLOUT_CACHE == "off":
+        return None
+    if _cache is None:
+        _cache = RolloutCache(ROLLOUT_CACHE_PATH, ROLLOUT_CACHE_SAMPLES)
+    return _cache
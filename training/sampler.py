@@ -0,0 +1,102 @@
+"""Hard-example 샘플링 - reward 통계 기반 gradient 태스크 선택
+
+APO는 라운드마다 train에서 gradient_batch_size개 태스크를 균등하게 뽑아 rollout → textual gradient를 계산한다.
+항상 맞히는 태스크(예: "5 + 10은?")의 rollout은 gradient에 쓸 실패 사례가 없어 토큰만 쓴다.
+TRAINING_SAMPLER=adaptive면 태스크별 reward 통계(문제 해시 기준, 라운드가 지날수록 SAMPLER_DECAY로 감쇠)로
+실패하거나 결과가 불확실한 태스크를 더 자주 뽑는다.
+
+- 가중치: (1 - p̂) + sqrt(p̂(1 - p̂) / (n + 2)),  p̂ = (성공 + 1) / (시도 + 2)  - 처음 보는 태스크는 p̂ = 0.5
+- 선택 확률: (1 - SAMPLER_FLOOR) × 가중치 비율 + SAMPLER_FLOOR / N  - 모든 태스크가 최소 확률을 가짐 (coverage)
+- 배치 안에서는 중복 없이 (Efraimidis-Spirakis 가중 비복원 추출)
+"""
+import math
+import random
+from typing import Any, Iterator, Optional, Sequence
+from pathlib import Path
+import sys
+
+from agentlightning.algorithm.apo import APO
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from config import SAMPLER_FLOOR, SAMPLER_DECAY
+from training.dataset import question_hash, task_keys
+
+
+class AdaptiveTaskSampler:
+    """태스크별 (감쇠된) 성공 / 시도 횟수와 가중 배치 샘플링"""
+
+    def __init__(self, floor: float = SAMPLER_FLOOR, decay: float = SAMPLER_DECAY, rng: Optional[random.Random] = None):
+        self.floor = floor
+        self.decay = decay
+        self.rng = rng or random.Random()
+        self.stats: dict[int, list[float]] = {}  # {문제 해시: [성공, 시도]}
+        self.sampled = 0
+
+    def update(self, task: dict, reward: Optional[float]):
+        """rollout 하나의 reward 반영 (None reward는 무시)"""
+        if reward is None:
+            return
+        entry = self.stats.setdefault(question_hash(task["question"]), [0.0, 0.0])
+        entry[0] = entry[0] * self.decay + reward
+        entry[1] = entry[1] * self.decay + 1
+
+    def weight(self, qhash: int) -> float:
+        successes, trials = self.stats.get(qhash, (0.0, 0.0))
+        p = (successes + 1) / (trials + 2)
+        return (1 - p) + math.sqrt(p * (1 - p) / (trials + 2))
+
+    def sample(self, dataset: Sequence[Any], hashes: Sequence[int], batch_size: int) -> list:
+        """dataset에서 batch_size개 (중복 없이, 가중치 + floor 비율)"""
+        n = len(hashes)
+        if batch_size >= n:
+            positions = list(range(n))
+            self.rng.shuffle(positions)
+        else:
+            weights = [self.weight(qhash) for qhash in hashes]
+            total = sum(weights)
+            keyed = []
+            for position, weight in enumerate(weights):
+                probability = (1 - self.floor) * weight / total + self.floor / n
+                keyed.append((self.rng.random() ** (1 / probability), position))
+            positions = [position for _, position in sorted(keyed, reverse=True)[:batch_size]]
+        self.sampled += len(positions)
+        return [dataset[position] for position in positions]
+
+    def batches(self, dataset: Sequence[Any], batch_size: int) -> Iterator[list]:
+        """APO grad_dataset_iterator 대체 (무한 반복, 매 배치마다 최신 통계 반영)"""
+        hashes = list(task_keys(dataset)[0])
+        while True:
+            yield self.sample(dataset, hashes, batch_size)
+
+    def summary(self) -> dict:
+        rates = [(s + 1) / (t + 2) for s, t in self.stats.values()]
+        return {
+            "tracked_tasks": len(self.stats),
+            "sampled": self.sampled,
+            "hard_tasks": sum(1 for p in rates if p < 0.5),
+            "mean_success": sum(rates) / len(rates) if rates else None,
+        }
+
+
+class AdaptiveSamplingAPO(APO):
+    """gradient 배치만 AdaptiveTaskSampler로 뽑는 APO (train rollout reward로 통계 갱신)
+
+    agentlightning 0.3.0 APO._initialize_beam의 반환값 순서를 따른다 (pyproject에서 <0.4로 고정).
+    """
+
+    def __init__(self, *args, sampler: Optional[AdaptiveTaskSampler] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sampler = sampler or AdaptiveTaskSampler()
+
+    def _initialize_beam(self, train_dataset, val_dataset):
+        resource_name, seed_prompt, _, val_dataset_iterator = super()._initialize_beam(train_dataset, val_dataset)
+        grad_dataset_iterator = self.sampler.batches(train_dataset, self.gradient_batch_size)
+        return resource_name, seed_prompt, grad_dataset_iterator, val_dataset_iterator
+
+    async def get_rollout_results(self, *args, **kwargs):
+        results = await super().get_rollout_results(*args, **kwargs)
+        rollouts = kwargs.get("rollout", args[-1] if args else [])
+        for rollout, result in zip(rollouts, results):
+            if rollout.mode == "train" and isinstance(rollout.input, dict):
+                self.sampler.update(rollout.input, result["final_reward"])
+        return results
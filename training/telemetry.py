@@ -0,0 +1,322 @@
+"""학습 telemetry - 프로세스당 하나의 span export 파이프라인 + 라운드 요약 (TRAINING_TELEMETRY=summary)
+
+- 프로세스마다 OTLP exporter(otel_export.py) + BatchSpanProcessor 하나만 생성해
+  학습 상세 tracer와 Agent Lightning runner tracer가 함께 사용 (fork 이후 자식 프로세스는 새로 생성)
+- summary 모드: rollout마다 span을 만들지 않고 라운드(= 같은 resources_id, 즉 같은 프롬프트 버전)별로
+  reward / 소요 시간의 누적 평균·분산·히스토그램만 유지하다가 라운드당 training.round span 하나로 전송
+- 프롬프트 본문은 content hash 기준으로 프로세스당 한 번만 prompt.registered span에 기록하고
+  나머지 span은 prompt.hash만 참조
+"""
+import hashlib
+import os
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Optional, Sequence
+import sys
+
+import agentlightning as agl
+from agentlightning.emitter import find_final_reward
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from otel_export import batch_span_processor
+
+PRIMARY_REWARD_ATTRIBUTE = "agentlightning.reward.0.value"  # emit_reward 형식의 첫 번째(primary) reward
+REWARD_BUCKETS = (0.0, 0.25, 0.5, 0.75, 1.0)
+DURATION_BUCKETS = (1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)  # 초
+
+# === 프로세스당 export 파이프라인 ===
+_span_processor: Optional[BatchSpanProcessor] = None
+_span_exporter: Optional[SpanExporter] = None
+_pipeline_pid: Optional[int] = None
+_provider: Optional[TracerProvider] = None
+_tracer = None
+_flush_callbacks: list[Callable[[], None]] = []
+
+
+def configure_span_exporter(exporter: SpanExporter):
+    """OTLP 대신 사용할 exporter (벤치마크 / 로컬 확인용, 첫 span 전에 호출)"""
+    global _span_exporter
+    _span_exporter = exporter
+
+
+def _ensure_pipeline():
+    global _span_processor, _pipeline_pid, _provider, _tracer
+    if _pipeline_pid == os.getpid():
+        return
+    # fork로 복제된 부모의 gRPC 채널 / HTTP 세션은 재사용하지 않고 이 프로세스용으로 새로 생성 (otel_export.py가 pid별로 관리)
+    _span_processor = batch_span_processor(_span_exporter)
+    _provider = TracerProvider(resource=Resource.create({
+        "service.name": "agentlightning-training-detail",
+        "service.version": "1.0.0",
+    }))
+    _provider.add_span_processor(_span_processor)
+    _tracer = _provider.get_tracer("apo-training")
+    _flush_callbacks.clear()
+    _pipeline_pid = os.getpid()
+
+
+def span_processor() -> BatchSpanProcessor:
+    """이 프로세스의 공유 BatchSpanProcessor (다른 TracerProvider에 추가해 같은 exporter로 전송)"""
+    _ensure_pipeline()
+    return _span_processor
+
+
+def get_training_tracer():
+    """학습 상세 span용 tracer (service.name=agentlightning-training-detail)"""
+    _ensure_pipeline()
+    return _tracer
+
+
+def flush_training_telemetry():
+    """열린 라운드 요약을 전송하고 export 큐 flush (runner 종료 / 학습 종료 시)"""
+    if _pipeline_pid != os.getpid():
+        return
+    for callback in list(_flush_callbacks):
+        callback()
+    _span_processor.force_flush()
+
+
+def shutdown_training_telemetry():
+    """학습 종료 시 flush 후 TracerProvider shutdown"""
+    if _pipeline_pid != os.getpid():
+        return
+    flush_training_telemetry()
+    _provider.shutdown()
+
+
+# === 프롬프트 ===
+def prompt_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+class PromptRegistry:
+    """프롬프트 본문을 hash별로 프로세스당 한 번만 span에 기록"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._seen: OrderedDict[str, None] = OrderedDict()
+
+    def register(self, text: str, **attributes) -> str:
+        digest = prompt_hash(text)
+        if digest in self._seen:
+            self._seen.move_to_end(digest)
+            return digest
+        with get_training_tracer().start_as_current_span("prompt.registered") as span:
+            span.set_attribute("prompt.hash", digest)
+            span.set_attribute("prompt.content", text)
+            span.set_attribute("prompt.length", len(text))
+            for key, value in attributes.items():
+                span.set_attribute(key, value)
+        self._seen[digest] = None
+        if len(self._seen) > self.max_entries:
+            self._seen.popitem(last=False)
+        return digest
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+
+def final_reward(spans: Sequence) -> Optional[float]:
+    """마지막 reward span의 primary reward
+
+    emit_reward 형식은 속성을 직접 읽고, 없을 때만 agentlightning 파서(find_final_reward)로 구형 형식까지 확인
+    (find_final_reward는 span마다 pydantic TypeAdapter를 만들어 rollout당 수백 µs).
+    """
+    for span in reversed(spans):
+        value = (getattr(span, "attributes", None) or {}).get(PRIMARY_REWARD_ATTRIBUTE)
+        if value is not None:
+            return float(value)
+    return find_final_reward(spans)
+
+
+# === 누적 통계 ===
+class RunningStats:
+    """Welford 누적 평균 / 분산 + min / max (값을 보관하지 않음)"""
+
+    __slots__ = ("count", "mean", "_m2", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    @property
+    def variance(self) -> float:
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return self.variance ** 0.5
+
+
+class Histogram:
+    """고정 경계 히스토그램 - bucket i는 (bounds[i-1], bounds[i]], 마지막 bucket은 bounds[-1] 초과"""
+
+    __slots__ = ("bounds", "counts")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+
+    def add(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+
+
+class RoundStats:
+    """라운드(resources_id) 하나의 rollout 집계"""
+
+    def __init__(self, resources_id: str, prompt_hash: Optional[str]):
+        self.resources_id = resources_id
+        self.prompt_hash = prompt_hash
+        self.started_ns = time.time_ns()
+        self.rollouts = 0
+        self.missing_rewards = 0
+        self.reward = RunningStats()
+        self.reward_histogram = Histogram(REWARD_BUCKETS)
+        self.duration = RunningStats()
+        self.duration_histogram = Histogram(DURATION_BUCKETS)
+        self.overhead = RunningStats()
+
+    def add(self, reward: Optional[float], duration: Optional[float]):
+        self.rollouts += 1
+        if reward is None:
+            self.missing_rewards += 1
+        else:
+            self.reward.add(reward)
+            self.reward_histogram.add(reward)
+        if duration is not None:
+            self.duration.add(duration)
+            self.duration_histogram.add(duration)
+
+    def emit(self, tracer, worker: Optional[str] = None):
+        """training.round span 하나로 전송 (span 시간 = 라운드 첫 rollout 종료 ~ 현재)"""
+        span = tracer.start_span("training.round", start_time=self.started_ns)
+        span.set_attribute("round.resources_id", self.resources_id)
+        if self.prompt_hash:
+            span.set_attribute("prompt.hash", self.prompt_hash)
+        if worker:
+            span.set_attribute("round.worker", worker)
+        span.set_attribute("rollouts.count", self.rollouts)
+        span.set_attribute("rollouts.missing_reward", self.missing_rewards)
+        if self.reward.count:
+            span.set_attribute("reward.mean", self.reward.mean)
+            span.set_attribute("reward.std", self.reward.std)
+            span.set_attribute("reward.min", self.reward.min)
+            span.set_attribute("reward.max", self.reward.max)
+        span.set_attribute("reward.histogram.bounds", list(self.reward_histogram.bounds))
+        span.set_attribute("reward.histogram.counts", self.reward_histogram.counts)
+        if self.duration.count:
+            span.set_attribute("rollout.duration.mean", self.duration.mean)
+            span.set_attribute("rollout.duration.max", self.duration.max)
+        span.set_attribute("rollout.duration.histogram.bounds", list(self.duration_histogram.bounds))
+        span.set_attribute("rollout.duration.histogram.counts", self.duration_histogram.counts)
+        if self.overhead.count:
+            span.set_attribute("telemetry.overhead_us.mean", self.overhead.mean * 1e6)
+            span.set_attribute("telemetry.overhead_us.max", self.overhead.max * 1e6)
+        span.end()
+
+
+class SummaryTrainingHook(agl.Hook):
+    """rollout 결과를 라운드별로 집계해 라운드당 span 하나만 보내는 Hook (TRAINING_TELEMETRY=summary)
+
+    메모리: 열린 라운드 최대 max_open_rounds개 + 실행 중인 rollout 시작 시각 + 최근 resources_id→prompt hash.
+    열린 라운드가 넘치면 가장 오래된 라운드부터 전송, 나머지는 runner 종료 시 flush_training_telemetry()로 전송.
+    """
+
+    def __init__(self, initial_prompt: str, max_open_rounds: int = 8):
+        self.initial_prompt = initial_prompt
+        self.max_open_rounds = max_open_rounds
+        self.prompts = PromptRegistry()
+        self.prompts.register(initial_prompt, **{"prompt.type": "initial"})
+        self._rounds: OrderedDict[str, RoundStats] = OrderedDict()
+        self._started: dict[str, float] = {}
+        self._resource_prompts: OrderedDict[str, Optional[str]] = OrderedDict()
+        self._registered_pid: Optional[int] = None
+        self.rounds_emitted = 0
+        self.total_rollouts = 0
+        self.best_reward = 0.0
+
+    async def on_rollout_start(self, *, agent, runner, rollout):
+        self._started[rollout.rollout_id] = time.perf_counter()
+
+    async def on_rollout_end(self, *, agent, runner, rollout, spans):
+        started = time.perf_counter()
+        if self._registered_pid != os.getpid():
+            _ensure_pipeline()
+            _flush_callbacks.append(self.flush)
+            self._registered_pid = os.getpid()
+
+        rollout_started = self._started.pop(rollout.rollout_id, None)
+        resources_id = rollout.resources_id or "latest"
+        stats = self._rounds.get(resources_id)
+        if stats is None:
+            stats = RoundStats(resources_id, await self._prompt_for(runner, resources_id))
+            self._rounds[resources_id] = stats
+            while len(self._rounds) > self.max_open_rounds:
+                self._emit(self._rounds.popitem(last=False)[1], runner)
+
+        stats.add(final_reward(spans or []), started - rollout_started if rollout_started else None)
+        self.total_rollouts += 1
+        stats.overhead.add(time.perf_counter() - started)
+
+    async def _prompt_for(self, runner, resources_id: str) -> Optional[str]:
+        """resources_id의 prompt_template을 등록하고 hash 반환 (resources_id별 한 번만 store 조회)"""
+        if resources_id in self._resource_prompts:
+            return self._resource_prompts[resources_id]
+        digest = None
+        try:
+            store = runner.get_store()
+            update = await (store.get_resources_by_id(resources_id) if resources_id != "latest" else store.get_latest_resources())
+            template = update.resources.get("prompt_template") if update else None
+            if template is not None:
+                text = template.template if hasattr(template, "template") else str(template)
+                digest = self.prompts.register(text, **{"prompt.resources_id": resources_id})
+        except Exception:
+            pass
+        self._resource_prompts[resources_id] = digest
+        if len(self._resource_prompts) > 256:
+            self._resource_prompts.popitem(last=False)
+        return digest
+
+    def _emit(self, stats: RoundStats, runner=None):
+        worker = None
+        if runner is not None:
+            try:
+                worker = runner.get_worker_id()
+            except Exception:
+                pass
+        stats.emit(get_training_tracer(), worker)
+        self.rounds_emitted += 1
+        if stats.reward.count:
+            self.best_reward = max(self.best_reward, stats.reward.mean)
+
+    def flush(self):
+        """열린 라운드 모두 전송"""
+        while self._rounds:
+            self._emit(self._rounds.popitem(last=False)[1])
+
+    def get_training_summary(self) -> dict:
+        """이 프로세스에서 집계한 학습 요약 (DetailedTrainingHook과 같은 키)"""
+        return {
+            "total_rounds": self.rounds_emitted + len(self._rounds),
+            "total_rollouts": self.total_rollouts,
+            "prompt_versions": len(self.prompts),
+            "best_reward": self.best_reward,
+            "initial_prompt": self.initial_prompt,
+            "prompt_history": [],
+        }
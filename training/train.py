@@ -8,6 +8,7 @@ Azure Application Insights로 상세 학습 trace 전송:
 """
 import os
 import json
+from collections import deque
 from pathlib import Path
 import sys
 
@@ -18,19 +19,21 @@ os.environ.setdefault("AGENTOPS_LOGGING_LEVEL", "CRITICAL")
 from openai import AsyncAzureOpenAI
 import agentlightning as agl
 
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
-from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
-from opentelemetry.sdk.resources import Resource
-
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from config import (
-    AZURE_OPENAI_ENDPOINT,
     AZURE_OPENAI_API_KEY,
     AZURE_OPENAI_DEPLOYMENT_NAME,
     AZURE_OPENAI_API_VERSION,
+    APO_EVAL_MODE,
+    REWARD_MODE,
     OTEL_EXPORTER_OTLP_ENDPOINT,
+    TRAINING_CHECKPOINT_DIR,
+    TRAINING_SAMPLER,
+    TRAINING_TELEMETRY,
 )
+from llm_cassette import get_cassette
+from llm_router import get_router
+from otel_export import describe as describe_otlp
 
 # OtelTracer 환경변수 설정
 os.environ.setdefault("OTEL_EXPORTER_OTLP_ENDPOINT", OTEL_EXPORTER_OTLP_ENDPOINT)
@@ -40,37 +43,42 @@ os.environ.setdefault("OTEL_ATTRIBUTE_VALUE_LENGTH_LIMIT", "65535")
 os.environ.setdefault("OTEL_SPAN_ATTRIBUTE_VALUE_LENGTH_LIMIT", "65535")
 
 from training.agent import quiz_agent, initial_prompt_template
-from training.dataset import create_dataset
-
-# 학습 상세 로깅을 위한 전역 tracer
-_azure_tracer = None
-_azure_provider = None
-
-
-def get_azure_tracer():
-    """Azure OTLP tracer 싱글톤"""
-    global _azure_tracer, _azure_provider
-    if _azure_tracer is None:
-        resource = Resource.create({
-            "service.name": "agentlightning-training-detail",
-            "service.version": "1.0.0",
-        })
-        _azure_provider = TracerProvider(resource=resource)
-        exporter = OTLPSpanExporter(
-            endpoint=OTEL_EXPORTER_OTLP_ENDPOINT,
-            insecure=True,
-        )
-        _azure_provider.add_span_processor(BatchSpanProcessor(exporter))
-        _azure_tracer = _azure_provider.get_tracer("apo-training")
-    return _azure_tracer
+from training.checkpoint import CheckpointingAPO, TrainingCheckpoint, atomic_write_text
+from training.dataset import load_splits
+from training.evaluator import start_judge_server
+from training.racing import RacingAPO
+from training.reward import RewardReportAPO
+from training.rollout_cache import get_rollout_cache
+from training.sampler import AdaptiveSamplingAPO
+from training.telemetry import (
+    SummaryTrainingHook,
+    flush_training_telemetry,
+    get_training_tracer,
+    prompt_hash,
+    shutdown_training_telemetry,
+    span_processor,
+)
 
+def apo_class() -> type:
+    """설정에 맞는 APO 구현
+    
+    - APO_EVAL_MODE=racing/halving: 후보를 단계적으로 채점하며 조기 탈락 (RacingAPO)
+    - TRAINING_SAMPLER=adaptive: gradient 태스크를 reward 통계로 가중 샘플링 (AdaptiveSamplingAPO)
+    - TRAINING_CHECKPOINT_DIR: 라운드마다 상태 저장 / --resume (CheckpointingAPO)
+    - 항상: 후보별 정답률 / 토큰 / 지연 집계 (RewardReportAPO, Pareto 보고)
+    """
+    bases = []
+    if TRAINING_CHECKPOINT_DIR:
+        bases.append(CheckpointingAPO)
+    if TRAINING_SAMPLER == "adaptive":
+        bases.append(AdaptiveSamplingAPO)
+    if APO_EVAL_MODE != "full":
+        bases.append(RacingAPO)
+    bases.append(RewardReportAPO)
+    return bases[0] if len(bases) == 1 else type("ComposedAPO", tuple(bases), {})
 
-def shutdown_azure_tracer():
-    """학습 종료 시 TracerProvider flush/shutdown"""
-    global _azure_provider
-    if _azure_provider is not None:
-        _azure_provider.force_flush()
-        _azure_provider.shutdown()
+
+PROMPT_HISTORY_LIMIT = 50  # 요약에 남길 최근 프롬프트 변경 수 (버전 번호는 전체 기준)
 
 
 class DetailedTrainingHook(agl.Hook):
@@ -84,15 +92,16 @@ class DetailedTrainingHook(agl.Hook):
     
     def __init__(self, initial_prompt: str):
         self.round_count = 0
-        self.rollout_results = []
-        self.prompt_history = []  # 프롬프트 변화 기록
+        self.rollout_count = 0
+        self.prompt_versions = 0  # 프롬프트 변경 횟수 (전체)
+        self.prompt_history = deque(maxlen=PROMPT_HISTORY_LIMIT)  # 최근 프롬프트 변화 기록
         self.initial_prompt = initial_prompt
         self.current_prompt = initial_prompt
         self.best_reward = 0.0
         self.best_prompt = initial_prompt
         
         # 초기 프롬프트 기록
-        tracer_inst = get_azure_tracer()
+        tracer_inst = get_training_tracer()
         with tracer_inst.start_as_current_span("prompt.initial") as span:
             span.set_attribute("prompt.version", 0)
             span.set_attribute("prompt.content", initial_prompt[:3000])
@@ -101,7 +110,7 @@ class DetailedTrainingHook(agl.Hook):
         
     async def on_trace_start(self, *, agent, runner, tracer, rollout):
         """Rollout 시작 시 현재 프롬프트 상태 기록"""
-        tracer_inst = get_azure_tracer()
+        tracer_inst = get_training_tracer()
         self.round_count += 1
         
         # 현재 리소스에서 프롬프트 추출
@@ -127,28 +136,30 @@ class DetailedTrainingHook(agl.Hook):
                 # 프롬프트가 변경되었으면 기록
                 if current_prompt != self.current_prompt:
                     self.current_prompt = current_prompt
+                    self.prompt_versions += 1
                     self.prompt_history.append({
+                        "version": self.prompt_versions,
                         "round": self.round_count,
                         "prompt": current_prompt,
                     })
                     
                     # 프롬프트 변화 span
                     with tracer_inst.start_as_current_span("prompt.updated") as prompt_span:
-                        prompt_span.set_attribute("prompt.version", len(self.prompt_history))
+                        prompt_span.set_attribute("prompt.version", self.prompt_versions)
                         prompt_span.set_attribute("prompt.content", current_prompt[:3000])
                         prompt_span.set_attribute("prompt.length", len(current_prompt))
                         prompt_span.set_attribute("prompt.round", self.round_count)
     
     async def on_trace_end(self, *, agent, runner, tracer, rollout):
         """Rollout 종료 시 결과 기록"""
-        tracer_inst = get_azure_tracer()
+        tracer_inst = get_training_tracer()
         with tracer_inst.start_as_current_span("rollout.end") as span:
             span.set_attribute("rollout.id", str(rollout.rollout_id) if hasattr(rollout, 'rollout_id') else "unknown")
             span.set_attribute("round.number", self.round_count)
     
     async def on_rollout_end(self, *, agent, runner, rollout, spans):
         """각 Rollout 완료 시 상세 span 정보 전송"""
-        tracer_inst = get_azure_tracer()
+        tracer_inst = get_training_tracer()
         
         with tracer_inst.start_as_current_span("rollout.result") as parent_span:
             rollout_id = str(rollout.rollout_id) if hasattr(rollout, 'rollout_id') else "unknown"
@@ -202,24 +213,18 @@ class DetailedTrainingHook(agl.Hook):
             if messages:
                 parent_span.set_attribute("messages.sample", messages[0][:1000] if messages else "")
             
-            self.rollout_results.append({
-                "rollout_id": rollout_id,
-                "round": self.round_count,
-                "rewards": rewards,
-                "avg_reward": avg_reward if rewards else 0,
-                "messages_count": len(messages),
-            })
+            self.rollout_count += 1
     
     def get_training_summary(self) -> dict:
         """학습 요약 정보 반환"""
         return {
             "total_rounds": self.round_count,
-            "total_rollouts": len(self.rollout_results),
-            "prompt_versions": len(self.prompt_history) + 1,  # 초기 포함
+            "total_rollouts": self.rollout_count,
+            "prompt_versions": self.prompt_versions + 1,  # 초기 포함
             "best_reward": self.best_reward,
             "initial_prompt": self.initial_prompt,
             "best_prompt": self.best_prompt,
-            "prompt_history": self.prompt_history,
+            "prompt_history": list(self.prompt_history),  # 최근 PROMPT_HISTORY_LIMIT개
         }
 
 
@@ -230,29 +235,43 @@ class OtelTracerWithExporter(agl.OtelTracer):
         # 부모 클래스 초기화 먼저 실행
         super()._initialize_tracer_provider(worker_id)
         
-        # 추가 OTLP Exporter 설정 (Azure Monitor로 전송)
+        # 학습 상세 tracer와 같은 프로세스 공유 exporter로 전송 (Azure Monitor)
         if self._tracer_provider is not None:
-            otlp_exporter = OTLPSpanExporter(
-                endpoint=OTEL_EXPORTER_OTLP_ENDPOINT,
-                insecure=True,
-            )
-            self._tracer_provider.add_span_processor(BatchSpanProcessor(otlp_exporter))
-            print(f"[Worker {worker_id}] ✅ Added OTLP exporter → {OTEL_EXPORTER_OTLP_ENDPOINT}")
+            self._tracer_provider.add_span_processor(span_processor())
+            print(f"[Worker {worker_id}] ✅ Added OTLP exporter → {describe_otlp()}")
+    
+    def teardown_worker(self, worker_id: int):
+        # runner 프로세스 종료 전 열린 라운드 요약 전송 + export 큐 flush
+        flush_training_telemetry()
+        super().teardown_worker(worker_id)
 
 
-def main():
-    """APO 학습 실행 - Azure Application Insights로 상세 trace 전송"""
-    print(f"✅ Tracing → {OTEL_EXPORTER_OTLP_ENDPOINT}")
+def main(resume: bool = False):
+    """APO 학습 실행 - Azure Application Insights로 상세 trace 전송
+
+    resume: TRAINING_CHECKPOINT_DIR의 마지막 스냅샷부터 이어서 실행
+    """
+    print(f"✅ Tracing → {describe_otlp()}")
     print("🚀 Agent Lightning - APO Training Started")
-    print("📊 Detailed traces enabled (Prompt History, Rewards, Rollouts)")
+    if TRAINING_TELEMETRY == "summary":
+        print("📊 Summary telemetry enabled (one span per round, prompts by hash)")
+    else:
+        print("📊 Detailed traces enabled (Prompt History, Rewards, Rollouts)")
     print("=" * 50)
 
-    # Azure OpenAI 클라이언트
-    openai_client = AsyncAzureOpenAI(
-        azure_endpoint=AZURE_OPENAI_ENDPOINT,
+    # 역할별 배포 (LLM_ROLE_ROUTES) - APO는 클라이언트 하나만 받으므로 gradient 배포의 엔드포인트 사용
+    router = get_router()
+    gradient_deployment = router.primary("gradient")
+    apply_edit_deployment = router.primary("apply_edit")
+    if apply_edit_deployment.endpoint != gradient_deployment.endpoint:
+        print(f"⚠️ apply_edit endpoint differs from gradient; using {gradient_deployment.endpoint} for both")
+
+    # Azure OpenAI 클라이언트 (LLM_CASSETTE_MODE면 gradient/apply_edit 호출도 녹화/재생)
+    openai_client = get_cassette().wrap_async_client(AsyncAzureOpenAI(
+        azure_endpoint=gradient_deployment.endpoint,
         api_key=AZURE_OPENAI_API_KEY,
         api_version=AZURE_OPENAI_API_VERSION,
-    )
+    ), role="apo")
 
     # 초기 프롬프트 템플릿
     init_prompt = initial_prompt_template()
@@ -263,19 +282,37 @@ def main():
     print(init_prompt_text[:500] + "..." if len(init_prompt_text) > 500 else init_prompt_text)
     print("-" * 40)
 
+    # 체크포인트 (TRAINING_CHECKPOINT_DIR) - resume이면 마지막 스냅샷부터
+    checkpoint_kwargs = {}
+    if TRAINING_CHECKPOINT_DIR:
+        checkpoint = TrainingCheckpoint(TRAINING_CHECKPOINT_DIR)
+        resume_state = checkpoint.load() if resume else None
+        if resume and resume_state is None:
+            raise RuntimeError(f"No training checkpoint to resume in {checkpoint.state_path}")
+        if resume_state is not None:
+            print(f"⏯️ Resuming from {checkpoint.state_path}: {resume_state['completed_rounds']}/"
+                  f"{resume_state['beam_rounds']} rounds done, phase {resume_state['phase']}")
+        checkpoint_kwargs = {"checkpoint": checkpoint, "resume_state": resume_state}
+    elif resume:
+        raise RuntimeError("--resume requires TRAINING_CHECKPOINT_DIR")
+
     # APO 알고리즘
-    algo = agl.APO(
+    algo = apo_class()(
         openai_client,
-        gradient_model=AZURE_OPENAI_DEPLOYMENT_NAME,
-        apply_edit_model=AZURE_OPENAI_DEPLOYMENT_NAME,
+        gradient_model=gradient_deployment.deployment,
+        apply_edit_model=apply_edit_deployment.deployment,
         gradient_batch_size=4,
         beam_width=2,
         branch_factor=2,
         beam_rounds=3,
+        **checkpoint_kwargs,
     )
 
-    # 상세 학습 Hook (초기 프롬프트 전달)
-    training_hook = DetailedTrainingHook(initial_prompt=init_prompt_text)
+    # 학습 Hook (TRAINING_TELEMETRY=summary면 라운드당 요약 span 하나)
+    if TRAINING_TELEMETRY == "summary":
+        training_hook = SummaryTrainingHook(initial_prompt=init_prompt_text)
+    else:
+        training_hook = DetailedTrainingHook(initial_prompt=init_prompt_text)
 
     # Trainer with hooks
     trainer = agl.Trainer(
@@ -287,28 +324,43 @@ def main():
         hooks=[training_hook],  # 상세 트레이싱 Hook 추가
     )
 
-    # 데이터셋 준비
-    dataset = create_dataset()
-    split_idx = int(len(dataset) * 0.8)
-    train_dataset, val_dataset = dataset[:split_idx], dataset[split_idx:]
+    # 데이터셋 준비 (DATASET_PATHS JSONL 또는 내장, 층별 분할 + DATASET_SHARD)
+    train_dataset, val_dataset = load_splits()
 
     print(f"\n📊 Dataset: {len(train_dataset)} train, {len(val_dataset)} validation")
     print(f"🤖 Model: {AZURE_OPENAI_DEPLOYMENT_NAME}")
+    for role in ("student", "judge", "gradient", "apply_edit"):
+        print(f"   {role}: {', '.join(a for a in router.routes.get(role, [router.default]))}")
     print("=" * 50)
 
+    # Rollout 캐시 (ROLLOUT_CACHE=on) - 이번 실행의 적중/절감 토큰 집계용 ID
+    rollout_cache = get_rollout_cache()
+    cache_run_id = rollout_cache.begin_run() if rollout_cache is not None else None
+
+    # Batched judge (JUDGE_BATCH_SIZE > 1) - runner 프로세스들의 채점 요청을 메인 프로세스에서 묶음 (runner fork 전에 시작)
+    judge_server = start_judge_server()
+
     # 학습 시작
     print("\n🎓 Starting training...")
-    result = trainer.fit(
-        agent=quiz_agent,
-        train_dataset=train_dataset,
-        val_dataset=val_dataset,
-    )
+    try:
+        result = trainer.fit(
+            agent=quiz_agent,
+            train_dataset=train_dataset,
+            val_dataset=val_dataset,
+        )
+    finally:
+        if judge_server is not None:
+            judge_server.close()
 
     # 학습 요약 정보
     summary = training_hook.get_training_summary()
+    cache_stats = rollout_cache.run_stats(cache_run_id) if rollout_cache is not None else None
+    eval_rounds = getattr(algo, "round_rollouts", [])
+    sampler_stats = algo.sampler.summary() if TRAINING_SAMPLER == "adaptive" else None
+    pareto = algo.pareto_report()
     
     # 학습 완료 후 상세 trace 전송
-    tracer_inst = get_azure_tracer()
+    tracer_inst = get_training_tracer()
     
     # 1. 학습 완료 요약
     with tracer_inst.start_as_current_span("training.complete") as span:
@@ -319,28 +371,65 @@ def main():
         span.set_attribute("training.total_rollouts", summary["total_rollouts"])
         span.set_attribute("training.prompt_versions", summary["prompt_versions"])
         span.set_attribute("training.best_reward", summary["best_reward"])
+        if cache_stats is not None:
+            span.set_attribute("rollout_cache.hits", cache_stats["hits"])
+            span.set_attribute("rollout_cache.misses", cache_stats["misses"])
+            span.set_attribute("rollout_cache.tokens_saved", cache_stats["tokens_saved"])
+        if judge_server is not None:
+            span.set_attribute("judge.requests", judge_server.batch_judge.requests)
+            span.set_attribute("judge.answers", judge_server.batch_judge.answers)
+        if eval_rounds:
+            span.set_attribute("apo_eval.mode", APO_EVAL_MODE)
+            span.set_attribute("apo_eval.rollouts", sum(r["rollouts"] for r in eval_rounds))
+            span.set_attribute("apo_eval.full_rollouts", sum(r["full_rollouts"] for r in eval_rounds))
+            span.set_attribute("apo_eval.rollouts_per_round", [r["rollouts"] for r in eval_rounds])
+        if sampler_stats is not None:
+            span.set_attribute("sampler.tracked_tasks", sampler_stats["tracked_tasks"])
+            span.set_attribute("sampler.hard_tasks", sampler_stats["hard_tasks"])
         
-        # 초기 vs 최종 프롬프트 비교
-        span.set_attribute("prompt.initial", summary["initial_prompt"][:2000])
+        # 초기 vs 최종 프롬프트 비교 (summary 모드는 본문 대신 prompt.registered span의 hash)
+        if TRAINING_TELEMETRY == "summary":
+            span.set_attribute("prompt.initial_hash", prompt_hash(summary["initial_prompt"]))
+        else:
+            span.set_attribute("prompt.initial", summary["initial_prompt"][:2000])
         span.set_attribute("prompt.initial_length", len(summary["initial_prompt"]))
         
         if result and "prompt_template" in result:
             optimized = result["prompt_template"]
             optimized_text = optimized.template if hasattr(optimized, 'template') else str(optimized)
-            span.set_attribute("prompt.final", optimized_text[:2000])
+            if TRAINING_TELEMETRY == "summary":
+                span.set_attribute("prompt.final_hash", training_hook.prompts.register(
+                    optimized_text, **{"prompt.type": "final_optimized"}
+                ))
+            else:
+                span.set_attribute("prompt.final", optimized_text[:2000])
             span.set_attribute("prompt.final_length", len(optimized_text))
             span.set_attribute("prompt.changed", optimized_text != summary["initial_prompt"])
     
-    # 2. 프롬프트 변화 히스토리 기록
-    for i, prompt_record in enumerate(summary["prompt_history"]):
+    # 후보별 정답률 / 비용 (Pareto 보고, 프롬프트 본문 대신 hash)
+    for candidate in pareto:
+        with tracer_inst.start_as_current_span("prompt.candidate") as span:
+            span.set_attribute("prompt.version", candidate["version"])
+            span.set_attribute("prompt.hash", prompt_hash(candidate["prompt"]))
+            span.set_attribute("reward.mode", REWARD_MODE)
+            span.set_attribute("candidate.rollouts", candidate["rollouts"])
+            span.set_attribute("candidate.correctness", candidate["correctness"])
+            span.set_attribute("candidate.composite", candidate["composite"])
+            span.set_attribute("candidate.prompt_tokens", candidate["prompt_tokens"])
+            span.set_attribute("candidate.completion_tokens", candidate["completion_tokens"])
+            span.set_attribute("candidate.latency_s", candidate["latency_s"])
+            span.set_attribute("candidate.pareto", candidate["pareto"])
+
+    # 2. 프롬프트 변화 히스토리 기록 (최근 PROMPT_HISTORY_LIMIT개)
+    for prompt_record in summary["prompt_history"]:
         with tracer_inst.start_as_current_span("prompt.history") as span:
-            span.set_attribute("prompt.version", i + 1)
+            span.set_attribute("prompt.version", prompt_record["version"])
             span.set_attribute("prompt.round", prompt_record["round"])
             span.set_attribute("prompt.content", prompt_record["prompt"][:2000])
             span.set_attribute("prompt.length", len(prompt_record["prompt"]))
     
-    # 3. 최종 최적화 프롬프트 (전체 내용)
-    if result and "prompt_template" in result:
+    # 3. 최종 최적화 프롬프트 (전체 내용, summary 모드는 위에서 prompt.registered로 기록)
+    if result and "prompt_template" in result and TRAINING_TELEMETRY == "detailed":
         optimized = result["prompt_template"]
         optimized_text = optimized.template if hasattr(optimized, 'template') else str(optimized)
         
@@ -364,6 +453,29 @@ def main():
     print(f"📊 Total Rollouts: {summary['total_rollouts']}")
     print(f"📊 Prompt Versions: {summary['prompt_versions']}")
     print(f"🏆 Best Reward: {summary['best_reward']:.2f}")
+    if cache_stats is not None:
+        total = cache_stats["hits"] + cache_stats["misses"]
+        print(f"♻️ Rollout Cache: {cache_stats['hits']}/{total} rollouts reused, "
+              f"{cache_stats['tokens_saved']:,} tokens saved")
+    if judge_server is not None and judge_server.batch_judge.requests:
+        judge = judge_server.batch_judge
+        print(f"⚖️ Batched Judge: {judge.answers} answers in {judge.requests} requests "
+              f"(x{judge.answers / judge.requests:.1f})")
+    if eval_rounds:
+        spent = sum(r["rollouts"] for r in eval_rounds)
+        full = sum(r["full_rollouts"] for r in eval_rounds)
+        print(f"🏁 Candidate Evaluation ({APO_EVAL_MODE}): {spent}/{full} rollouts vs full evaluation")
+        for r in eval_rounds:
+            print(f"   round {r['round']}: {r['candidates']} candidates, {r['rollouts']}/{r['full_rollouts']} rollouts")
+    if pareto:
+        print(f"\n⚖️ Candidates (reward: {REWARD_MODE}, ★ = Pareto: correctness ↑, tokens / latency ↓)")
+        print(f"   {'version':<9}{'correct':>9}{'composite':>11}{'prompt tok':>12}{'compl tok':>11}{'latency s':>11}")
+        for c in pareto:
+            print(f" {'★' if c['pareto'] else ' '} {c['version']:<9}{c['correctness']:>9.2f}{c['composite']:>11.3f}"
+                  f"{c['prompt_tokens']:>12.0f}{c['completion_tokens']:>11.0f}{c['latency_s']:>11.2f}")
+    if sampler_stats is not None:
+        print(f"🎯 Adaptive Sampling: {sampler_stats['sampled']} gradient tasks sampled, "
+              f"{sampler_stats['hard_tasks']}/{sampler_stats['tracked_tasks']} tracked tasks below 50% success")
 
     if result and "prompt_template" in result:
         optimized = result["prompt_template"]
@@ -387,12 +499,11 @@ def main():
             print("⚠️ Prompt unchanged (may need more training)")
 
         output_path = Path(__file__).parent.parent / "app" / "optimized_prompt.txt"
-        with open(output_path, "w") as f:
-            f.write(optimized_text)
+        atomic_write_text(output_path, optimized_text)
         print(f"\n💾 Saved to: {output_path}")
 
     # TracerProvider flush/shutdown (마지막 batch 유실 방지)
-    shutdown_azure_tracer()
+    shutdown_training_telemetry()
 
     return result
 
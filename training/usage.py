@@ -0,0 +1,64 @@
+"""OpenAI usage 기록 - prompt/cached 토큰 (프롬프트 캐시 적중 확인용)"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from opentelemetry import trace, metrics
+
+_meter = metrics.get_meter(__name__)
+input_tokens_counter = _meter.create_counter(
+    "apo.llm.input_tokens", unit="{token}", description="Prompt tokens sent per role",
+)
+cached_tokens_counter = _meter.create_counter(
+    "apo.llm.cached_input_tokens", unit="{token}", description="Prompt tokens served from provider prompt cache",
+)
+
+
+# track_tokens() 블록 안에서 record_usage된 total_tokens 합계 (rollout 캐시 절감량 계산용)
+_tracked_tokens: ContextVar[Optional[dict]] = ContextVar("apo_tracked_tokens", default=None)
+
+
+@contextmanager
+def track_tokens() -> Iterator[dict]:
+    """블록 안 LLM 호출 토큰 합계 {"tokens": n}
+
+    JUDGE_BATCH_SIZE > 1이면 batch 채점 토큰은 batch에 묶인 rollout들에 균등 분배해 합산된다.
+    """
+    totals = {"tokens": 0}
+    token = _tracked_tokens.set(totals)
+    try:
+        yield totals
+    finally:
+        _tracked_tokens.reset(token)
+
+
+def add_tracked_tokens(tokens: int):
+    """LLM 응답 없이 토큰만 합산 (다른 스레드 / 프로세스에서 대신 보낸 batch 채점 몫)"""
+    totals = _tracked_tokens.get()
+    if totals is not None:
+        totals["tokens"] += tokens
+
+
+def prompt_token_usage(usage) -> tuple[int, int]:
+    """(prompt_tokens, cached_tokens) - usage가 없으면 (0, 0)"""
+    if usage is None:
+        return 0, 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", 0) if details is not None else 0
+    return usage.prompt_tokens or 0, cached or 0
+
+
+def record_usage(role: str, model: str, usage):
+    """chat.completions 응답 usage를 현재 span 속성과 메트릭으로 기록"""
+    prompt_tokens, cached_tokens = prompt_token_usage(usage)
+    span = trace.get_current_span()
+    span.set_attribute(f"apo.{role}.input_tokens", prompt_tokens)
+    span.set_attribute(f"apo.{role}.cached_input_tokens", cached_tokens)
+
+    totals = _tracked_tokens.get()
+    if totals is not None and usage is not None:
+        totals["tokens"] += usage.total_tokens or 0
+
+    attributes = {"apo.role": role, "gen_ai.request.model": model}
+    input_tokens_counter.add(prompt_tokens, attributes)
+    cached_tokens_counter.add(cached_tokens, attributes)